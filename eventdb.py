@@ -1,31 +1,76 @@
 import os
 import sys
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from croniter import croniter
 from dotenv import load_dotenv
 
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from runnerdb import get_scheduled_tasks, update_scheduled_task
-from runner import execute_command, load_yaml, list_classes_and_objects
+from runnerdb import get_scheduled_tasks, update_scheduled_task, init_db
+from src.execute_command import execute_plan
+from src.command_plan import CommandCompiler
+from src.load_yaml import load_yaml
+from src.config_cache import validate_commands_config, validate_service_config
+from src.list_classes_and_objects import list_classes_and_objects
+from src.service_pool import service_pool
+from src.json_fields import configure_extracted_fields
+from src.retention import configure_retention, apply_retention_if_due
+from src.command_cache import configure_command_cache
+from src.result_logging import configure_result_logging, start_log_queue
+from src.manage_log_file import manage_log_file
 
 # Load environment variables
 load_dotenv()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+LOG_FILE = os.getenv('LOG_FILE_PATH', '.logs')
+DEBUG_MODE = os.getenv('DEBUG_MODE', '0') == '1'
+REMOVE_LOGS_AFTER = int(os.getenv('REMOVE_LOGS_AFTER', '0'))
 logger = logging.getLogger(__name__)
 
-def run_scheduled_tasks():
+def configure_logging():
+    """Log to LOG_FILE_PATH like runner.py, rotating it per REMOVE_LOGS_AFTER first.
+
+    DEBUG_MODE=1 logs at DEBUG level and also to the console.
+    """
+    manage_log_file(LOG_FILE, REMOVE_LOGS_AFTER)
+    logging_level = logging.DEBUG if DEBUG_MODE else logging.INFO
+    logging.basicConfig(
+        level=logging_level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        filename=LOG_FILE,
+        filemode='a'
+    )
+
+    # Only add console handler if DEBUG_MODE is True
+    if DEBUG_MODE:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging_level)
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        console_handler.setFormatter(formatter)
+        logging.getLogger('').addHandler(console_handler)
+
+def run_scheduled_tasks(classes_and_objects=None, service_config=None, compiler=None):
+    """Run due tasks. A long-running caller can pass its already loaded state,
+    including a CommandCompiler that keeps the task plans between ticks."""
     tasks = get_scheduled_tasks()
     now = datetime.now()
 
     # Load configuration
-    commands_data = load_yaml(os.getenv('COMMANDS_YAML_PATH', 'commands.yaml'))
-    service_config = load_yaml(os.getenv('PRIVATE_YAML_PATH', 'private.yaml'))
-    classes_and_objects = list_classes_and_objects()
+    if service_config is None:
+        commands_data = load_yaml(os.getenv('COMMANDS_YAML_PATH', 'commands.yaml'), validate_commands_config)
+        configure_extracted_fields(commands_data['commands']['python'].get('extract'))
+        configure_retention(commands_data['commands']['python'].get('retention'))
+        configure_command_cache(commands_data['commands']['python'].get('cache'))
+        configure_result_logging(commands_data['commands']['python'].get('log_results'))
+        service_config = load_yaml(os.getenv('PRIVATE_YAML_PATH', 'private.yaml'), validate_service_config)
+        service_pool.sync_config(service_config)
+    if classes_and_objects is None:
+        classes_and_objects = list_classes_and_objects()
+    if compiler is None:
+        compiler = CommandCompiler(classes_and_objects=classes_and_objects, service_config=service_config)
 
     for task in tasks:
         task_id, command, schedule, last_run, next_run, status = task
@@ -34,7 +79,7 @@ def run_scheduled_tasks():
             logger.info(f"Running task {task_id}: {command}")
 
             try:
-                execute_command(command, classes_and_objects, service_config)
+                execute_plan(compiler.compile(command), classes_and_objects, service_config)
                 status = 'completed'
             except Exception as e:
                 logger.error(f"Error executing task {task_id}: {str(e)}")
@@ -47,5 +92,14 @@ def run_scheduled_tasks():
             update_scheduled_task(task_id, last_run, next_run, status)
             logger.info(f"Task {task_id} completed. Next run: {next_run}")
 
+    # Delete expired results (at most once per RETENTION_INTERVAL)
+    try:
+        apply_retention_if_due()
+    except Exception as e:
+        logger.error(f"Error applying result retention: {str(e)}")
+
 if __name__ == "__main__":
+    configure_logging()
+    start_log_queue()
+    init_db()
     run_scheduled_tasks()
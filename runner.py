@@ -1,16 +1,26 @@
-import importlib
-import inspect
-import yaml
 import sys
-import shlex
 import os
 import json
+import asyncio
 import logging
 from datetime import datetime
-import sqlite3
 import xml.etree.ElementTree as ET
 from dotenv import load_dotenv
-from runnerdb import save_result, get_latest_result, DB_PATH, add_scheduled_task
+from runnerdb import add_scheduled_task, init_db
+from src.load_yaml import load_yaml
+from src.config_cache import validate_commands_config, validate_service_config
+from src.execute_command import execute_plan
+from src.command_plan import CommandCompiler
+from src.service_pool import service_pool
+from src.create_json_result_view import create_json_result_view
+from src.json_fields import configure_extracted_fields
+from src.command_cache import configure_command_cache
+from src.result_logging import configure_result_logging, start_log_queue
+from src.list_classes_and_objects import list_classes_and_objects
+from src.parallel_executor import run_commands_parallel
+from src.async_executor import run_commands_async
+from src.async_execute_command import async_execute_plan
+from src.runner_daemon import serve, send_command
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,6 +30,8 @@ LOG_FILE = os.getenv('LOG_FILE_PATH', '.logs')
 DEBUG_MODE = os.getenv('DEBUG_MODE', '0') == '1'
 DEBUG_LEVEL = os.getenv('DEBUG_LEVEL', 'INFO,WARNING,ERROR').split(',')
 REMOVE_LOGS_AFTER = int(os.getenv('REMOVE_LOGS_AFTER', '0'))
+PARALLEL_MODE = os.getenv('PARALLEL_MODE', '0') == '1'
+ASYNC_MODE = os.getenv('ASYNC_MODE', '0') == '1'
 
 logging_level = logging.DEBUG if DEBUG_MODE else logging.INFO
 
@@ -52,6 +64,9 @@ if DEBUG_MODE:
     console_handler.setFormatter(formatter)
     logging.getLogger('').addHandler(console_handler)
 
+# Write log records on a background thread (LOG_QUEUE=0 writes them inline)
+start_log_queue()
+
 logger = logging.getLogger(__name__)
 
 # Add the 'python' directory to the Python path
@@ -71,11 +86,6 @@ classes_and_objects = None
 aliases = None
 converters = None
 
-def load_yaml(file_path):
-    logger.debug(f"Loading YAML file: {file_path}")
-    with open(file_path, 'r') as file:
-        return yaml.safe_load(file)
-
 def process_scheduled_tasks(scheduled_tasks):
     logger.info("Processing scheduled tasks")
     for task in scheduled_tasks:
@@ -84,104 +94,6 @@ def process_scheduled_tasks(scheduled_tasks):
         logger.info(f"Adding scheduled task: {command} with schedule: {schedule}")
         add_scheduled_task(command, schedule)
 
-def list_classes_and_objects():
-    logger.debug("Listing classes and objects")
-    classes_and_objects = {}
-    python_dir = os.path.join(os.path.dirname(__file__), 'python')
-    
-    for filename in os.listdir(python_dir):
-        if filename.endswith('.py') and not filename.startswith('__'):
-            module_name = filename[:-3]
-            logger.debug(f"Importing module: {module_name}")
-            module = importlib.import_module(module_name)
-            
-            for name, obj in inspect.getmembers(module):
-                if inspect.isclass(obj) and obj.__module__ == module_name:
-                    logger.debug(f"Found class: {name}")
-                    classes_and_objects[name] = {
-                        'class': obj,
-                        'methods': {method_name.lower(): method_obj for method_name, method_obj in inspect.getmembers(obj) if inspect.isfunction(method_obj) or inspect.ismethod(method_obj)}
-                    }
-
-    return classes_and_objects
-
-def get_function_from_string(func_string):
-    module_name, func_name = func_string.rsplit('.', 1)
-    module = importlib.import_module(module_name)
-    return getattr(module, func_name)
-
-def replace_aliases(command, aliases, converters):
-    parts = shlex.split(command)
-    new_parts = []
-    for part in parts:
-        if '=' in part:
-            key, value = part.split('=', 1)
-            new_key = aliases.get('param', {}).get(key, key)  # Use original if no alias
-            new_value = value  # Start with the original value
-            
-            # Apply converter if available
-            if value in converters:
-                converter_func = get_function_from_string(converters[value])
-                if converter_func:
-                    new_value = converter_func()
-            
-            new_parts.append(f"{new_key}={new_value}")
-        else:
-            # Use original if 'action' key doesn't exist or if there's no alias for this action
-            new_parts.append(aliases.get('action', {}).get(part.lower(), part))
-    return ' '.join(new_parts)
-
-def parse_command_args(args):
-    parsed_args = {}
-    key = None
-    value = []
-    in_quotes = False
-
-    for arg in args:
-        if '=' in arg and not in_quotes:
-            if key:
-                parsed_args[key] = ' '.join(value)
-            key, val = arg.split('=', 1)
-            value = [val]
-            in_quotes = val.startswith('"') and not val.endswith('"')
-        elif in_quotes:
-            value.append(arg)
-            if arg.endswith('"'):
-                in_quotes = False
-        elif key:
-            value.append(arg)
-        else:
-            parsed_args[arg] = True
-
-    if key:
-        parsed_args[key] = ' '.join(value)
-
-    # Remove quotes from values
-    for k, v in parsed_args.items():
-        if isinstance(v, str):
-            parsed_args[k] = v.strip('"')
-
-    return parsed_args
-
-def filter_data(data, filter_key, filter_value):
-    if isinstance(data, list):
-        return [item for item in data if str(item.get(filter_key, '')).lower() == str(filter_value).lower()]
-    elif isinstance(data, dict):
-        return {k: v for k, v in data.items() if str(v.get(filter_key, '')).lower() == str(filter_value).lower()}
-    else:
-        return data
-
-def print_value(data, value_key, filter_key, filter_value):
-    filtered_data = filter_data(data, filter_key, filter_value)
-    if filtered_data:
-        if isinstance(filtered_data, list):
-            for item in filtered_data:
-                print(f"{value_key}: {item.get(value_key, 'Not found')}")
-        elif isinstance(filtered_data, dict):
-            print(f"{value_key}: {filtered_data.get(value_key, 'Not found')}")
-    else:
-        print(f"No data found matching the filter: {filter_key}={filter_value}")
-
 def xml_to_json(xml_string):
     root = ET.fromstring(xml_string)
     return json.dumps(xml_to_dict(root))
@@ -195,175 +107,61 @@ def xml_to_dict(element):
             result[child.tag] = xml_to_dict(child)
     return result
 
-def create_json_result_view():
-    """Create the json_result view if it doesn't exist."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
-        cursor.execute("CREATE TEMP VIEW IF NOT EXISTS json_result AS SELECT id, result FROM query")
-        conn.commit()
-        logger.info("Created json_result view")
-    except sqlite3.Error as e:
-        logger.error(f"Error creating json_result view: {e}")
-    finally:
-        conn.close()
-
-def execute_sql_query(query):
-    """Execute a SQL query and return the results."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    try:
-        # Execute the actual query
-        cursor.execute(query)
-        results = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        logger.info(f"SQL query executed: {query}")
-        logger.info(f"Number of results: {len(results)}")
-        return column_names, results
-    except sqlite3.Error as e:
-        logger.error(f"SQL error: {e}")
-        return None, None
-    finally:
-        conn.close()
-
-def execute_command(command, classes_and_objects, service_config):
-    logger.info(f"Executing command: {command}")
-    
-    # Check if the command is a SQL query
-    if command.strip().upper().startswith("SELECT"):
-        column_names, results = execute_sql_query(command)
-        if column_names and results:
-            # Print column names
-            print(" | ".join(column_names))
-            print("-" * (sum(len(name) for name in column_names) + 3 * (len(column_names) - 1)))
-            # Print results
-            for row in results:
-                print(" | ".join(str(value) for value in row))
-            logger.info(f"SQL query results printed")
-        else:
-            logger.warning("No results returned from SQL query")
-        return
-
-    parts = shlex.split(command)
-    if len(parts) < 2:
-        logger.error(f"Invalid command format: {command}")
-        return
-
-    action = parts[0].lower()
-    if action == 'filter':
-        # Handle filter command
-        data_key = parts[1]
-        filter_key = parts[2]
-        filter_value = parts[3]
-        service_name, method_name = data_key.split('_', 1)
-        data = get_latest_result(service_name, method_name)
-        if data:
-            filtered_data = filter_data(data, filter_key, filter_value)
-            save_result(command, 'name', service_name, method_name, filtered_data)
-            logger.info(f"Filtered data saved for '{data_key}'")
-        else:
-            logger.error(f"No data found with key '{data_key}'")
-        return
-    elif action == 'print' and parts[1] == 'value':
-        # Handle print value command
-        value_key = parts[2]
-        filter_key, filter_value = parts[4].split('=')
-        service_name, method_name = parts[-1].split('_', 1)
-        data = get_latest_result(service_name, method_name)
-        if data:
-            print_value(data, value_key, filter_key, filter_value)
-            logger.info(f"Printed value for {service_name}.{method_name}")
-        else:
-            logger.error(f"No data found for {service_name}_{method_name}")
-        return
-
-    method_parts = []
-    account_alias = None
-    for part in parts:
-        if part in service_config:
-            account_alias = part
-            break
-        method_parts.append(part)
-
-    if not account_alias:
-        logger.error(f"Invalid account alias in command: {command}")
-        return
-
-    method_name = '_'.join(method_parts).lower()
-    service_info = service_config[account_alias]
-
-    service_name = service_info['service']
-
-    if service_name not in classes_and_objects:
-        logger.error(f"Invalid service name: {service_name}")
-        return
-
-    service_class = classes_and_objects[service_name]['class']
-    constructor_args = {k: v for k, v in service_info.items() if k != 'service'}
-
-    # Create an instance of the service
-    try:
-        instance = service_class(**constructor_args)
-    except TypeError as e:
-        logger.error(f"Error creating {service_name} instance: {str(e)}")
-        return
-
-    if method_name not in classes_and_objects[service_name]['methods']:
-        logger.error(f"Method {method_name} not found in class {service_name}.")
-        return
-
-    method = classes_and_objects[service_name]['methods'][method_name]
-
-    # Parse method arguments
-    method_args = parse_command_args(parts[len(method_parts)+1:])
-
-    try:
-        result = method(instance, **method_args)
-        logger.info(f"Result of {service_name}.{method_name}: {result}")
-        
-        # Save the result to the database
-        save_result(command, account_alias, service_name, method_name, result)
-        logger.info(f"Data saved for {service_name}.{method_name}")
-    except Exception as e:
-        logger.error(f"Error executing {service_name}.{method_name}: {str(e)}")
-
 def main():
     global commands_data, service_config, classes_and_objects, aliases, converters
 
-    commands_data = load_yaml(COMMANDS_YAML_PATH)
-    service_config = load_yaml(PRIVATE_YAML_PATH)
+    init_db()
+    commands_data = load_yaml(COMMANDS_YAML_PATH, validate_commands_config)
+    service_config = load_yaml(PRIVATE_YAML_PATH, validate_service_config)
 
-    logger.debug(f"Service config: {service_config}")
+    # Account names only: the settings hold credentials and can be large
+    logger.debug(f"Service accounts: {', '.join(service_config)}")
+    service_pool.sync_config(service_config)
 
     classes_and_objects = list_classes_and_objects()
 
     logger.info("Available modules and methods:")
-    for class_name, class_info in classes_and_objects.items():
+    for class_name, methods in classes_and_objects.describe().items():
         logger.info(f"\nClass: {class_name}")
         logger.info("  Methods:")
-        for method_name, method_obj in class_info['methods'].items():
+        for method_name, signature in methods.items():
             logger.info(f"    - {method_name}")
-            logger.info(f"      {inspect.signature(method_obj)}")
+            logger.info(f"      {signature}")
 
     aliases = commands_data['commands']['python'].get('alias', {})
     converters = commands_data['commands']['python'].get('convert', {}).get('param', {})
     
-    # Create json_result view
+    # Create json_result view and the extracted-field tables
     create_json_result_view()
+    configure_extracted_fields(commands_data['commands']['python'].get('extract'))
+    configure_command_cache(commands_data['commands']['python'].get('cache'))
+    configure_result_logging(commands_data['commands']['python'].get('log_results'))
 
     # Process scheduled tasks
     scheduled_tasks = commands_data['commands']['python'].get('schedule', [])
     process_scheduled_tasks(scheduled_tasks)
 
     logger.info("\nExecuting commands:")
+    compiler = CommandCompiler(aliases, converters, classes_and_objects, service_config)
+    plans = []
     for command in commands_data['commands']['python']['sentence']:
-        replaced_command = replace_aliases(command, aliases, converters)
+        plan = compiler.compile(command)
         logger.info(f"\nRUN: {command}")
-        if replaced_command != command:
-            logger.info(f"Replaced: {replaced_command}")
-        execute_command(replaced_command, classes_and_objects, service_config)
+        if ASYNC_MODE or PARALLEL_MODE:
+            plans.append(plan)
+        else:
+            execute_plan(plan, classes_and_objects, service_config)
+
+    if ASYNC_MODE:
+        asyncio.run(run_commands_async(plans, classes_and_objects, service_config, async_execute_plan))
+    elif PARALLEL_MODE:
+        run_commands_parallel(plans, classes_and_objects, service_config, execute_plan)
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == 'daemon':
+        serve(COMMANDS_YAML_PATH, PRIVATE_YAML_PATH)
+    elif len(sys.argv) > 2 and sys.argv[1] == 'send':
+        sys.exit(send_command(' '.join(sys.argv[2:])))
+    else:
+        main()
 
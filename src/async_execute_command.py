@@ -0,0 +1,85 @@
+import time
+import asyncio
+import inspect
+import logging
+from src.execute_command import (execute_data_command, resolve_service_call, output_result, serve_cached_result,
+                                 log_replaced, take_where)
+from src.sentence_options import split_options
+from src.single_flight import call_service_async
+from src.result_logging import log_result
+from src.save_result import serialize_result
+from runnerdb import save_result
+
+logger = logging.getLogger(__name__)
+
+async def call_service_method(method, instance, method_args):
+    """Await a service method, running plain sync methods in the loop's default executor.
+
+    asyncio.to_thread carries the context variables over, so whatever the
+    method prints still goes to the output capture of its sentence.
+    """
+    if inspect.iscoroutinefunction(method):
+        return await method(instance, **method_args)
+    return await asyncio.to_thread(method, instance, **method_args)
+
+async def async_execute_command(command, classes_and_objects, service_config):
+    """Async variant of execute_command.
+
+    SQL, filter and print value sentences and the database writes run in a
+    worker thread; service methods are awaited directly when they are
+    coroutines and wrapped in the executor otherwise.
+    """
+    logger.info(f"Executing command: {command}")
+
+    if await asyncio.to_thread(execute_data_command, command):
+        return
+
+    # Resolving may construct a pooled instance, which can do blocking I/O
+    call = await asyncio.to_thread(resolve_service_call, command, classes_and_objects, service_config)
+    if call is None:
+        return
+
+    await run_service_call_async(command, call, split_options(command)[1])
+
+async def async_execute_plan(plan, classes_and_objects, service_config):
+    """Async variant of execute_plan."""
+    if plan.method is None:
+        command = plan.render()
+        log_replaced(plan, command)
+        await async_execute_command(command, classes_and_objects, service_config)
+        return
+    # Binding may construct a pooled instance, which can do blocking I/O
+    command, call = await asyncio.to_thread(plan.bind)
+    log_replaced(plan, command)
+    logger.info(f"Executing command: {command}")
+    if call is not None:
+        await run_service_call_async(command, call, plan.options)
+
+async def run_service_call_async(command, call, options):
+    """Async variant of run_service_call."""
+    call, where = take_where(command, call)
+    if call is None:
+        return
+    hit, result = await asyncio.to_thread(serve_cached_result, command, call, options)
+    if hit:
+        await asyncio.to_thread(output_result, result, options)
+        return
+
+    try:
+        started = time.monotonic()
+        result = await call_service_async(call, call_service_method)
+        duration = time.monotonic() - started
+        if where is not None:
+            result = where.filter(result)
+        # Serialized once, off the event loop, for the database and the log summary
+        text = await asyncio.to_thread(serialize_result, result)
+        # Logged before saving, so the summary is there even when the save fails
+        log_result(call.service_name, call.method_name, result, text, duration, logger)
+
+        # Save the result to the database
+        saved = await asyncio.to_thread(save_result, command, call.account_alias, call.service_name,
+                                        call.method_name, text)
+        logger.info(f"Data saved for {call.service_name}.{call.method_name} ({saved.size} bytes)")
+        await asyncio.to_thread(output_result, result, options)
+    except Exception as e:
+        logger.error(f"Error executing {call.service_name}.{call.method_name}: {str(e)}")
@@ -0,0 +1,92 @@
+import os
+import sys
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from src.parallel_executor import (build_dependency_graph, commit_turn_waiter, check_limits, OutputCapture,
+                                   PARALLEL_PER_ACCOUNT)
+from src.save_result import commit_turn
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upper bound on sentences (and thus API calls) in flight at once
+ASYNC_MAX_IN_FLIGHT = int(os.getenv('ASYNC_MAX_IN_FLIGHT', '100'))
+
+
+async def run_commands_async(commands, classes_and_objects, service_config, execute,
+                             max_in_flight=ASYNC_MAX_IN_FLIGHT, per_account=PARALLEL_PER_ACCOUNT):
+    """Run sentences as asyncio tasks following their dependency graph.
+
+    ``commands`` are sentences or CommandPlans; ``execute`` is a coroutine
+    function called as ``execute(command, classes_and_objects, service_config)``
+    with each of them (e.g. async_execute_command or async_execute_plan). Sync service
+    methods are run in a default executor sized to ``max_in_flight`` so the
+    limit applies to them as well. Printed output is emitted in sentence order.
+    Both limits must be at least 1.
+    """
+    check_limits(max_in_flight=max_in_flight, per_account=per_account)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    loop.set_default_executor(executor)
+
+    nodes = build_dependency_graph(commands, service_config)
+    stdout = OutputCapture(sys.stdout)
+    in_flight = asyncio.Semaphore(max_in_flight)
+    account_limits = {}
+    finished = {node.index: asyncio.Event() for node in nodes}
+    started = {node.index: asyncio.Event() for node in nodes}
+    # Waited on from worker threads by save_result
+    committed = {node.index: threading.Event() for node in nodes}
+    outputs = {}
+    emitted = 0
+
+    async def run_node(node):
+        nonlocal emitted
+        for index in node.depends_on:
+            await finished[index].wait()
+        # Earlier writers of the same result hold their slots before this one asks for any
+        for index in node.commit_after:
+            await started[index].wait()
+        commit_turn.set(commit_turn_waiter(node, committed))
+
+        account_limit = None
+        if node.account_alias:
+            account_limit = account_limits.setdefault(node.account_alias, asyncio.Semaphore(per_account))
+
+        with stdout.capture() as buffer:
+            # Take the account slot first so waiting sentences do not hold in-flight slots
+            if account_limit:
+                await account_limit.acquire()
+            try:
+                async with in_flight:
+                    started[node.index].set()
+                    await execute(node.command, classes_and_objects, service_config)
+            except Exception as e:
+                logger.error(f"Error executing command '{node.sentence}': {str(e)}")
+            finally:
+                started[node.index].set()
+                committed[node.index].set()
+                if account_limit:
+                    account_limit.release()
+        outputs[node.index] = buffer.getvalue()
+        finished[node.index].set()
+
+        # Flush output of every finished sentence whose predecessors are flushed
+        while emitted in outputs:
+            stdout.target.write(outputs.pop(emitted))
+            emitted += 1
+
+    original_stdout = sys.stdout
+    sys.stdout = stdout
+    try:
+        await asyncio.gather(*(run_node(node) for node in nodes))
+    finally:
+        sys.stdout = original_stdout
+        executor.shutdown(wait=False)
+    original_stdout.flush()
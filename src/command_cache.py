@@ -0,0 +1,118 @@
+import re
+import time
+import logging
+import threading
+from src.db_connection import get_connection
+from src.result_writer import wait_for_pending_writes
+from src.sentence_options import split_options
+
+# Configure logging
+logger = logging.getLogger(__name__)
+QUERY_RESULTS_TABLE = "query"
+
+# Methods that change something; their sentences always call the service.
+# commands.yaml can add to these under commands.python.cache.never.
+DEFAULT_NEVER_CACHED = {
+    'create_issue',
+    'purge_cache',
+    'send_email',
+    'send_email_with_attachments',
+    'send_html_email',
+    'send_bulk_email',
+    'create_database',
+    'generate_plesk_api_key',
+    'download_attachments',
+    'delete_emails_with_filters',
+    'remove_files_with_filters',
+}
+# Stored rows of a method looked at when searching for the same sentence
+CACHE_CANDIDATE_ROWS = 20
+
+_DURATION_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$', re.IGNORECASE)
+_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_ttls = {}
+_never_cached = set(DEFAULT_NEVER_CACHED)
+_lock = threading.Lock()
+
+
+def parse_duration(text):
+    """Return the seconds in ``90``, ``30s``, ``10m``, ``2h`` or ``1d``; ``off`` is 0."""
+    if isinstance(text, (int, float)):
+        return float(text)
+    if str(text).strip().lower() in ('off', 'no', 'false'):
+        return 0.0
+    match = _DURATION_PATTERN.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid duration: {text}")
+    return float(match.group(1)) * _UNITS[match.group(2).lower()]
+
+
+def configure_command_cache(declarations=None):
+    """Register the cache lifetimes from commands.yaml.
+
+    ``declarations`` maps ``"Service.method"`` (or ``default``) to a duration
+    such as ``10m``, and ``never`` to a list of ``method`` or
+    ``"Service.method"`` names that are never served from the cache.
+    """
+    declarations = dict(declarations or {})
+    never = set(DEFAULT_NEVER_CACHED) | set(declarations.pop('never', None) or ())
+    ttls = {}
+    for key, duration in declarations.items():
+        ttls[key] = parse_duration(duration)
+
+    with _lock:
+        _ttls.clear()
+        _ttls.update(ttls)
+        _never_cached.clear()
+        _never_cached.update(never)
+    return ttls
+
+
+def is_cacheable(service_name, method_name):
+    with _lock:
+        return method_name not in _never_cached and f"{service_name}.{method_name}" not in _never_cached
+
+
+def cache_ttl(service_name, method_name, options=None):
+    """Seconds a stored result of this sentence may be served instead of calling the service.
+
+    A ``cache=`` sentence option wins over the commands.yaml entry for the
+    method, which wins over ``default``. Never-cached methods return 0.
+    """
+    options = options or {}
+    if 'cache' in options:
+        ttl = parse_duration(options['cache'])
+    else:
+        with _lock:
+            ttl = _ttls.get(f"{service_name}.{method_name}", _ttls.get('default', 0))
+    if ttl and not is_cacheable(service_name, method_name):
+        if 'cache' in options:
+            logger.warning(f"{service_name}.{method_name} changes data and is never served from the cache")
+        return 0
+    return ttl
+
+
+def find_cached_result(command, account_alias, service_name, method_name, ttl):
+    """Return ``(query_id, blob_id, age)`` of a stored result of the same sentence on the
+    same account newer than ``ttl`` seconds, or None.
+
+    Sentences are compared without their ``-- key=value`` options, so
+    changing e.g. ``format=`` still finds the result.
+    """
+    if not ttl:
+        return None
+    wait_for_pending_writes()
+    now_ns = time.time_ns()
+    sentence = split_options(command)[0].strip()
+    rows = get_connection().execute(f'''
+    SELECT id, blob_id, command, created_at_ns FROM {QUERY_RESULTS_TABLE}
+    WHERE service_name = ? AND method_name = ? AND created_at_ns >= ?
+      AND name = ? AND source_query_id IS NULL
+    ORDER BY created_at_ns DESC, id DESC
+    LIMIT {CACHE_CANDIDATE_ROWS}
+    ''', (service_name, method_name, now_ns - int(ttl * 1000000000), account_alias))
+    for query_id, blob_id, stored_command, created_at_ns in rows:
+        if stored_command is not None and split_options(stored_command)[0].strip() == sentence:
+            return query_id, blob_id, (now_ns - created_at_ns) / 1000000000
+    return None
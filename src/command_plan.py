@@ -0,0 +1,209 @@
+import re
+import shlex
+import logging
+import threading
+from src.sentence_options import split_options
+from src.parse_command_args import parse_command_args
+from src.get_function_from_string import get_function_from_string
+from src.service_pool import service_pool
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Stands in for a converter value until the plan is run, e.g. "from_date=\x00convert0\x00"
+_CONVERTER_PLACEHOLDER = re.compile('\x00convert(\\d+)\x00')
+
+
+def _placeholder(index):
+    return f"\x00convert{index}\x00"
+
+
+class CommandPlan:
+    """A sentence compiled once per configuration load.
+
+    Holds the alias-replaced sentence with converter calls left as
+    placeholders, its ``-- key=value`` options and, for service sentences,
+    the resolved account, service class, method and parsed arguments.
+    Converters (e.g. ``today``) are called each time the plan is run, so a
+    cached plan never goes stale. ``kind`` is ``sql``, ``data`` (filter and
+    print value) or ``service``; a service sentence that could not be
+    resolved has ``method`` None and is left to execute_command, which
+    reports why.
+    """
+
+    __slots__ = ('sentence', 'kind', 'template', 'options', 'converters',
+                 'account_alias', 'service_name', 'method_name', 'service_class',
+                 'constructor_args', 'method', 'args')
+
+    def __init__(self, sentence, kind, template, options, converters=(), account_alias=None,
+                 service_name=None, method_name=None, service_class=None, constructor_args=None,
+                 method=None, args=()):
+        set_attribute = object.__setattr__
+        set_attribute(self, 'sentence', sentence)
+        set_attribute(self, 'kind', kind)
+        set_attribute(self, 'template', template)
+        set_attribute(self, 'options', dict(options))
+        set_attribute(self, 'converters', tuple(converters))
+        set_attribute(self, 'account_alias', account_alias)
+        set_attribute(self, 'service_name', service_name)
+        set_attribute(self, 'method_name', method_name)
+        set_attribute(self, 'service_class', service_class)
+        set_attribute(self, 'constructor_args', constructor_args)
+        set_attribute(self, 'method', method)
+        set_attribute(self, 'args', tuple(args))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CommandPlan is immutable")
+
+    def _converted(self):
+        return [str(converter()) for converter in self.converters]
+
+    @staticmethod
+    def _fill(text, values):
+        if not values or '\x00' not in text:
+            return text
+        return _CONVERTER_PLACEHOLDER.sub(lambda match: values[int(match.group(1))], text)
+
+    def render(self, values=None):
+        """Return the sentence as execute_command sees and stores it (what replace_aliases returned)."""
+        values = self._converted() if values is None else values
+        return self._fill(self.template, values)
+
+    def bind(self):
+        """Return ``(command, ServiceCall)`` with converters applied, or ``(command, None)``
+        if the pooled service instance cannot be created."""
+        from src.execute_command import ServiceCall
+        values = self._converted()
+        command = self.render(values)
+        try:
+            instance = service_pool.get(self.account_alias, self.service_class, self.constructor_args)
+        except TypeError as e:
+            logger.error(f"Error creating {self.service_name} instance: {str(e)}")
+            return command, None
+        method_args = {key: self._fill(value, values) if isinstance(value, str) else value
+                       for key, value in self.args}
+        return command, ServiceCall(self.account_alias, self.service_name, self.method_name,
+                                    instance, self.method, method_args)
+
+    def __repr__(self):
+        return f"CommandPlan({self.kind}: {self.render()!r})"
+
+
+class CommandCompiler:
+    """Compiles sentences into CommandPlans and keeps them for the life of one configuration.
+
+    Build a new compiler whenever commands.yaml or the service configuration
+    is reloaded. Converter functions are imported once, on first use.
+    """
+
+    def __init__(self, aliases=None, converters=None, classes_and_objects=None, service_config=None):
+        self.aliases = aliases or {}
+        self.converter_names = converters or {}
+        self.classes_and_objects = classes_and_objects
+        self.service_config = service_config
+        self._converter_functions = {}
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def converter(self, name):
+        function = self._converter_functions.get(name)
+        if function is None:
+            function = self._converter_functions[name] = get_function_from_string(self.converter_names[name])
+        return function
+
+    def updated(self, aliases=None, converters=None, classes_and_objects=None, service_config=None,
+                changed_accounts=(), changed_services=()):
+        """Return a compiler for a reloaded configuration, keeping the plans it does not affect.
+
+        Everything is recompiled when aliases or converters changed. Otherwise
+        service plans are dropped if they mention a changed, added or removed
+        account, use a changed service class, or could not be resolved before.
+        """
+        compiler = CommandCompiler(aliases, converters, classes_and_objects, service_config)
+        if compiler.aliases != self.aliases or compiler.converter_names != self.converter_names:
+            return compiler
+        changed_accounts = set(changed_accounts)
+        changed_services = set(changed_services)
+        compiler._converter_functions = dict(self._converter_functions)
+        with self._lock:
+            plans = list(self._plans.items())
+        for sentence, plan in plans:
+            if plan.kind == 'service' and (plan.method is None or plan.service_name in changed_services
+                                           or changed_accounts.intersection(plan.template.split())):
+                continue
+            compiler._plans[sentence] = plan
+        logger.debug(f"Kept {len(compiler._plans)} of {len(plans)} compiled plans")
+        return compiler
+
+    def compile(self, sentence):
+        """Return the (cached) CommandPlan of a sentence."""
+        plan = self._plans.get(sentence)
+        if plan is None:
+            plan = self._compile(sentence)
+            with self._lock:
+                plan = self._plans.setdefault(sentence, plan)
+        return plan
+
+    def _compile(self, sentence):
+        text, options = split_options(sentence)
+        if text.strip().upper().startswith('SELECT'):
+            # SQL is passed through untouched (alias replacement would drop its quotes)
+            return CommandPlan(sentence, 'sql', sentence, options)
+        suffix = ' --' + ''.join(f" {key}={value}" for key, value in options.items()) if options else ''
+
+        param_aliases = self.aliases.get('param', {})
+        action_aliases = self.aliases.get('action', {})
+        parts = []
+        converters = []
+        for part in shlex.split(text):
+            if '=' in part:
+                key, value = part.split('=', 1)
+                if value in self.converter_names:
+                    converters.append(self.converter(value))
+                    value = _placeholder(len(converters) - 1)
+                parts.append(f"{param_aliases.get(key, key)}={value}")
+            else:
+                parts.append(action_aliases.get(part.lower(), part))
+        template = ' '.join(parts)
+
+        # Same reading of the replaced sentence as execute_command
+        try:
+            words = shlex.split(template)
+        except ValueError:
+            return CommandPlan(sentence, 'service', template + suffix, options, converters)
+        if len(words) < 2 or words[0].lower() == 'filter' or (words[0].lower() == 'print' and words[1] == 'value'):
+            return CommandPlan(sentence, 'data', template + suffix, options, converters)
+        resolved = self._resolve(words)
+        if resolved is None:
+            return CommandPlan(sentence, 'service', template + suffix, options, converters)
+        return CommandPlan(sentence, 'service', template + suffix, options, converters, **resolved)
+
+    def _resolve(self, words):
+        if self.service_config is None or self.classes_and_objects is None:
+            return None
+        method_parts = []
+        account_alias = None
+        for word in words:
+            if word in self.service_config:
+                account_alias = word
+                break
+            method_parts.append(word)
+        if not account_alias:
+            return None
+        service_info = self.service_config[account_alias]
+        service_name = service_info['service']
+        method_name = '_'.join(method_parts).lower()
+        if service_name not in self.classes_and_objects:
+            return None
+        methods = self.classes_and_objects[service_name]['methods']
+        if method_name not in methods:
+            return None
+        return {
+            'account_alias': account_alias,
+            'service_name': service_name,
+            'method_name': method_name,
+            'service_class': self.classes_and_objects[service_name]['class'],
+            'constructor_args': {k: v for k, v in service_info.items() if k != 'service'},
+            'method': methods[method_name],
+            'args': parse_command_args(words[len(method_parts) + 1:]).items(),
+        }
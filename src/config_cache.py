@@ -0,0 +1,319 @@
+import os
+import sys
+import time
+import ctypes
+import marshal
+import select
+import struct
+import hashlib
+import logging
+import threading
+import yaml
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Directory for parsed configuration files (empty disables the on-disk cache)
+CONFIG_CACHE_DIR = os.getenv('CONFIG_CACHE_DIR', '.config_cache')
+CACHE_VERSION = 2
+# libyaml's C loader when PyYAML was built with it, the pure-Python one otherwise
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Parsed files of this process by absolute path: (mtime_ns, size, sha1, marshalled data)
+_loaded = {}
+_lock = threading.Lock()
+
+
+def _file_sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def _cache_path(path):
+    return os.path.join(CONFIG_CACHE_DIR, hashlib.sha1(path.encode('utf-8')).hexdigest()[:16] + '.marshal')
+
+
+def _is_private(path):
+    """True if ``path`` belongs to this user and nobody else can write to it."""
+    stat = os.stat(path)
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def _read_cache(path):
+    if not CONFIG_CACHE_DIR:
+        return None
+    cache_path = _cache_path(path)
+    try:
+        # Someone who can replace the cache can change the configuration
+        if not (_is_private(CONFIG_CACHE_DIR) and _is_private(cache_path)):
+            logger.warning(f"Ignoring config cache {cache_path}: not private to this user")
+            return None
+        with open(cache_path, 'rb') as file:
+            entry = marshal.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        logger.debug(f"Ignoring unreadable config cache for {path}: {e}")
+        return None
+    if not isinstance(entry, tuple) or len(entry) != 6 or entry[0] != CACHE_VERSION or entry[1] != path:
+        return None
+    return entry[2:]
+
+
+def _write_cache(path, mtime_ns, size, sha1, payload):
+    if not CONFIG_CACHE_DIR:
+        return
+    cache_path = _cache_path(path)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CONFIG_CACHE_DIR, mode=0o700, exist_ok=True)
+        if not _is_private(CONFIG_CACHE_DIR):
+            logger.warning(f"Not writing config cache: {CONFIG_CACHE_DIR} is not private to this user")
+            return
+        # The cache holds the private service configuration too
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as file:
+            marshal.dump((CACHE_VERSION, path, mtime_ns, size, sha1, payload), file)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write config cache {cache_path}: {e}")
+
+
+def _encode(data):
+    """Return the marshal bytes of parsed YAML, or None for types marshal cannot hold (e.g. dates)."""
+    try:
+        return marshal.dumps(data)
+    except ValueError:
+        return None
+
+
+def load_config(file_path, validate=None):
+    """Return the parsed content of a YAML file, parsing it only when it changed.
+
+    Parsed files are kept in memory and, marshalled, in CONFIG_CACHE_DIR, keyed
+    on the file's mtime and size; when those change the content hash decides
+    whether the file has to be parsed again. Every call returns a fresh copy.
+    marshal (unlike pickle) cannot run code on load, and cache files are only
+    read from a directory owned by and private to the current user.
+    ``validate(data)`` is called on the result and may raise ValueError.
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    with _lock:
+        memo = _loaded.get(path)
+    if memo and memo[:2] == (stat.st_mtime_ns, stat.st_size):
+        payload = memo[3]
+    else:
+        cached = _read_cache(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            sha1, payload = cached[2:]
+        else:
+            with open(path, 'rb') as file:
+                content = file.read()
+            sha1 = _file_sha1(content)
+            if cached and cached[2] == sha1:
+                payload = cached[3]
+            else:
+                logger.debug(f"Parsing YAML file: {file_path}")
+                data = yaml.load(content, Loader=YAML_LOADER)
+                payload = _encode(data)
+                if payload is None:
+                    # Values marshal cannot hold (e.g. YAML dates): parsed again on every load
+                    logger.debug(f"Not caching {file_path}: contains values marshal cannot store")
+                    if validate is not None:
+                        validate(data)
+                    return data
+            _write_cache(path, stat.st_mtime_ns, stat.st_size, sha1, payload)
+        with _lock:
+            _loaded[path] = (stat.st_mtime_ns, stat.st_size, sha1, payload)
+
+    data = marshal.loads(payload)
+    if validate is not None:
+        validate(data)
+    return data
+
+
+def config_fingerprint(file_path):
+    """Return the content hash of a file, reusing the last load's hash if it looks unchanged."""
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    with _lock:
+        memo = _loaded.get(path)
+    if memo and memo[:2] == (stat.st_mtime_ns, stat.st_size):
+        return memo[2]
+    with open(path, 'rb') as file:
+        return _file_sha1(file.read())
+
+
+def validate_commands_config(data):
+    """Check the parts of commands.yaml the runner relies on."""
+    if not isinstance(data, dict) or not isinstance(data.get('commands'), dict):
+        raise ValueError("commands.yaml must contain a 'commands' mapping")
+    python_commands = data['commands'].get('python')
+    if not isinstance(python_commands, dict):
+        raise ValueError("commands.yaml must contain a 'commands.python' mapping")
+    for key in ('sentence', 'schedule'):
+        if not isinstance(python_commands.get(key) or [], list):
+            raise ValueError(f"commands.python.{key} must be a list")
+    for key in ('alias', 'convert', 'extract', 'retention', 'cache', 'log_results'):
+        if not isinstance(python_commands.get(key) or {}, dict):
+            raise ValueError(f"commands.python.{key} must be a mapping")
+
+
+def validate_service_config(data):
+    """Check that every account in private.yaml names its service."""
+    if not isinstance(data, dict):
+        raise ValueError("The service configuration must be a mapping of account aliases")
+    for alias, settings in data.items():
+        if not isinstance(settings, dict) or 'service' not in settings:
+            raise ValueError(f"Account '{alias}' must be a mapping with a 'service' key")
+
+
+class _Inotify:
+    """Minimal inotify(7) binding through ctypes; raises OSError where unavailable."""
+
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    # Editors either write in place or rename a temporary file over the original
+    EVENTS = 0x008 | 0x040 | 0x080 | 0x100 | 0x200  # CLOSE_WRITE, MOVED_FROM, MOVED_TO, CREATE, DELETE
+    _EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+
+    def add_directory(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.EVENTS)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.directories[wd] = directory
+
+    def read_paths(self):
+        """Return the paths named by the pending events (without blocking)."""
+        paths = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return paths
+            offset = 0
+            while offset < len(data):
+                wd, _mask, _cookie, length = self._EVENT_HEADER.unpack_from(data, offset)
+                offset += self._EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if wd in self.directories and name:
+                    paths.append(os.path.join(self.directories[wd], os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """Calls ``callback(changed_paths)`` when the content of watched files changes.
+
+    ``poll()`` only stats the files; a file whose mtime or size moved is
+    hashed, so touching a file without editing it does not trigger a reload.
+    ``directories`` are watched for added, removed or rewritten ``.py`` files
+    (the plugin manifest works out which modules really changed).
+    ``wait(timeout)`` sleeps until inotify reports a relevant event, or for
+    the whole timeout where inotify is unavailable, and then polls.
+    """
+
+    def __init__(self, paths, callback, directories=(), use_inotify=True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.callback = callback
+        self._seen = {path: self._state(path) for path in self.paths}
+        self._seen.update({directory: self._directory_state(directory) for directory in self.directories})
+        self._inotify = None
+        if use_inotify:
+            try:
+                inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.debug(f"Watching configuration by polling: {e}")
+            else:
+                try:
+                    watched = {os.path.dirname(path) for path in self.paths} | set(self.directories)
+                    for directory in sorted(watched):
+                        inotify.add_directory(directory)
+                    self._inotify = inotify
+                except OSError as e:
+                    logger.debug(f"Watching configuration by polling: {e}")
+                    inotify.close()
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    @staticmethod
+    def _state(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, config_fingerprint(path)
+
+    @staticmethod
+    def _directory_state(directory):
+        try:
+            entries = [entry for entry in os.scandir(directory) if entry.name.endswith('.py')]
+        except FileNotFoundError:
+            return None
+        return tuple(sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size) for entry in entries))
+
+    def _is_relevant(self, path):
+        return path in self._seen or (path.endswith('.py') and os.path.dirname(path) in self.directories)
+
+    def poll(self):
+        """Check the files once; return the changed paths (after calling the callback)."""
+        changed = []
+        for path in self.paths:
+            seen = self._seen.get(path)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if seen is not None and stat is not None and seen[:2] == (stat.st_mtime_ns, stat.st_size):
+                continue
+            state = self._state(path)
+            self._seen[path] = state
+            if (seen and seen[2]) != (state and state[2]):
+                changed.append(path)
+        for directory in self.directories:
+            state = self._directory_state(directory)
+            if state != self._seen.get(directory):
+                self._seen[directory] = state
+                changed.append(directory)
+        if changed:
+            logger.info(f"Configuration changed: {', '.join(changed)}")
+            self.callback(changed)
+        return changed
+
+    def wait(self, timeout):
+        """Block for up to ``timeout`` seconds or until a watched file changes, then poll."""
+        if self._inotify is None:
+            time.sleep(timeout)
+            return self.poll()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self._inotify.fd], [], [], remaining)
+            if ready and any(self._is_relevant(path) for path in self._inotify.read_paths()):
+                break
+        return self.poll()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
@@ -1,18 +1,43 @@
 import sqlite3
 import logging
-from runnerdb import DB_PATH
+from src.db_connection import register_connection_hook
+from src.result_blobs import register_sql_functions
 
 logger = logging.getLogger(__name__)
 
-def create_json_result_view():
-    """Create the json_result view if it doesn't exist."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+_registered = False
+
+# Results are rebuilt from their (possibly compressed or delta-encoded) blob
+# and reference rows written by filter are expanded from the elements they select
+_VIEW_SQL = '''
+CREATE TEMP VIEW IF NOT EXISTS json_result AS
+SELECT q.id, q.command, q.service_name, q.method_name, q.timestamp, q.result_hash,
+       CASE WHEN q.source_query_id IS NULL THEN blob_json(q.blob_id) ELSE (
+           SELECT json_group_array(json(element)) FROM (
+               SELECT i.element FROM query_item i
+               JOIN query_ref r ON r.query_id = q.id AND r.item_index = i.item_index
+               WHERE i.query_id = q.source_query_id
+               ORDER BY i.item_index
+           )
+       ) END AS result
+FROM query q
+'''
+
+def _create_view(conn):
     try:
-        cursor.execute("CREATE TEMP VIEW IF NOT EXISTS json_result AS SELECT id, result FROM query")
-        conn.commit()
-        logger.info("Created json_result view")
+        with conn:
+            conn.execute(_VIEW_SQL)
     except sqlite3.Error as e:
         logger.error(f"Error creating json_result view: {e}")
-    finally:
-        conn.close()
+
+def create_json_result_view():
+    """Create the json_result view on every managed connection.
+
+    The view is a TEMP view, so it is created on each connection as it opens.
+    """
+    global _registered
+    if not _registered:
+        _registered = True
+        register_sql_functions()
+        register_connection_hook(_create_view)
+        logger.info("Created json_result view")
@@ -0,0 +1,110 @@
+import os
+import atexit
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Get the database path from the environment variable
+DB_PATH = os.getenv('SQLITE_DB_PATH', 'runner.db')
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))
+
+_local = threading.local()
+# (owning thread, connection) pairs; connections of finished threads are closed lazily
+_open_connections = []
+_connection_hooks = []
+_lock = threading.Lock()
+# Bumped by close_connections so other threads drop their closed connections
+_generation = 0
+
+
+def register_connection_hook(hook):
+    """Call ``hook(conn)`` on every connection opened from now on and on the open ones."""
+    with _lock:
+        _connection_hooks.append(hook)
+        connections = [conn for _, conn in _open_connections]
+    for conn in connections:
+        hook(conn)
+
+
+def _open_connection(db_path, readonly=False):
+    if readonly:
+        # SQLite itself rejects writes on this connection
+        uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        # Only takes effect on a new database (before WAL writes its header); lets
+        # retention return freed pages with PRAGMA incremental_vacuum
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    with _lock:
+        hooks = list(_connection_hooks)
+        stale = [entry for entry in _open_connections if not entry[0].is_alive()]
+        for entry in stale:
+            _open_connections.remove(entry)
+        _open_connections.append((threading.current_thread(), conn))
+    for _, stale_conn in stale:
+        stale_conn.close()
+    for hook in hooks:
+        hook(conn)
+    mode = 'read-only ' if readonly else ''
+    logger.debug(f"Opened {mode}SQLite connection to {db_path} in {threading.current_thread().name}")
+    return conn
+
+
+def get_connection(db_path=None, readonly=False):
+    """Return this thread's connection to the database, opening it on first use.
+
+    ``readonly=True`` returns a separate connection opened with ``mode=ro``.
+    """
+    db_path = db_path or DB_PATH
+    connections = getattr(_local, 'connections', None)
+    if connections is None or _local.generation != _generation:
+        connections = _local.connections = {}
+        _local.generation = _generation
+    conn = connections.get((db_path, readonly))
+    if conn is None:
+        conn = connections[(db_path, readonly)] = _open_connection(db_path, readonly)
+    return conn
+
+
+@contextmanager
+def transaction(db_path=None):
+    """Yield a cursor inside a transaction that commits on success and rolls back on error."""
+    conn = get_connection(db_path)
+    with conn:
+        yield conn.cursor()
+
+
+def close_connections():
+    """Close every connection opened by the manager, in all threads."""
+    global _generation
+    with _lock:
+        connections = [conn for _, conn in _open_connections]
+        _open_connections.clear()
+        _generation += 1
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.debug(f"Error closing SQLite connection: {e}")
+
+
+atexit.register(close_connections)
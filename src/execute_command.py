@@ -1,64 +1,164 @@
-import logging
+import re
+import time
 import shlex
-from src.execute_sql_query import execute_sql_query
-from src.filter_data import filter_data
+import sqlite3
+import logging
+from collections import namedtuple
+from src.execute_sql_query import stream_sql_query, SQL_FETCH_SIZE, SQL_TIME_BUDGET
+from src.sentence_options import split_options
+from src.output_formats import OUTPUT_SERVICE_RESULTS, write_rows, write_items
 from src.print_value import print_value
 from src.parse_command_args import parse_command_args
+from src.service_pool import service_pool
+from src.filter_expression import FilterSyntaxError, compile_filter, equality_filter, where_filter
+from src.sql_filter import filter_latest_result, select_latest_values
+from src.command_cache import cache_ttl, find_cached_result
+from src.single_flight import call_service
+from src.get_latest_result import load_result
+from src.db_connection import get_connection
+from src.result_logging import log_result
+from src.save_result import serialize_result
 from runnerdb import save_result, get_latest_result
 
 logger = logging.getLogger(__name__)
 
-def execute_command(command, classes_and_objects, service_config):
-    logger.info(f"Executing command: {command}")
-    
-    # Check if the command is a SQL query
-    if command.strip().upper().startswith("SELECT"):
-        column_names, results = execute_sql_query(command)
-        if column_names and results:
-            # Print column names
-            print(" | ".join(column_names))
-            print("-" * (sum(len(name) for name in column_names) + 3 * (len(column_names) - 1)))
-            # Print results
-            for row in results:
-                print(" | ".join(str(value) for value in row))
-            logger.info(f"SQL query results printed")
-        else:
+# print value <key> where <filter expression> from <Service_method>
+PRINT_VALUE_PATTERN = re.compile(
+    r'\s*print\s+value\s+(?P<key>\S+)\s+where\s+(?P<filter>.+?)\s+from\s+(?P<data>\S+)\s*$', re.IGNORECASE)
+FILTER_OPERATOR_PATTERN = re.compile(r'[=<>~^(]')
+# Words that make "filter Service_method key <word>" an expression rather than "key value"
+FILTER_OPERATORS = {'=', '!=', '<', '<=', '>', '>=', '~=', '^=', 'in'}
+
+ServiceCall = namedtuple('ServiceCall', 'account_alias service_name method_name instance method method_args')
+
+def parse_filter_sentence(command, parts):
+    """Compile the filter of ``filter Service_method key value`` or ``filter Service_method <expression>``.
+
+    Four words are the ``key value`` form whatever characters the value holds,
+    unless the key is not a plain name or the value is an operator.
+    Returns None (after logging) when the expression is invalid.
+    """
+    try:
+        if (len(parts) == 4 and parts[2].lower() != 'not' and not FILTER_OPERATOR_PATTERN.search(parts[2])
+                and parts[3].lower() not in FILTER_OPERATORS):
+            return equality_filter(parts[2], parts[3])
+        return compile_filter(command.split(None, 2)[2])
+    except (IndexError, FilterSyntaxError) as e:
+        logger.error(f"Invalid filter in command '{command}': {e}")
+        return None
+
+def run_sql_sentence(query, options=None, output=None):
+    """Stream the rows of a SELECT sentence to the chosen output as they are fetched.
+
+    Options (a trailing ``-- key=value`` block): ``key=<column> page=<rows>``
+    reads the query in keyset pages, ``timeout=<seconds>`` overrides
+    SQL_TIME_BUDGET, ``fetch=<rows>`` overrides SQL_FETCH_SIZE, and
+    ``format=`` / ``file=`` select the output (see output_formats).
+    """
+    options = options or {}
+    try:
+        rows = stream_sql_query(
+            query,
+            chunk_size=int(options.get('fetch', SQL_FETCH_SIZE)),
+            time_budget=float(options.get('timeout', SQL_TIME_BUDGET)),
+            key=options.get('key'),
+            page_size=int(options['page']) if 'page' in options else None,
+        )
+    except (sqlite3.Error, ValueError) as e:
+        logger.error(f"SQL error: {e}")
+        return
+
+    try:
+        if rows.start() is None:
             logger.warning("No results returned from SQL query")
+            return
+        count = write_rows(rows.column_names, rows, options.get('format'), options.get('file'), output)
+        logger.info(f"SQL query results printed ({count} rows)")
+    except (sqlite3.Error, ValueError, OSError) as e:
+        logger.error(f"SQL error: {e}")
+    finally:
+        rows.close()
+
+def output_result(result, options, output=None):
+    """Write a service result if the sentence asks for it (format=/file=) or OUTPUT_SERVICE_RESULTS is set."""
+    if not (OUTPUT_SERVICE_RESULTS or 'format' in options or 'file' in options):
         return
+    try:
+        write_items(result, options.get('format'), options.get('file'), output)
+    except (ValueError, OSError) as e:
+        logger.error(f"Error writing result: {e}")
+
+def execute_data_command(command):
+    """Run SQL, filter and print value sentences. Return True if the command was handled."""
+    command, options = split_options(command)
+    # Check if the command is a SQL query
+    if command.strip().upper().startswith("SELECT"):
+        run_sql_sentence(command, options)
+        return True
 
     parts = shlex.split(command)
     if len(parts) < 2:
         logger.error(f"Invalid command format: {command}")
-        return
+        return True
 
     action = parts[0].lower()
     if action == 'filter':
         # Handle filter command
         data_key = parts[1]
-        filter_key = parts[2]
-        filter_value = parts[3]
         service_name, method_name = data_key.split('_', 1)
+        expression = parse_filter_sentence(command, parts)
+        if expression is None:
+            return True
+        # List results are filtered in SQL and saved as references to the matches
+        filtered = filter_latest_result(command, service_name, method_name, expression)
+        if filtered is not None:
+            logger.info(f"Filtered data saved for '{data_key}' ({filtered[1]} matches)")
+            return True
         data = get_latest_result(service_name, method_name)
         if data:
-            filtered_data = filter_data(data, filter_key, filter_value)
+            filtered_data = expression.filter(data)
             save_result(command, 'name', service_name, method_name, filtered_data)
             logger.info(f"Filtered data saved for '{data_key}'")
         else:
             logger.error(f"No data found with key '{data_key}'")
-        return
+        return True
     elif action == 'print' and parts[1] == 'value':
         # Handle print value command
-        value_key = parts[2]
-        filter_key, filter_value = parts[4].split('=')
-        service_name, method_name = parts[-1].split('_', 1)
+        match = PRINT_VALUE_PATTERN.match(command)
+        if match:
+            value_key, filter_text, data_key = match.group('key', 'filter', 'data')
+        else:
+            value_key, filter_text, data_key = parts[2], parts[4], parts[-1]
+        try:
+            expression = where_filter(filter_text)
+        except FilterSyntaxError as e:
+            logger.error(f"Invalid filter in command '{command}': {e}")
+            return True
+        service_name, method_name = data_key.split('_', 1)
+        values = select_latest_values(service_name, method_name, value_key, expression)
+        if values is not None:
+            if values:
+                for value in values:
+                    print(f"{value_key}: {value}")
+            else:
+                print(f"No data found matching the filter: {filter_text}")
+            logger.info(f"Printed value for {service_name}.{method_name}")
+            return True
         data = get_latest_result(service_name, method_name)
         if data:
-            print_value(data, value_key, filter_key, filter_value)
+            print_value(data, value_key, filter_text)
             logger.info(f"Printed value for {service_name}.{method_name}")
         else:
             logger.error(f"No data found for {service_name}_{method_name}")
-        return
+        return True
+    return False
 
+def resolve_service_call(command, classes_and_objects, service_config):
+    """Resolve a service sentence to its pooled instance, method and arguments.
+
+    Returns a ServiceCall, or None if the command cannot be resolved.
+    """
+    parts = shlex.split(split_options(command)[0])
     method_parts = []
     account_alias = None
     for part in parts:
@@ -69,7 +169,7 @@ def execute_command(command, classes_and_objects, service_config):
 
     if not account_alias:
         logger.error(f"Invalid account alias in command: {command}")
-        return
+        return None
 
     method_name = '_'.join(method_parts).lower()
     service_info = service_config[account_alias]
@@ -78,33 +178,121 @@ def execute_command(command, classes_and_objects, service_config):
 
     if service_name not in classes_and_objects:
         logger.error(f"Invalid service name: {service_name}")
-        return
+        return None
 
     service_class = classes_and_objects[service_name]['class']
     constructor_args = {k: v for k, v in service_info.items() if k != 'service'}
 
-    # Create an instance of the service
+    # Reuse the pooled instance for this account, creating it on first use
     try:
-        instance = service_class(**constructor_args)
+        instance = service_pool.get(account_alias, service_class, constructor_args)
     except TypeError as e:
         logger.error(f"Error creating {service_name} instance: {str(e)}")
-        return
+        return None
 
     if method_name not in classes_and_objects[service_name]['methods']:
         logger.error(f"Method {method_name} not found in class {service_name}.")
-        return
+        return None
 
     method = classes_and_objects[service_name]['methods'][method_name]
 
     # Parse method arguments
     method_args = parse_command_args(parts[len(method_parts)+1:])
 
+    return ServiceCall(account_alias, service_name, method_name, instance, method, method_args)
+
+def serve_cached_result(command, call, options):
+    """Return ``(True, result)`` when a fresh enough stored result can stand in for the call.
+
+    The lifetime comes from a ``cache=`` sentence option or the commands.yaml
+    ``cache`` block; methods that change data are never served this way.
+    """
+    try:
+        ttl = cache_ttl(call.service_name, call.method_name, options)
+    except ValueError as e:
+        logger.error(f"Invalid cache option in command '{command}': {e}")
+        return False, None
+    cached = find_cached_result(command, call.account_alias, call.service_name, call.method_name, ttl)
+    if cached is None:
+        return False, None
+    query_id, blob_id, age = cached
+    logger.info(f"Using stored result {query_id} of {call.service_name}.{call.method_name} ({age:.0f}s old)")
+    return True, load_result(get_connection(), query_id, None, blob_id)
+
+def execute_command(command, classes_and_objects, service_config):
+    logger.info(f"Executing command: {command}")
+
+    if execute_data_command(command):
+        return
+
+    call = resolve_service_call(command, classes_and_objects, service_config)
+    if call is None:
+        return
+    run_service_call(command, call, split_options(command)[1])
+
+def log_replaced(plan, command):
+    """Log the sentence as run when aliases or converters changed it."""
+    if command != plan.sentence:
+        logger.info(f"Replaced: {command}")
+
+def execute_plan(plan, classes_and_objects, service_config):
+    """Run a compiled CommandPlan (see command_plan); resolved service sentences skip all parsing.
+
+    Converters are called once per run, when the plan is rendered or bound.
+    """
+    if plan.method is None:
+        command = plan.render()
+        log_replaced(plan, command)
+        execute_command(command, classes_and_objects, service_config)
+        return
+    command, call = plan.bind()
+    log_replaced(plan, command)
+    logger.info(f"Executing command: {command}")
+    if call is not None:
+        run_service_call(command, call, plan.options)
+
+def take_where(command, call):
+    """Take a ``where="<expression>"`` argument off a service call and compile it.
+
+    The runner filters the returned list itself, so services never see the
+    argument. Returns ``(call, expression)`` with no expression when the
+    argument is absent, or ``(None, None)`` (after logging) when it is invalid.
+    """
+    if 'where' not in call.method_args:
+        return call, None
+    method_args = dict(call.method_args)
     try:
-        result = method(instance, **method_args)
-        logger.info(f"Result of {service_name}.{method_name}: {result}")
-        
+        expression = where_filter(str(method_args.pop('where')))
+    except FilterSyntaxError as e:
+        logger.error(f"Invalid where= filter in command '{command}': {e}")
+        return None, None
+    return call._replace(method_args=method_args), expression
+
+def run_service_call(command, call, options):
+    """Call a resolved service method (or reuse a cached result), save and output its result."""
+    call, where = take_where(command, call)
+    if call is None:
+        return
+    hit, result = serve_cached_result(command, call, options)
+    if hit:
+        output_result(result, options)
+        return
+
+    try:
+        # Identical read calls already running elsewhere in the process are joined, not repeated
+        started = time.monotonic()
+        result = call_service(call)
+        duration = time.monotonic() - started
+        if where is not None:
+            result = where.filter(result)
+        # Serialized once, for the database and the log summary
+        text = serialize_result(result)
+        # Logged before saving, so the summary is there even when the save fails
+        log_result(call.service_name, call.method_name, result, text, duration, logger)
+
         # Save the result to the database
-        save_result(command, account_alias, service_name, method_name, result)
-        logger.info(f"Data saved for {service_name}.{method_name}")
+        saved = save_result(command, call.account_alias, call.service_name, call.method_name, text)
+        logger.info(f"Data saved for {call.service_name}.{call.method_name} ({saved.size} bytes)")
+        output_result(result, options)
     except Exception as e:
-        logger.error(f"Error executing {service_name}.{method_name}: {str(e)}")
+        logger.error(f"Error executing {call.service_name}.{call.method_name}: {str(e)}")
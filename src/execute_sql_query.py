@@ -1,24 +1,203 @@
+import os
+import re
+import time
 import sqlite3
 import logging
-from runnerdb import DB_PATH
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from src.db_connection import get_connection
+from src.result_writer import wait_for_pending_writes
+
+# Load environment variables
+load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched from SQLite per round trip when streaming a SELECT sentence
+SQL_FETCH_SIZE = int(os.getenv('SQL_FETCH_SIZE', '500'))
+# Seconds a SELECT sentence may run before SQLite interrupts it (0 disables)
+SQL_TIME_BUDGET = float(os.getenv('SQL_TIME_BUDGET', '30'))
+# SQLite virtual machine steps between time budget checks
+SQL_PROGRESS_STEPS = 10000
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_]\w*$')
+
+
+class QueryTimeout(sqlite3.OperationalError):
+    pass
+
+
+class KeyColumnError(ValueError):
+    pass
+
+
+class StreamingQuery:
+    """Rows of a read-only query, fetched in chunks as they are iterated.
+
+    ``column_names`` is available once the query has started. With ``key``
+    set the query is read in keyset pages (``WHERE key > last ORDER BY key
+    LIMIT page_size``) instead of one long-running statement, so no read
+    snapshot is held between pages. The key column must be unique and never
+    NULL (e.g. ``id``); a duplicate or NULL key raises KeyColumnError rather
+    than silently skipping rows. Only time spent in SQLite counts against
+    ``time_budget``, not time the caller spends between rows.
+    """
+
+    def __init__(self, query, params=(), chunk_size=SQL_FETCH_SIZE, time_budget=SQL_TIME_BUDGET,
+                 key=None, page_size=None):
+        if key is not None and not _IDENTIFIER.match(key):
+            raise ValueError(f"Invalid keyset column: {key}")
+        self.query = query.strip().rstrip(';')
+        self.params = tuple(params)
+        self.chunk_size = chunk_size
+        self.time_budget = time_budget
+        self.key = key
+        self.page_size = page_size or chunk_size
+        self.column_names = None
+        self.row_count = 0
+        # Seconds spent inside SQLite so far, and when the current call must stop
+        self._spent = 0.0
+        self._deadline = None
+        wait_for_pending_writes()
+        self.conn = get_connection(readonly=True)
+        self._source = self._pages() if key else self._stream()
+        self._rows = self._source
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    def close(self):
+        """Stop fetching and release the statement and time budget."""
+        self._rows.close()
+        self._source.close()
+
+    def _budget(self):
+        if not self.time_budget:
+            return
+        self.conn.set_progress_handler(lambda: time.monotonic() > self._deadline, SQL_PROGRESS_STEPS)
+
+    @contextmanager
+    def _timed(self):
+        """Count the time of one SQLite call against the budget; the caller's time between calls is free."""
+        started = time.monotonic()
+        if self.time_budget:
+            self._deadline = started + self.time_budget - self._spent
+        try:
+            yield
+        finally:
+            self._spent += time.monotonic() - started
+
+    def _execute(self, query, params):
+        cursor = self.conn.cursor()
+        try:
+            with self._timed():
+                cursor.execute(query, params)
+        except sqlite3.OperationalError as e:
+            cursor.close()
+            raise self._timeout(e) from e
+        if self.column_names is None:
+            self.column_names = [description[0] for description in cursor.description or ()]
+        return cursor
+
+    def _fetch(self, cursor, size=None):
+        try:
+            with self._timed():
+                return cursor.fetchmany(size or self.chunk_size)
+        except sqlite3.OperationalError as e:
+            raise self._timeout(e) from e
+
+    def _timeout(self, error):
+        if str(error) == 'interrupted':
+            return QueryTimeout(f"SQL query exceeded its time budget of {self.time_budget}s")
+        return error
+
+    def start(self):
+        """Run the query up to its first row so ``column_names`` is set. Return that row or None."""
+        try:
+            first = next(self._rows)
+        except StopIteration:
+            return None
+        self._rows = self._chain(first, self._rows)
+        return first
+
+    @staticmethod
+    def _chain(first, rows):
+        yield first
+        yield from rows
+
+    def _stream(self):
+        self._budget()
+        cursor = self._execute(self.query, self.params)
+        try:
+            while True:
+                rows = self._fetch(cursor)
+                if not rows:
+                    return
+                self.row_count += len(rows)
+                yield from rows
+        finally:
+            cursor.close()
+            self.conn.set_progress_handler(None, 0)
+
+    def _pages(self):
+        self._budget()
+        # One row more than a page shows whether the page ends inside a run of equal keys
+        paged = f"SELECT * FROM ({self.query}) WHERE {self.key} > ? ORDER BY {self.key} LIMIT ?"
+        first_page = f"SELECT * FROM ({self.query}) ORDER BY {self.key} LIMIT ?"
+        try:
+            last_key = None
+            while True:
+                if last_key is None:
+                    cursor = self._execute(first_page, self.params + (self.page_size + 1,))
+                else:
+                    cursor = self._execute(paged, self.params + (last_key, self.page_size + 1))
+                # The outer ORDER BY already failed with "no such column" if key is missing
+                key_index = self.column_names.index(self.key)
+                count = 0
+                try:
+                    while count < self.page_size:
+                        rows = self._fetch(cursor, min(self.chunk_size, self.page_size - count))
+                        if not rows:
+                            break
+                        for row in rows:
+                            self._check_key(row[key_index], last_key, count)
+                            last_key = row[key_index]
+                            count += 1
+                        self.row_count += len(rows)
+                        yield from rows
+                    following = self._fetch(cursor, 1) if count == self.page_size else []
+                finally:
+                    cursor.close()
+                if not following:
+                    return
+                self._check_key(following[0][key_index], last_key, count)
+
+        finally:
+            self.conn.set_progress_handler(None, 0)
+
+    def _check_key(self, key, last_key, position):
+        if key is None:
+            raise KeyColumnError(f"Keyset column {self.key} is NULL in a row; it must be unique and not NULL")
+        if position and key == last_key:
+            raise KeyColumnError(f"Keyset column {self.key} repeats the value {key!r}; it must be unique and not NULL")
+
+
+def stream_sql_query(query, params=(), **options):
+    """Start a StreamingQuery; see its docstring for the options."""
+    return StreamingQuery(query, params, **options)
+
+
 def execute_sql_query(query):
     """Execute a SQL query and return the results."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
     try:
-        # Execute the actual query
-        cursor.execute(query)
-        results = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
+        rows = stream_sql_query(query)
+        results = list(rows)
         logger.info(f"SQL query executed: {query}")
         logger.info(f"Number of results: {len(results)}")
-        return column_names, results
+        return rows.column_names, results
     except sqlite3.Error as e:
         logger.error(f"SQL error: {e}")
         return None, None
-    finally:
-        conn.close()
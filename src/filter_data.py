@@ -1,7 +1,14 @@
-def filter_data(data, filter_key, filter_value):
-    if isinstance(data, list):
-        return [item for item in data if str(item.get(filter_key, '')).lower() == str(filter_value).lower()]
-    elif isinstance(data, dict):
-        return {k: v for k, v in data.items() if str(v.get(filter_key, '')).lower() == str(filter_value).lower()}
+from src.filter_expression import compile_filter, equality_filter
+
+def filter_data(data, filter_key, filter_value=None):
+    """Filter a list of objects (or the values of a dict).
+
+    Called with a key and a value it keeps items whose ``key`` equals ``value``
+    case-insensitively; called with a single filter expression such as
+    ``"stars >= 10 and name ^= lo"`` it applies that expression.
+    """
+    if filter_value is None:
+        expression = compile_filter(filter_key)
     else:
-        return data
+        expression = equality_filter(filter_key, filter_value)
+    return expression.filter(data)
@@ -0,0 +1,405 @@
+import re
+import logging
+import operator
+from functools import lru_cache
+from src.db_connection import register_connection_hook
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FILTER_CACHE_SIZE = 256
+
+_MISSING = object()
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>\^=|~=|!=|<=|>=|=|<|>|\(|\)|,)
+      | (?P<word>(?:[^\s=!<>~^(),"']|[~^](?!=))+)
+    )''', re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not', 'in'}
+
+
+class FilterSyntaxError(ValueError):
+    pass
+
+
+def normalize(value):
+    """Text form used by equality, ``in`` and prefix tests: ``str(value).lower()``."""
+    if isinstance(value, str):
+        return value.lower()
+    if value is None:
+        return 'none'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    return str(value).lower()
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _getter(key):
+    parts = key.split('.')
+    if len(parts) == 1:
+        def get(item):
+            return item.get(key, _MISSING)
+        return get
+
+    def get_nested(item):
+        for part in parts:
+            if not isinstance(item, dict):
+                return _MISSING
+            item = item.get(part, _MISSING)
+            if item is _MISSING:
+                return _MISSING
+        return item
+    return get_nested
+
+
+def _json_path(key):
+    return '$' + ''.join('."' + part.replace('"', '\\"') + '"' for part in key.split('.'))
+
+
+def _python_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _compile_pattern(pattern):
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _regexp(pattern, value):
+    if value is None:
+        return False
+    return _compile_pattern(pattern).search(str(value)) is not None
+
+
+def _register_functions(conn):
+    # SQLite's lower() only folds ASCII, and REGEXP has no built-in implementation
+    conn.create_function('py_lower', 1, _python_lower, deterministic=True)
+    conn.create_function('regexp', 2, _regexp, deterministic=True)
+
+
+_registered = False
+
+
+def register_sql_functions():
+    """Make the SQL functions used by ``to_sql`` available on every connection."""
+    global _registered
+    if not _registered:
+        _registered = True
+        register_connection_hook(_register_functions)
+
+
+_RANGE_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+class Comparison:
+    """One ``key <op> value`` test against a (possibly nested) object key."""
+
+    def __init__(self, key, op, value):
+        self.key = key
+        self.op = op
+        self.value = value
+        self.get = _getter(key)
+        if op == 'in':
+            self.expected = frozenset(normalize(v) for v in value)
+        elif op == '~=':
+            self.pattern = _compile_pattern(value)
+        elif op in ('<', '<=', '>', '>='):
+            self.number = _number(value)
+            self.expected = normalize(value)
+        else:
+            self.expected = normalize(value)
+
+    def predicate(self):
+        get, op = self.get, self.op
+        if op in ('=', '!='):
+            expected = self.expected
+            negate = op == '!='
+
+            def equal(item):
+                value = get(item)
+                # A missing key compares like an empty string, as filter_data did
+                return (normalize(value) == expected if value is not _MISSING else expected == '') != negate
+            return equal
+        if op == 'in':
+            expected = self.expected
+
+            def member(item):
+                value = get(item)
+                return value is not _MISSING and normalize(value) in expected
+            return member
+        if op == '^=':
+            prefix = self.expected
+
+            def starts_with(item):
+                value = get(item)
+                return value is not _MISSING and normalize(value).startswith(prefix)
+            return starts_with
+        if op == '~=':
+            search = self.pattern.search
+
+            def matches(item):
+                value = get(item)
+                if isinstance(value, str):
+                    return search(value) is not None
+                return _is_number(value) and search(str(value)) is not None
+            return matches
+
+        compare = _RANGE_OPERATORS[op]
+        number, text = self.number, self.expected
+
+        def in_range(item):
+            value = get(item)
+            if number is not None:
+                return _is_number(value) and compare(value, number)
+            return isinstance(value, str) and compare(value.lower(), text)
+        return in_range
+
+    def to_sql(self, element):
+        path = _json_path(self.key)
+        value_type = f"json_type({element}, ?)"
+        value = f"json_extract({element}, ?)"
+        as_text = f'''
+        CASE {value_type}
+            WHEN 'null' THEN 'none'
+            WHEN 'true' THEN 'true'
+            WHEN 'false' THEN 'false'
+            WHEN 'text' THEN py_lower({value})
+            WHEN 'integer' THEN CAST({value} AS TEXT)
+            WHEN 'real' THEN CAST({value} AS TEXT)
+            WHEN 'object' THEN NULL
+            WHEN 'array' THEN NULL
+            ELSE ''
+        END'''
+        text_params = [path, path, path, path]
+        op = self.op
+        if op in ('=', '!='):
+            return f"({as_text}) {'=' if op == '=' else 'IS NOT'} ?", text_params + [self.expected]
+        if op == 'in':
+            placeholders = ', '.join('?' for _ in self.expected)
+            return (f"({as_text}) IN ({placeholders}) AND {value_type} IS NOT NULL",
+                    text_params + sorted(self.expected) + [path])
+        if op == '^=':
+            return (f"substr(({as_text}), 1, ?) = ? AND {value_type} IS NOT NULL",
+                    text_params + [len(self.expected), self.expected, path])
+        if op == '~=':
+            return (f"{value_type} IN ('text', 'integer', 'real') AND {value} REGEXP ?",
+                    [path, path, self.value])
+        if self.number is not None:
+            return (f"{value_type} IN ('integer', 'real') AND {value} {op} ?",
+                    [path, path, self.number])
+        return f"{value_type} = 'text' AND py_lower({value}) {op} ?", [path, path, self.expected]
+
+
+class BooleanExpression:
+    def __init__(self, op, operands):
+        self.op = op
+        self.operands = operands
+
+    def predicate(self):
+        predicates = tuple(operand.predicate() for operand in self.operands)
+        if self.op == 'not':
+            inner = predicates[0]
+            return lambda item: not inner(item)
+        if self.op == 'and':
+            return lambda item: all(p(item) for p in predicates)
+        return lambda item: any(p(item) for p in predicates)
+
+    def to_sql(self, element):
+        clauses = []
+        params = []
+        for operand in self.operands:
+            sql, operand_params = operand.to_sql(element)
+            clauses.append(f"({sql})")
+            params += operand_params
+        if self.op == 'not':
+            return f"NOT COALESCE({clauses[0]}, 0)", params
+        return f" {self.op.upper()} ".join(clauses), params
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.position = 0
+
+    @staticmethod
+    def _tokenize(text):
+        tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if not match or match.end() == position:
+                raise FilterSyntaxError(f"Unexpected character at {position} in filter: {text}")
+            position = match.end()
+            if match.group('string') is not None:
+                quoted = match.group('string')
+                tokens.append(('value', re.sub(r'\\(.)', r'\1', quoted[1:-1])))
+            elif match.group('op') is not None:
+                tokens.append(('op', match.group('op')))
+            else:
+                word = match.group('word')
+                kind = 'keyword' if word.lower() in _KEYWORDS else 'word'
+                tokens.append((kind, word.lower() if kind == 'keyword' else word))
+        return tokens
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (value and token[1] != value):
+            expected = value or kind or 'token'
+            raise FilterSyntaxError(f"Expected {expected} in filter: {self.text}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        expression = self.parse_or()
+        if self.position != len(self.tokens):
+            raise FilterSyntaxError(f"Unexpected '{self.peek()[1]}' in filter: {self.text}")
+        return expression
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek() == ('keyword', 'or'):
+            self.take()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else BooleanExpression('or', operands)
+
+    def parse_and(self):
+        operands = [self.parse_term()]
+        while self.peek() == ('keyword', 'and'):
+            self.take()
+            operands.append(self.parse_term())
+        return operands[0] if len(operands) == 1 else BooleanExpression('and', operands)
+
+    def parse_term(self):
+        if self.peek() == ('keyword', 'not'):
+            self.take()
+            return BooleanExpression('not', [self.parse_term()])
+        if self.peek() == ('op', '('):
+            self.take()
+            expression = self.parse_or()
+            self.take('op', ')')
+            return expression
+        return self.parse_comparison()
+
+    def value(self):
+        kind, value = self.peek()
+        if kind not in ('word', 'value'):
+            raise FilterSyntaxError(f"Expected a value in filter: {self.text}")
+        self.position += 1
+        return value
+
+    def parse_comparison(self):
+        kind, key = self.peek()
+        if kind not in ('word', 'value'):
+            raise FilterSyntaxError(f"Expected a key in filter: {self.text}")
+        self.position += 1
+        kind, op = self.peek()
+        if (kind, op) == ('keyword', 'in'):
+            self.take()
+            self.take('op', '(')
+            values = [self.value()]
+            while self.peek() == ('op', ','):
+                self.take()
+                values.append(self.value())
+            self.take('op', ')')
+            return Comparison(key, 'in', tuple(values))
+        if kind != 'op' or op in ('(', ')', ','):
+            raise FilterSyntaxError(f"Expected an operator after '{key}' in filter: {self.text}")
+        self.take()
+        # "key =" with nothing after it matches an empty/missing value
+        if op in ('=', '!=') and self.peek()[0] is None:
+            return Comparison(key, op, '')
+        return Comparison(key, op, self.value())
+
+
+class FilterExpression:
+    """A parsed filter that can run as a Python predicate or as a SQL condition.
+
+    Syntax: comparisons ``key = value``, ``!=``, ``<``, ``<=``, ``>``, ``>=``,
+    ``key in (a, b)``, ``key ^= prefix`` and ``key ~= regex`` on dotted keys,
+    combined with ``and``, ``or``, ``not`` and parentheses. Equality, ``in``
+    and prefix tests compare case-insensitively like ``str(value).lower()``;
+    ranges compare numbers numerically and text case-insensitively.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tree = _Parser(text).parse()
+        self.predicate = self.tree.predicate()
+
+    def __call__(self, item):
+        return isinstance(item, dict) and self.predicate(item)
+
+    def filter(self, data):
+        """Apply the filter to a list of objects or to the values of a dict."""
+        if isinstance(data, list):
+            return [item for item in data if self(item)]
+        if isinstance(data, dict):
+            return {k: v for k, v in data.items() if self(v)}
+        return data
+
+    def to_sql(self, element='i.element'):
+        """Return ``(sql, params)`` testing a JSON object column such as query_item.element."""
+        register_sql_functions()
+        sql, params = self.tree.to_sql(element)
+        return f"json_type({element}) = 'object' AND ({sql})", params
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def compile_filter(text):
+    """Parse a filter expression once; repeated sentences reuse the compiled filter."""
+    return FilterExpression(text)
+
+
+# "key=value" as one bare word, split on the first "=" as the print value sentence always did
+_KEY_VALUE = re.compile(r'''^\s*(?P<key>[^\s=!<>~^(),"']+)=(?P<value>[^\s"'][^\s]*|)\s*$''')
+
+
+def where_filter(text):
+    """Compile the ``where`` clause of a print value sentence.
+
+    A single bare ``key=value`` word is an equality test on everything after
+    the first ``=`` (so ``name=x(y)`` and ``name=a,b`` work unquoted); anything
+    else is a filter expression.
+    """
+    match = _KEY_VALUE.match(text)
+    if match:
+        return equality_filter(match.group('key'), match.group('value'))
+    return compile_filter(text)
+
+
+def equality_filter(filter_key, filter_value):
+    """The filter for the ``key value`` form of the filter sentence."""
+    return compile_filter(f'{_quote(filter_key)} = {_quote(str(filter_value))}')
+
+
+def _quote(text):
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"' if text else '""'
@@ -1,38 +1,53 @@
-import sqlite3
-import json
 import logging
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from src.db_connection import get_connection
+from src.result_writer import wait_for_pending_writes
+from src.result_items import materialize_reference, get_latest_result_id
+from src.result_blobs import load_blob
+from src.result_cache import latest_results, parse_result
 
 # Configure logging
 logger = logging.getLogger(__name__)
 QUERY_RESULTS_TABLE = "query"
 
-# Get the database path from the environment variable
-DB_PATH = os.getenv('SQLITE_DB_PATH', 'runner.db')
+def load_result(conn, query_id, source_query_id, blob_id):
+    """Rebuild and parse one stored result (non-JSON results come back as text)."""
+    if source_query_id is not None:
+        # Filtered results are stored as references to the source elements
+        data = materialize_reference(conn, query_id, source_query_id)
+    else:
+        data = load_blob(conn, blob_id)
+    return parse_result(data)
 
 def get_latest_result(service_name, method_name):
-    """Retrieve the latest result for a given service and method."""
-    conn = sqlite3.connect(DB_PATH)
+    """Retrieve the latest result for a given service and method.
+
+    Decoded results are kept in the in-process LatestResultCache, so reading
+    an unchanged result again costs a dictionary lookup. The returned value
+    is shared with later callers and must not be modified.
+    """
+    wait_for_pending_writes()
+    conn = get_connection()
+    hit, data = latest_results.get(conn, service_name, method_name,
+                                   lambda: get_latest_result_id(service_name, method_name))
+    if hit:
+        return data
+
+    # Before the read: a commit between the read and put() must not be hidden
+    state = latest_results.state(conn)
     cursor = conn.cursor()
-    
     cursor.execute(f'''
-    SELECT result FROM {QUERY_RESULTS_TABLE}
+    SELECT id, source_query_id, blob_id, result_size FROM {QUERY_RESULTS_TABLE}
     WHERE service_name = ? AND method_name = ?
-    ORDER BY timestamp DESC
+    ORDER BY created_at_ns DESC, id DESC
     LIMIT 1
     ''', (service_name, method_name))
     
     result = cursor.fetchone()
-    conn.close()
     
     if result:
-        try:
-            return json.loads(result[0])
-        except json.JSONDecodeError:
-            return result[0]
+        query_id, source_query_id, blob_id, result_size = result
+        data = load_result(conn, query_id, source_query_id, blob_id)
+        latest_results.put(conn, service_name, method_name, query_id, data, size=result_size, state=state)
+        return data
     logger.debug(f"Retrieved latest result for {service_name}.{method_name}")
     return None
@@ -0,0 +1,192 @@
+import re
+import json
+import sqlite3
+import logging
+import threading
+from src.db_connection import transaction
+from src.result_blobs import load_blob
+
+# Configure logging
+logger = logging.getLogger(__name__)
+QUERY_RESULTS_TABLE = "query"
+# Declaration each extract_* table was built from (not named extract_* so retention skips it)
+FIELD_EXTRACTIONS_TABLE = "field_extraction"
+
+# Fields extracted out of the box; commands.yaml can add to or override these
+# under commands.python.extract using the same "Service.method" keys.
+DEFAULT_EXTRACTED_FIELDS = {
+    'GitHubService.list_all_repositories': {
+        'fields': ['name', 'full_name', 'private', 'stargazers_count', 'owner.login'],
+    },
+    'GitHubService.list_repositories': {
+        'fields': ['name', 'full_name', 'private', 'stargazers_count', 'owner.login'],
+    },
+    'GitLabService.list_projects': {
+        'fields': ['id', 'name', 'path_with_namespace', 'visibility', 'star_count'],
+    },
+    'CloudflareService.list_zones': {
+        'root': 'result',
+        'fields': ['id', 'name', 'status'],
+    },
+}
+
+_extractions = {}
+_lock = threading.Lock()
+
+
+def _identifier(text):
+    return re.sub(r'[^a-z0-9_]', '_', text.lower())
+
+
+def _json_path(dotted):
+    return '$' + ''.join(f'.{part}' for part in dotted.split('.')) if dotted else '$'
+
+
+class FieldExtraction:
+    """Declared fields of one service method, stored in an indexed table.
+
+    Every saved result of the method gets one row per element (or a single row
+    for an object result) in ``extract_<service>_<method>``, with one column per
+    declared field pulled out by SQLite's JSON1 functions.
+    """
+
+    def __init__(self, service_name, method_name, fields, root=None):
+        self.service_name = service_name
+        self.method_name = method_name
+        self.fields = list(fields)
+        self.root_path = _json_path(root)
+        self.table = f"extract_{_identifier(service_name)}_{_identifier(method_name)}"
+        self.columns = [_identifier(field) for field in self.fields]
+        self.paths = [_json_path(field) for field in self.fields]
+        self.declaration = json.dumps({'root': self.root_path, 'fields': self.fields})
+
+    def create_table(self, cursor):
+        """Create the table and its indexes and backfill it, unless it exists with the same declaration."""
+        cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {FIELD_EXTRACTIONS_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            declaration TEXT NOT NULL
+        )
+        ''')
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table,)
+        ).fetchone()
+        if exists:
+            stored = cursor.execute(f"SELECT declaration FROM {FIELD_EXTRACTIONS_TABLE} WHERE table_name = ?",
+                                    (self.table,)).fetchone()
+            if stored and stored[0] == self.declaration:
+                return
+            # Root or fields changed (or unknown): rebuild from the stored results
+            cursor.execute(f"DROP TABLE {self.table}")
+
+        column_defs = ''.join(f', {column}' for column in self.columns)
+        cursor.execute(f'''
+        CREATE TABLE {self.table} (
+            query_id INTEGER NOT NULL,
+            item_index INTEGER NOT NULL{column_defs},
+            PRIMARY KEY (query_id, item_index)
+        ) WITHOUT ROWID
+        ''')
+        for column in self.columns:
+            cursor.execute(f"CREATE INDEX idx_{self.table}_{column} ON {self.table} ({column})")
+
+        rows = cursor.connection.execute(f'''
+        SELECT id, blob_id FROM {QUERY_RESULTS_TABLE}
+        WHERE service_name = ? AND method_name = ? AND blob_id IS NOT NULL
+        ORDER BY id
+        ''', (self.service_name, self.method_name)).fetchall()
+        backfilled = 0
+        for query_id, blob_id in rows:
+            self.insert(cursor, query_id, load_blob(cursor.connection, blob_id))
+            backfilled += 1
+        cursor.execute(f"INSERT OR REPLACE INTO {FIELD_EXTRACTIONS_TABLE} (table_name, declaration) VALUES (?, ?)",
+                       (self.table, self.declaration))
+        logger.info(f"Created {self.table} with {backfilled} backfilled results")
+
+    def insert(self, cursor, query_id, result):
+        """Extract the declared fields of a serialized result."""
+        if not isinstance(result, str):
+            return
+        row = cursor.execute("SELECT json_type(?, ?) WHERE json_valid(?)", (result, self.root_path, result)).fetchone()
+        if not row:
+            return
+
+        columns = ''.join(f', {column}' for column in self.columns)
+        if row[0] == 'array':
+            extracted = ''.join(', json_extract(value, ?)' for _ in self.paths)
+            cursor.execute(f'''
+            INSERT INTO {self.table} (query_id, item_index{columns})
+            SELECT ?, key{extracted} FROM json_each(?, ?) WHERE type = 'object'
+            ''', (query_id, *self.paths, result, self.root_path))
+        elif row[0] == 'object':
+            extracted = ''.join(', json_extract(?, ?)' for _ in self.paths)
+            params = [query_id]
+            for path in self.paths:
+                params += [result, self.root_path + path[1:]]
+            cursor.execute(f'''
+            INSERT INTO {self.table} (query_id, item_index{columns})
+            VALUES (?, 0{extracted})
+            ''', params)
+
+
+def configure_extracted_fields(declarations=None):
+    """Register the default and configured declarations and create their tables.
+
+    ``declarations`` maps ``"Service.method"`` to either a list of dotted field
+    names or ``{'fields': [...], 'root': 'path.to.array'}``.
+    """
+    merged = dict(DEFAULT_EXTRACTED_FIELDS)
+    merged.update(declarations or {})
+
+    extractions = {}
+    for key, declaration in merged.items():
+        if isinstance(declaration, list):
+            declaration = {'fields': declaration}
+        service_name, method_name = key.split('.', 1)
+        extractions[(service_name, method_name)] = FieldExtraction(
+            service_name, method_name, declaration['fields'], declaration.get('root'))
+
+    with transaction() as cursor:
+        for extraction in extractions.values():
+            extraction.create_table(cursor)
+
+    with _lock:
+        _extractions.clear()
+        _extractions.update(extractions)
+    return extractions
+
+
+def extract_fields(cursor, query_id, service_name, method_name, result):
+    """Populate the extraction table of a newly inserted result, if one is declared."""
+    extraction = _extractions.get((service_name, method_name))
+    if extraction is None:
+        return
+    try:
+        extraction.insert(cursor, query_id, result)
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        # Table missing from this database (dropped, or a different DB_PATH); the
+        # backfill in create_table picks up the row that was just inserted
+        extraction.create_table(cursor)
+
+
+def copy_extracted_fields(cursor, query_id, source_query_id, service_name, method_name):
+    """Give a reference result the extracted rows of the source elements it selects."""
+    extraction = _extractions.get((service_name, method_name))
+    if extraction is None:
+        return
+    columns = ''.join(f', {column}' for column in extraction.columns)
+    source_columns = ''.join(f', e.{column}' for column in extraction.columns)
+    try:
+        cursor.execute(f'''
+        INSERT INTO {extraction.table} (query_id, item_index{columns})
+        SELECT r.query_id, e.item_index{source_columns}
+        FROM {extraction.table} e
+        JOIN query_ref r ON r.query_id = ? AND r.item_index = e.item_index
+        WHERE e.query_id = ?
+        ''', (query_id, source_query_id))
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        extraction.create_table(cursor)
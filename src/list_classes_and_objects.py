@@ -1,27 +1,16 @@
-import os
-import importlib
-import inspect
 import logging
+from src.plugin_registry import PluginRegistry
 
 logger = logging.getLogger(__name__)
 
+_registry = None
+
 def list_classes_and_objects():
+    """Return the lazy plugin registry, refreshed against the files in python/."""
+    global _registry
     logger.debug("Listing classes and objects")
-    classes_and_objects = {}
-    python_dir = os.path.join(os.path.dirname(__file__), '..', 'python')
-    
-    for filename in os.listdir(python_dir):
-        if filename.endswith('.py') and not filename.startswith('__'):
-            module_name = filename[:-3]
-            logger.debug(f"Importing module: {module_name}")
-            module = importlib.import_module(f"python.{module_name}")
-            
-            for name, obj in inspect.getmembers(module):
-                if inspect.isclass(obj) and obj.__module__ == f"python.{module_name}":
-                    logger.debug(f"Found class: {name}")
-                    classes_and_objects[name] = {
-                        'class': obj,
-                        'methods': {method_name.lower(): method_obj for method_name, method_obj in inspect.getmembers(obj) if inspect.isfunction(method_obj) or inspect.ismethod(method_obj)}
-                    }
-
-    return classes_and_objects
+    if _registry is None:
+        _registry = PluginRegistry()
+    else:
+        _registry.refresh()
+    return _registry
@@ -1,9 +1,9 @@
-import yaml
 import logging
+from src.config_cache import load_config
 
 logger = logging.getLogger(__name__)
 
-def load_yaml(file_path):
+def load_yaml(file_path, validate=None):
+    """Load a YAML file through the parsed-config cache (see config_cache.load_config)."""
     logger.debug(f"Loading YAML file: {file_path}")
-    with open(file_path, 'r') as file:
-        return yaml.safe_load(file)
+    return load_config(file_path, validate)
@@ -0,0 +1,304 @@
+import hashlib
+import sqlite3
+import logging
+from src.db_connection import get_connection
+
+# Configure logging
+logger = logging.getLogger(__name__)
+QUERY_RESULTS_TABLE = "query"
+QUERY_ROWS_TABLE = "query_row"
+SCHEDULED_TASKS_TABLE = "scheduled_tasks"
+QUERY_ITEMS_TABLE = "query_item"
+QUERY_REFS_TABLE = "query_ref"
+CODEC_DICT_TABLE = "result_codec_dict"
+RESULT_BLOBS_TABLE = "result_blob"
+MAINTENANCE_RUNS_TABLE = "maintenance_run"
+
+
+def result_hash(data):
+    """Content hash stored in query.result_hash."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def _v1_base_tables(cursor):
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {QUERY_RESULTS_TABLE} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        command TEXT,
+        name TEXT,
+        service_name TEXT,
+        method_name TEXT,
+        result TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {SCHEDULED_TASKS_TABLE} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        command TEXT,
+        schedule TEXT,
+        last_run DATETIME,
+        next_run DATETIME,
+        status TEXT
+    )
+    ''')
+
+
+def _v2_typed_columns_and_indexes(cursor):
+    cursor.execute(f"ALTER TABLE {QUERY_RESULTS_TABLE} ADD COLUMN created_at_ns INTEGER")
+    cursor.execute(f"ALTER TABLE {QUERY_RESULTS_TABLE} ADD COLUMN result_size INTEGER")
+    cursor.execute(f"ALTER TABLE {QUERY_RESULTS_TABLE} ADD COLUMN result_hash TEXT")
+
+    cursor.connection.create_function('migration_result_hash', 1, result_hash, deterministic=True)
+    cursor.execute(f'''
+    UPDATE {QUERY_RESULTS_TABLE}
+    SET created_at_ns = CAST(strftime('%s', timestamp) AS INTEGER) * 1000000000,
+        result_size = length(CAST(result AS BLOB)),
+        result_hash = migration_result_hash(result)
+    WHERE result IS NOT NULL
+    ''')
+    cursor.execute(f'''
+    UPDATE {QUERY_RESULTS_TABLE}
+    SET created_at_ns = CAST(strftime('%s', timestamp) AS INTEGER) * 1000000000
+    WHERE created_at_ns IS NULL
+    ''')
+
+    cursor.execute(f'''
+    CREATE INDEX IF NOT EXISTS idx_query_latest
+    ON {QUERY_RESULTS_TABLE} (service_name, method_name, created_at_ns)
+    ''')
+    cursor.execute(f'''
+    CREATE INDEX IF NOT EXISTS idx_query_created_at
+    ON {QUERY_RESULTS_TABLE} (created_at_ns)
+    ''')
+    cursor.execute(f'''
+    CREATE INDEX IF NOT EXISTS idx_scheduled_tasks_next_run
+    ON {SCHEDULED_TASKS_TABLE} (next_run)
+    ''')
+
+
+def _v3_query_items(cursor):
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {QUERY_ITEMS_TABLE} (
+        query_id INTEGER NOT NULL,
+        item_index INTEGER NOT NULL,
+        element TEXT NOT NULL,
+        item_id,
+        item_name,
+        PRIMARY KEY (query_id, item_index)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_query_item_id ON {QUERY_ITEMS_TABLE} (item_id)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_query_item_name ON {QUERY_ITEMS_TABLE} (item_name)")
+
+    # Explode the list results stored before this version. A frozen copy of
+    # explode_result as of this version, so later changes to it do not change
+    # what this migration produces.
+    rows = cursor.connection.execute(f"SELECT id, result FROM {QUERY_RESULTS_TABLE} WHERE result LIKE '[%'")
+    for query_id, result in rows:
+        if not isinstance(result, str) or not result.lstrip().startswith('['):
+            continue
+        try:
+            cursor.execute(f'''
+            INSERT INTO {QUERY_ITEMS_TABLE} (query_id, item_index, element, item_id, item_name)
+            SELECT ?, key,
+                   CASE type
+                       WHEN 'object' THEN value
+                       WHEN 'array' THEN value
+                       WHEN 'true' THEN 'true'
+                       WHEN 'false' THEN 'false'
+                       ELSE json_quote(value)
+                   END,
+                   CASE WHEN type = 'object' THEN json_extract(value, '$.id') END,
+                   CASE WHEN type = 'object' THEN json_extract(value, '$.name') END
+            FROM json_each(?)
+            ''', (query_id, result))
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Result {query_id} not exploded: {e}")
+
+
+def _v4_result_references(cursor):
+    # A row with source_query_id stores no result of its own: it selects the
+    # query_item rows of the source listed in query_ref
+    cursor.execute(f"ALTER TABLE {QUERY_RESULTS_TABLE} ADD COLUMN source_query_id INTEGER")
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {QUERY_REFS_TABLE} (
+        query_id INTEGER NOT NULL,
+        item_index INTEGER NOT NULL,
+        PRIMARY KEY (query_id, item_index)
+    ) WITHOUT ROWID
+    ''')
+
+
+def _v5_result_codecs(cursor):
+    # result_codec is NULL for plain JSON text; otherwise result holds compressed
+    # bytes, optionally compressed against a result_codec_dict dictionary
+    cursor.execute(f"ALTER TABLE {QUERY_RESULTS_TABLE} ADD COLUMN result_codec TEXT")
+    cursor.execute(f"ALTER TABLE {QUERY_RESULTS_TABLE} ADD COLUMN codec_dict_id INTEGER")
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {CODEC_DICT_TABLE} (
+        id INTEGER PRIMARY KEY,
+        service_name TEXT,
+        method_name TEXT,
+        data BLOB NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute(f'''
+    CREATE INDEX IF NOT EXISTS idx_result_codec_dict_method
+    ON {CODEC_DICT_TABLE} (service_name, method_name)
+    ''')
+
+
+def _v6_result_blobs(cursor):
+    # Results are stored once per content hash; query rows point at their blob.
+    # first_query_id is the row whose id keys the blob's query_item elements.
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {RESULT_BLOBS_TABLE} (
+        id INTEGER PRIMARY KEY,
+        hash TEXT NOT NULL UNIQUE,
+        data,
+        codec TEXT,
+        codec_dict_id INTEGER,
+        size INTEGER,
+        first_query_id INTEGER
+    )
+    ''')
+    cursor.execute(f"ALTER TABLE {QUERY_RESULTS_TABLE} ADD COLUMN blob_id INTEGER")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_query_blob ON {QUERY_RESULTS_TABLE} (blob_id)")
+
+    # Move the stored results into blobs, oldest copy first
+    cursor.execute(f'''
+    INSERT OR IGNORE INTO {RESULT_BLOBS_TABLE} (hash, data, codec, codec_dict_id, size, first_query_id)
+    SELECT result_hash, result, result_codec, codec_dict_id, result_size, id
+    FROM {QUERY_RESULTS_TABLE}
+    WHERE source_query_id IS NULL AND result IS NOT NULL
+    ORDER BY id
+    ''')
+    cursor.execute(f'''
+    UPDATE {QUERY_RESULTS_TABLE}
+    SET blob_id = (SELECT id FROM {RESULT_BLOBS_TABLE} b WHERE b.hash = {QUERY_RESULTS_TABLE}.result_hash),
+        result = NULL, result_codec = NULL, codec_dict_id = NULL
+    WHERE source_query_id IS NULL AND result IS NOT NULL
+    ''')
+    # Filter references and elements now go through the blob's first row
+    cursor.execute(f'''
+    UPDATE {QUERY_RESULTS_TABLE}
+    SET source_query_id = COALESCE((
+        SELECT b.first_query_id FROM {QUERY_RESULTS_TABLE} s
+        JOIN {RESULT_BLOBS_TABLE} b ON b.id = s.blob_id
+        WHERE s.id = {QUERY_RESULTS_TABLE}.source_query_id
+    ), source_query_id)
+    WHERE source_query_id IS NOT NULL
+    ''')
+    cursor.execute(f'''
+    DELETE FROM {QUERY_ITEMS_TABLE} WHERE query_id IN (
+        SELECT q.id FROM {QUERY_RESULTS_TABLE} q
+        JOIN {RESULT_BLOBS_TABLE} b ON b.id = q.blob_id
+        WHERE b.first_query_id != q.id
+    )
+    ''')
+
+
+def _v7_result_deltas(cursor):
+    # A blob with base_blob_id stores a structural patch against that blob;
+    # delta_depth counts the patches to apply from the nearest full snapshot
+    cursor.execute(f"ALTER TABLE {RESULT_BLOBS_TABLE} ADD COLUMN base_blob_id INTEGER")
+    cursor.execute(f"ALTER TABLE {RESULT_BLOBS_TABLE} ADD COLUMN delta_depth INTEGER NOT NULL DEFAULT 0")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_result_blob_base ON {RESULT_BLOBS_TABLE} (base_blob_id)")
+
+
+def _v8_retention(cursor):
+    # Retention keeps the rows filter references point at, so find them by index;
+    # maintenance_run records when periodic jobs last ran, across processes
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_query_source ON {QUERY_RESULTS_TABLE} (source_query_id)")
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {MAINTENANCE_RUNS_TABLE} (
+        task TEXT PRIMARY KEY,
+        last_run_ns INTEGER NOT NULL
+    )
+    ''')
+
+
+def _v9_query_view(cursor):
+    # Since v6 the result text lives in result_blob. The rows move to query_row and
+    # query becomes a view that fills result in again, so SQL reading query.result
+    # keeps working: plain blobs are returned as stored, filter references are
+    # expanded from their elements, compressed and delta blobs (read them through
+    # json_result) are NULL. Writers use query_row; a column added to it later
+    # must be added to this view too.
+    cursor.execute(f"ALTER TABLE {QUERY_RESULTS_TABLE} RENAME TO {QUERY_ROWS_TABLE}")
+    cursor.execute(f'''
+    CREATE VIEW {QUERY_RESULTS_TABLE} AS
+    SELECT q.id, q.command, q.name, q.service_name, q.method_name,
+           CASE
+               WHEN q.source_query_id IS NOT NULL THEN (
+                   SELECT json_group_array(json(element)) FROM (
+                       SELECT i.element FROM {QUERY_ITEMS_TABLE} i
+                       JOIN {QUERY_REFS_TABLE} r ON r.query_id = q.id AND r.item_index = i.item_index
+                       WHERE i.query_id = q.source_query_id
+                       ORDER BY i.item_index
+                   )
+               )
+               WHEN b.codec IS NULL AND b.base_blob_id IS NULL THEN b.data
+           END AS result,
+           q.timestamp, q.created_at_ns, q.result_size, q.result_hash, q.source_query_id,
+           q.result_codec, q.codec_dict_id, q.blob_id
+    FROM {QUERY_ROWS_TABLE} q
+    LEFT JOIN {RESULT_BLOBS_TABLE} b ON b.id = q.blob_id
+    ''')
+    # Clean-up SQL written against the old table keeps working
+    cursor.execute(f'''
+    CREATE TRIGGER {QUERY_RESULTS_TABLE}_delete INSTEAD OF DELETE ON {QUERY_RESULTS_TABLE}
+    BEGIN
+        DELETE FROM {QUERY_ROWS_TABLE} WHERE id = OLD.id;
+    END
+    ''')
+
+
+# Ordered (version, migration) pairs; a database at version N runs every later step
+MIGRATIONS = [
+    (1, _v1_base_tables),
+    (2, _v2_typed_columns_and_indexes),
+    (3, _v3_query_items),
+    (4, _v4_result_references),
+    (5, _v5_result_codecs),
+    (6, _v6_result_blobs),
+    (7, _v7_result_deltas),
+    (8, _v8_retention),
+    (9, _v9_query_view),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db_path=None):
+    """Bring the database schema up to SCHEMA_VERSION.
+
+    Each step runs in its own immediate transaction together with the
+    ``user_version`` bump, so concurrent processes upgrade a database once.
+    """
+    conn = get_connection(db_path)
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return
+
+    for version, migration in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock in case another process migrated first
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            logger.info(f"Migrating database schema to version {version}")
+            migration(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
@@ -0,0 +1,204 @@
+import io
+import os
+import sys
+import csv
+import gzip
+import json
+import logging
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default output format for SQL sentences and printed service results
+OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'pipe')
+# Also print service results (not only log and store them)
+OUTPUT_SERVICE_RESULTS = os.getenv('OUTPUT_SERVICE_RESULTS', '0') == '1'
+# Rows buffered by the aligned table writer to size its columns
+OUTPUT_TABLE_SAMPLE_ROWS = int(os.getenv('OUTPUT_TABLE_SAMPLE_ROWS', '200'))
+
+
+def _cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+class PipeWriter:
+    """``a | b`` rows under a dashed header line (the original SQL output)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def header(self, column_names):
+        self.stream.write(" | ".join(column_names) + "\n")
+        self.stream.write("-" * (sum(len(name) for name in column_names) + 3 * (len(column_names) - 1)) + "\n")
+
+    def row(self, values):
+        self.stream.write(" | ".join(_cell(value) for value in values) + "\n")
+
+    def close(self):
+        pass
+
+
+class TableWriter:
+    """Aligned columns sized from the first OUTPUT_TABLE_SAMPLE_ROWS rows.
+
+    Later rows are written as they arrive; values wider than the sample
+    simply push the rest of their line to the right.
+    """
+
+    def __init__(self, stream, sample_rows=OUTPUT_TABLE_SAMPLE_ROWS):
+        self.stream = stream
+        self.sample_rows = sample_rows
+        self.column_names = None
+        self.buffered = []
+        self.widths = None
+
+    def header(self, column_names):
+        self.column_names = list(column_names)
+
+    def row(self, values):
+        cells = [_cell(value) for value in values]
+        if self.widths is not None:
+            self._write(cells)
+            return
+        self.buffered.append(cells)
+        if len(self.buffered) >= self.sample_rows:
+            self._flush_sample()
+
+    def close(self):
+        if self.widths is None and self.column_names is not None:
+            self._flush_sample()
+
+    def _flush_sample(self):
+        self.widths = [len(name) for name in self.column_names]
+        for cells in self.buffered:
+            self.widths = [max(width, len(cell)) for width, cell in zip(self.widths, cells)]
+        self._write(self.column_names)
+        self._write(['-' * width for width in self.widths], separator='-+-')
+        for cells in self.buffered:
+            self._write(cells)
+        self.buffered = []
+
+    def _write(self, cells, separator=' | '):
+        line = separator.join(cell.ljust(width) for cell, width in zip(cells, self.widths))
+        self.stream.write(line.rstrip() + "\n")
+
+
+class CsvWriter:
+    def __init__(self, stream):
+        self.writer = csv.writer(stream)
+
+    def header(self, column_names):
+        self.writer.writerow(column_names)
+
+    def row(self, values):
+        self.writer.writerow(['' if value is None else _cell(value) for value in values])
+
+    def close(self):
+        pass
+
+
+class JsonLinesWriter:
+    """One JSON object per line (JSON Lines / NDJSON)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.column_names = None
+
+    def header(self, column_names):
+        self.column_names = list(column_names)
+
+    def row(self, values):
+        self.item(dict(zip(self.column_names, values)))
+
+    def item(self, item):
+        self.stream.write(json.dumps(item) + "\n")
+
+    def close(self):
+        pass
+
+
+FORMATS = {
+    'pipe': PipeWriter,
+    'table': TableWriter,
+    'csv': CsvWriter,
+    'jsonl': JsonLinesWriter,
+    'ndjson': JsonLinesWriter,
+}
+
+_EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'ndjson', '.txt': 'table'}
+
+
+def resolve_format(fmt=None, file=None):
+    """Pick the format: explicit name, else the file extension, else OUTPUT_FORMAT."""
+    if fmt is None and file:
+        name = file[:-3] if file.endswith('.gz') else file
+        fmt = _EXTENSIONS.get(os.path.splitext(name)[1].lower())
+    fmt = (fmt or OUTPUT_FORMAT).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format: {fmt} (expected one of {', '.join(FORMATS)})")
+    return fmt
+
+
+@contextmanager
+def open_writer(fmt=None, file=None, output=None):
+    """Yield a row writer for ``fmt`` writing to ``file`` (gzip if it ends in .gz) or ``output``."""
+    writer_class = FORMATS[resolve_format(fmt, file)]
+    if file:
+        if file.endswith('.gz'):
+            stream = io.TextIOWrapper(gzip.open(file, 'wb'), encoding='utf-8', newline='')
+        else:
+            stream = open(file, 'w', encoding='utf-8', newline='')
+    else:
+        stream = output or sys.stdout
+    try:
+        writer = writer_class(stream)
+        yield writer
+        writer.close()
+    finally:
+        if file:
+            stream.close()
+            logger.info(f"Output written to {file}")
+
+
+def write_rows(column_names, rows, fmt=None, file=None, output=None):
+    """Write ``rows`` (e.g. a cursor) as they are iterated. Return the number of rows."""
+    count = 0
+    with open_writer(fmt, file, output) as writer:
+        writer.header(column_names)
+        for row in rows:
+            writer.row(row)
+            count += 1
+    return count
+
+
+def write_items(items, fmt=None, file=None, output=None):
+    """Write the JSON values of a result (a list or any iterable) as they are iterated.
+
+    JSON Lines writes each item as is. Tabular formats take their columns from
+    the keys of the first item (or a single ``value`` column for scalars).
+    Return the number of items.
+    """
+    if isinstance(items, dict) or not hasattr(items, '__iter__') or isinstance(items, str):
+        items = [items]
+    items = iter(items)
+    count = 0
+    with open_writer(fmt, file, output) as writer:
+        for item in items:
+            if count == 0:
+                column_names = list(item) if isinstance(item, dict) else ['value']
+                writer.header(column_names)
+            if isinstance(writer, JsonLinesWriter):
+                writer.item(item)
+            elif isinstance(item, dict):
+                writer.row([item.get(name) for name in column_names])
+            else:
+                writer.row([item])
+            count += 1
+    return count
@@ -0,0 +1,231 @@
+import io
+import os
+import sys
+import shlex
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+from src.save_result import commit_turn
+from src.command_plan import CommandPlan
+from src.sentence_options import split_options
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PARALLEL_MAX_WORKERS = int(os.getenv('PARALLEL_MAX_WORKERS', '8'))
+PARALLEL_PER_ACCOUNT = int(os.getenv('PARALLEL_PER_ACCOUNT', '2'))
+
+# Key used for sentences that may read any stored result (SQL queries)
+ALL_RESULTS = '*'
+
+
+class CommandNode:
+    """One sentence (a string or a CommandPlan) of the execution graph."""
+
+    def __init__(self, index, command, reads, writes, account_alias):
+        self.index = index
+        self.command = command
+        # For log messages: rendering a plan would call its converters again
+        self.sentence = command.sentence if isinstance(command, CommandPlan) else command
+        self.reads = reads
+        self.writes = writes
+        self.account_alias = account_alias
+        self.depends_on = set()
+        # Earlier sentences writing the same result; their results are committed first
+        self.commit_after = set()
+
+    def __repr__(self):
+        return f"CommandNode({self.index}, {self.sentence!r})"
+
+
+def analyze_command(command, service_config):
+    """Return ``(reads, writes, account_alias)`` for a sentence.
+
+    Reads and writes are sets of ``(service_name, method_name)`` keys, matching
+    the keys ``save_result``/``get_latest_result`` use. A CommandPlan is
+    analyzed without calling its converters.
+    """
+    if isinstance(command, CommandPlan):
+        if command.method is not None:
+            return set(), {(command.service_name, command.method_name)}, command.account_alias
+        command = command.template
+    if command.strip().upper().startswith("SELECT"):
+        return {ALL_RESULTS}, set(), None
+
+    try:
+        parts = shlex.split(split_options(command)[0])
+    except ValueError:
+        return set(), set(), None
+    if len(parts) < 2:
+        return set(), set(), None
+
+    action = parts[0].lower()
+    if action == 'filter' and len(parts) > 1 and '_' in parts[1]:
+        key = tuple(parts[1].split('_', 1))
+        return {key}, {key}, None
+    if action == 'print' and parts[1] == 'value':
+        # "... from Service_method", or the result name as the last word
+        words = [part.lower() for part in parts[:-1]]
+        data_key = parts[len(words) - words[::-1].index('from')] if 'from' in words[2:] else parts[-1]
+        if '_' in data_key:
+            return {tuple(data_key.split('_', 1))}, set(), None
+
+    method_parts = []
+    for part in parts:
+        if part in service_config:
+            service_name = service_config[part].get('service')
+            return set(), {(service_name, '_'.join(method_parts).lower())}, part
+        method_parts.append(part)
+    return set(), set(), None
+
+
+def build_dependency_graph(commands, service_config):
+    """Build the DAG of sentences, preserving read/write order on stored results.
+
+    A sentence depends on every earlier sentence that writes a result it reads,
+    and on every earlier sentence that reads a result it overwrites. SQL
+    queries read all results. Two sentences writing the same result run
+    concurrently; ``commit_after`` makes the later one commit last, so the
+    latest stored result still follows sentence order.
+    """
+    nodes = []
+    for index, command in enumerate(commands):
+        reads, writes, account_alias = analyze_command(command, service_config)
+        node = CommandNode(index, command, reads, writes, account_alias)
+        for earlier in nodes:
+            read_after_write = earlier.writes and (ALL_RESULTS in reads or reads & earlier.writes)
+            write_after_read = writes and (ALL_RESULTS in earlier.reads or writes & earlier.reads)
+            if read_after_write or write_after_read:
+                node.depends_on.add(earlier.index)
+            elif writes & earlier.writes:
+                node.commit_after.add(earlier.index)
+        nodes.append(node)
+    return nodes
+
+
+def commit_turn_waiter(node, committed):
+    """Return the function save_result calls before committing the result of ``node``.
+
+    ``committed`` maps sentence indexes to threading.Events set when the
+    sentence finished. Returns None when no earlier sentence writes the same result.
+    """
+    if not node.commit_after:
+        return None
+
+    def wait_for_turn():
+        for index in sorted(node.commit_after):
+            committed[index].wait()
+    return wait_for_turn
+
+
+def check_limits(**limits):
+    for name, value in limits.items():
+        if value < 1:
+            raise ValueError(f"{name} must be at least 1, got {value}")
+
+
+class OutputCapture(io.TextIOBase):
+    """Route ``print`` output of concurrently running sentences into buffers.
+
+    The active buffer lives in a context variable, so it follows both worker
+    threads and asyncio tasks (``asyncio.to_thread`` copies the context).
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self._buffer = contextvars.ContextVar('output_buffer', default=None)
+
+    @contextmanager
+    def capture(self, buffer=None):
+        if buffer is None:
+            buffer = io.StringIO()
+        token = self._buffer.set(buffer)
+        try:
+            yield buffer
+        finally:
+            self._buffer.reset(token)
+
+    def write(self, text):
+        buffer = self._buffer.get()
+        if buffer is None:
+            return self.target.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+
+def run_commands_parallel(commands, classes_and_objects, service_config, execute,
+                          max_workers=PARALLEL_MAX_WORKERS, per_account=PARALLEL_PER_ACCOUNT):
+    """Run sentences on a bounded thread pool following their dependency graph.
+
+    ``commands`` are sentences or CommandPlans; ``execute`` is called as
+    ``execute(command, classes_and_objects, service_config)`` with each of them
+    (e.g. execute_command or execute_plan).
+    At most ``per_account`` sentences run concurrently against the same account
+    alias. Printed output is emitted in sentence order regardless of completion
+    order. Both limits must be at least 1.
+    """
+    check_limits(max_workers=max_workers, per_account=per_account)
+    nodes = build_dependency_graph(commands, service_config)
+    stdout = OutputCapture(sys.stdout)
+    outputs = {}
+    emitted = 0
+    done = set()
+    started = set()
+    committed = {node.index: threading.Event() for node in nodes}
+    running = {}
+    account_load = {}
+    pending = list(nodes)
+
+    def run_node(node):
+        token = commit_turn.set(commit_turn_waiter(node, committed))
+        with stdout.capture() as buffer:
+            try:
+                execute(node.command, classes_and_objects, service_config)
+            except Exception as e:
+                logger.error(f"Error executing command '{node.sentence}': {str(e)}")
+            finally:
+                commit_turn.reset(token)
+                committed[node.index].set()
+        outputs[node.index] = buffer.getvalue()
+
+    original_stdout = sys.stdout
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                for node in list(pending):
+                    # A later writer of the same result only starts once the earlier
+                    # ones run, so waiting for its commit turn never holds up theirs
+                    if not node.depends_on <= done or not node.commit_after <= started:
+                        continue
+                    if node.account_alias and account_load.get(node.account_alias, 0) >= per_account:
+                        continue
+                    pending.remove(node)
+                    started.add(node.index)
+                    if node.account_alias:
+                        account_load[node.account_alias] = account_load.get(node.account_alias, 0) + 1
+                    running[pool.submit(run_node, node)] = node
+                    logger.debug(f"Scheduled command {node.index}: {node.sentence}")
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    done.add(node.index)
+                    if node.account_alias:
+                        account_load[node.account_alias] -= 1
+
+                # Flush output of every finished sentence whose predecessors are flushed
+                while emitted in done:
+                    original_stdout.write(outputs.pop(emitted))
+                    emitted += 1
+    finally:
+        sys.stdout = original_stdout
+    original_stdout.flush()
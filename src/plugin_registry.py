@@ -0,0 +1,208 @@
+import os
+import sys
+import ast
+import json
+import hashlib
+import inspect
+import importlib
+import logging
+import threading
+from collections.abc import Mapping
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PYTHON_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python'))
+PLUGIN_MANIFEST_PATH = os.getenv('PLUGIN_MANIFEST_PATH', '.plugin_manifest.json')
+MANIFEST_VERSION = 1
+
+
+def _file_sha1(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def _scan_module(path):
+    """Describe the classes of a plugin module without importing it."""
+    with open(path, 'r', encoding='utf-8') as file:
+        tree = ast.parse(file.read(), filename=path)
+
+    classes = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        methods = {}
+        for item in node.body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                methods[item.name.lower()] = f"({ast.unparse(item.args)})"
+        bases = [base.id for base in node.bases if isinstance(base, ast.Name)]
+        classes[node.name] = {'methods': methods, 'bases': bases}
+
+    # Inherit methods from base classes defined in the same module
+    for class_info in classes.values():
+        for base in class_info['bases']:
+            for method_name, signature in classes.get(base, {}).get('methods', {}).items():
+                class_info['methods'].setdefault(method_name, signature)
+    return classes
+
+
+def build_manifest(python_dir=PYTHON_DIR, manifest_path=PLUGIN_MANIFEST_PATH):
+    """Return the plugin manifest, rescanning only files that changed.
+
+    Entries are keyed on file mtime and size; when those change the content
+    hash decides whether the module has to be parsed again.
+    """
+    cached = {}
+    if manifest_path and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r') as file:
+                data = json.load(file)
+            if data.get('version') == MANIFEST_VERSION and data.get('python_dir') == python_dir:
+                cached = data.get('modules', {})
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable plugin manifest {manifest_path}: {e}")
+
+    modules = {}
+    changed = False
+    for filename in sorted(os.listdir(python_dir)):
+        if not filename.endswith('.py') or filename.startswith('__'):
+            continue
+        module_name = filename[:-3]
+        path = os.path.join(python_dir, filename)
+        stat = os.stat(path)
+        entry = cached.get(module_name)
+
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            modules[module_name] = entry
+            continue
+
+        sha1 = _file_sha1(path)
+        changed = True
+        if entry and entry['sha1'] == sha1:
+            entry = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        else:
+            logger.debug(f"Scanning plugin module: {module_name}")
+            try:
+                classes = _scan_module(path)
+            except SyntaxError as e:
+                logger.error(f"Cannot scan plugin module {module_name}: {e}")
+                classes = {}
+            entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': sha1, 'classes': classes}
+        modules[module_name] = entry
+
+    if changed or set(modules) != set(cached):
+        _write_manifest(manifest_path, python_dir, modules)
+    return modules
+
+
+def _write_manifest(manifest_path, python_dir, modules):
+    if not manifest_path:
+        return
+    tmp_path = f"{manifest_path}.tmp"
+    try:
+        with open(tmp_path, 'w') as file:
+            json.dump({'version': MANIFEST_VERSION, 'python_dir': python_dir, 'modules': modules}, file)
+        os.replace(tmp_path, manifest_path)
+        logger.debug(f"Plugin manifest written to {manifest_path}")
+    except OSError as e:
+        logger.warning(f"Could not write plugin manifest {manifest_path}: {e}")
+
+
+class PluginRegistry(Mapping):
+    """Lazy mapping of class name to ``{'class': ..., 'methods': ...}``.
+
+    Membership tests and method listings are answered from the manifest; the
+    plugin module is only imported when one of its classes is looked up.
+    """
+
+    def __init__(self, python_dir=PYTHON_DIR, manifest_path=PLUGIN_MANIFEST_PATH):
+        self.python_dir = python_dir
+        self.manifest_path = manifest_path
+        self._lock = threading.RLock()
+        self._loaded = {}
+        # sha1 of each module's file when it was last imported
+        self._imported = {}
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the manifest and forget classes whose module changed.
+
+        Return the names of the classes that were added, removed or whose
+        module changed; those modules are re-imported on next lookup.
+        """
+        modules = build_manifest(self.python_dir, self.manifest_path)
+        class_index = {}
+        for module_name, entry in modules.items():
+            for class_name in entry['classes']:
+                class_index[class_name] = module_name
+        with self._lock:
+            previous = getattr(self, '_modules', {})
+            previous_index = getattr(self, '_class_index', {})
+            changed_modules = {
+                module_name for module_name in set(modules) | set(previous)
+                if modules.get(module_name, {}).get('sha1') != previous.get(module_name, {}).get('sha1')
+            }
+            self._modules = modules
+            self._class_index = class_index
+            for class_name, loaded in list(self._loaded.items()):
+                if loaded['module'] in changed_modules:
+                    del self._loaded[class_name]
+        changed = {class_name for class_name, module_name in {**previous_index, **class_index}.items()
+                   if module_name in changed_modules or class_index.get(class_name) != previous_index.get(class_name)}
+        if previous and changed:
+            logger.info(f"Plugin classes changed: {', '.join(sorted(changed))}")
+        return changed
+
+    def module_for(self, class_name):
+        return self._class_index.get(class_name)
+
+    def describe(self):
+        """Return ``{class_name: {method_name: signature}}`` without importing anything."""
+        return {
+            class_name: self._modules[module_name]['classes'][class_name]['methods']
+            for class_name, module_name in self._class_index.items()
+        }
+
+    def _load(self, class_name):
+        module_name = self._class_index[class_name]
+        if self.python_dir not in sys.path:
+            sys.path.append(self.python_dir)
+        sha1 = self._modules[module_name]['sha1']
+        module = sys.modules.get(module_name)
+        if module is not None and self._imported.get(module_name, sha1) != sha1:
+            # The file changed since it was imported: classes loaded before
+            # keep running the old code, new lookups get the new module
+            logger.info(f"Reloading plugin module: {module_name}")
+            module = importlib.reload(module)
+        else:
+            logger.debug(f"Importing module: {module_name}")
+            module = importlib.import_module(module_name)
+        self._imported[module_name] = sha1
+        obj = getattr(module, class_name)
+        return {
+            'class': obj,
+            'methods': {method_name.lower(): method_obj for method_name, method_obj in inspect.getmembers(obj) if inspect.isfunction(method_obj) or inspect.ismethod(method_obj)},
+            'module': module_name,
+        }
+
+    def __getitem__(self, class_name):
+        if class_name not in self._class_index:
+            raise KeyError(class_name)
+        with self._lock:
+            loaded = self._loaded.get(class_name)
+            if loaded is None:
+                loaded = self._loaded[class_name] = self._load(class_name)
+            return loaded
+
+    def __contains__(self, class_name):
+        return class_name in self._class_index
+
+    def __iter__(self):
+        return iter(self._class_index)
+
+    def __len__(self):
+        return len(self._class_index)
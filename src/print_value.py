@@ -1,7 +1,13 @@
-from src.filter_data import filter_data
+from src.filter_expression import where_filter, equality_filter
 
-def print_value(data, value_key, filter_key, filter_value):
-    filtered_data = filter_data(data, filter_key, filter_value)
+def print_value(data, value_key, filter_key, filter_value=None):
+    if filter_value is None:
+        expression = where_filter(filter_key)
+        description = expression.text
+    else:
+        expression = equality_filter(filter_key, filter_value)
+        description = f"{filter_key}={filter_value}"
+    filtered_data = expression.filter(data)
     if filtered_data:
         if isinstance(filtered_data, list):
             for item in filtered_data:
@@ -9,4 +15,4 @@ def print_value(data, value_key, filter_key, filter_value):
         elif isinstance(filtered_data, dict):
             print(f"{value_key}: {filtered_data.get(value_key, 'Not found')}")
     else:
-        print(f"No data found matching the filter: {filter_key}={filter_value}")
+        print(f"No data found matching the filter: {description}")
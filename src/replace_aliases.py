@@ -1,23 +1,9 @@
-import shlex
-from src.get_function_from_string import get_function_from_string
+from src.command_plan import CommandCompiler
 
 def replace_aliases(command, aliases, converters):
-    parts = shlex.split(command)
-    new_parts = []
-    for part in parts:
-        if '=' in part:
-            key, value = part.split('=', 1)
-            new_key = aliases.get('param', {}).get(key, key)  # Use original if no alias
-            new_value = value  # Start with the original value
-            
-            # Apply converter if available
-            if value in converters:
-                converter_func = get_function_from_string(converters[value])
-                if converter_func:
-                    new_value = converter_func()
-            
-            new_parts.append(f"{new_key}={new_value}")
-        else:
-            # Use original if 'action' key doesn't exist or if there's no alias for this action
-            new_parts.append(aliases.get('action', {}).get(part.lower(), part))
-    return ' '.join(new_parts)
+    """Apply action/param aliases and converters to a sentence (SELECT sentences are left as is).
+
+    Compiles a throwaway plan; long-running callers should keep a
+    CommandCompiler so the parsing is done once per sentence.
+    """
+    return CommandCompiler(aliases, converters).compile(command).render()
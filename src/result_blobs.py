@@ -0,0 +1,184 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from src.db_connection import get_connection, register_connection_hook
+from src.result_codec import encode_result, decode_result
+from src.result_delta import encode_delta, decode_delta
+from src.result_writer import wait_for_pending_writes
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+QUERY_RESULTS_TABLE = "query"
+RESULT_BLOBS_TABLE = "result_blob"
+
+# Store results as structural patches against the previous result of the same command
+RESULT_DELTA = os.getenv('RESULT_DELTA', '0') == '1'
+# Longest patch chain before a full snapshot is stored again
+RESULT_DELTA_SNAPSHOT_EVERY = int(os.getenv('RESULT_DELTA_SNAPSHOT_EVERY', '20'))
+# Results smaller than this many bytes are always stored in full
+RESULT_DELTA_MIN_SIZE = int(os.getenv('RESULT_DELTA_MIN_SIZE', '4096'))
+# A patch is only kept if it is smaller than this fraction of the full result
+RESULT_DELTA_MAX_RATIO = 0.5
+# Recently read or written results kept in memory, keyed by content hash
+RESULT_BLOB_CACHE_SIZE = int(os.getenv('RESULT_BLOB_CACHE_SIZE', '16'))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached(data_hash):
+    with _cache_lock:
+        text = _cache.get(data_hash)
+        if text is not None:
+            _cache.move_to_end(data_hash)
+        return text
+
+
+def _remember(data_hash, text):
+    with _cache_lock:
+        _cache[data_hash] = text
+        _cache.move_to_end(data_hash)
+        while len(_cache) > RESULT_BLOB_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_blob_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _previous_blob(cursor, command, service_name, method_name):
+    return cursor.execute(f'''
+    SELECT q.blob_id, b.hash, b.delta_depth FROM {QUERY_RESULTS_TABLE} q
+    JOIN {RESULT_BLOBS_TABLE} b ON b.id = q.blob_id
+    WHERE q.service_name = ? AND q.method_name = ? AND q.command = ?
+    ORDER BY q.created_at_ns DESC, q.id DESC
+    LIMIT 1
+    ''', (service_name, method_name, command)).fetchone()
+
+
+def _encode_delta(cursor, command, service_name, method_name, text, size):
+    """Return ``(patch_text, base_blob_id, depth)`` or None to store ``text`` in full."""
+    if size < RESULT_DELTA_MIN_SIZE:
+        return None
+    previous = _previous_blob(cursor, command, service_name, method_name)
+    if previous is None:
+        return None
+    base_blob_id, base_hash, base_depth = previous
+    if base_depth + 1 > RESULT_DELTA_SNAPSHOT_EVERY:
+        return None
+    base_text = _cached(base_hash) or load_blob(cursor.connection, base_blob_id)
+    patch = encode_delta(base_text, text)
+    if patch is None or len(patch) > size * RESULT_DELTA_MAX_RATIO:
+        return None
+    return patch, base_blob_id, base_depth + 1
+
+
+def store_blob(cursor, service_name, method_name, text, data_hash, size, command=None, delta=None):
+    """Return ``(blob_id, created)`` for a serialized result, storing it only if its hash is new.
+
+    A new blob is encoded with the configured codec. With RESULT_DELTA (or
+    ``delta=True``) and a ``command``, it is stored as a patch against the
+    previous result of the same command when that is much smaller, up to
+    RESULT_DELTA_SNAPSHOT_EVERY patches in a row. ``first_query_id`` is left
+    for the caller to set once the owning query row exists.
+    """
+    row = cursor.execute(f"SELECT id FROM {RESULT_BLOBS_TABLE} WHERE hash = ?", (data_hash,)).fetchone()
+    if row is not None:
+        return row[0], False
+
+    base_blob_id, depth, payload = None, 0, text
+    if command is not None and (RESULT_DELTA if delta is None else delta):
+        encoded = _encode_delta(cursor, command, service_name, method_name, text, size)
+        if encoded is not None:
+            payload, base_blob_id, depth = encoded
+    stored, codec, dict_id = encode_result(cursor, service_name, method_name, payload)
+    cursor.execute(f'''
+    INSERT OR IGNORE INTO {RESULT_BLOBS_TABLE}
+        (hash, data, codec, codec_dict_id, size, base_blob_id, delta_depth)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (data_hash, stored, codec, dict_id, size, base_blob_id, depth))
+    if cursor.rowcount == 0:
+        # Another process stored the same content in the meantime
+        row = cursor.execute(f"SELECT id FROM {RESULT_BLOBS_TABLE} WHERE hash = ?", (data_hash,)).fetchone()
+        return row[0], False
+    _remember(data_hash, text)
+    return cursor.lastrowid, True
+
+
+def load_blob(conn, blob_id):
+    """Return the plain JSON text of a blob, or None if it does not exist.
+
+    Patches are applied from the nearest full snapshot or cached result.
+    """
+    chain = []
+    text = None
+    while blob_id is not None:
+        row = conn.execute(f'''
+        SELECT hash, data, codec, codec_dict_id, base_blob_id FROM {RESULT_BLOBS_TABLE} WHERE id = ?
+        ''', (blob_id,)).fetchone()
+        if row is None:
+            if chain:
+                raise LookupError(f"Base blob {blob_id} of a stored delta is missing")
+            return None
+        data_hash, data, codec, dict_id, base_blob_id = row
+        text = _cached(data_hash)
+        if text is not None:
+            break
+        payload = decode_result(data, codec, dict_id, conn)
+        if base_blob_id is None:
+            text = payload
+            _remember(data_hash, text)
+            break
+        chain.append((data_hash, payload))
+        blob_id = base_blob_id
+
+    for data_hash, patch in reversed(chain):
+        text = decode_delta(text, patch)
+    if chain:
+        _remember(chain[0][0], text)
+    return text
+
+
+def result_changed_since_last_run(service_name, method_name, command=None):
+    """Tell whether the latest result of a service method differs from the one before it.
+
+    Compares content hashes only, so no result is read or decoded. With
+    ``command`` only results saved by that exact sentence are compared. A
+    first result counts as changed; filter results are ignored.
+    """
+    wait_for_pending_writes()
+    sql = f'''
+    SELECT result_hash FROM {QUERY_RESULTS_TABLE}
+    WHERE service_name = ? AND method_name = ? AND source_query_id IS NULL
+    '''
+    params = [service_name, method_name]
+    if command is not None:
+        sql += " AND command = ?"
+        params.append(command)
+    sql += " ORDER BY created_at_ns DESC, id DESC LIMIT 2"
+    hashes = [row[0] for row in get_connection().execute(sql, params)]
+    return len(hashes) < 2 or hashes[0] != hashes[1]
+
+
+def _register_functions(conn):
+    conn.create_function('blob_json', 1, lambda blob_id: load_blob(conn, blob_id), deterministic=True)
+
+
+_registered = False
+
+
+def register_sql_functions():
+    """Let SQL read a stored result as ``blob_json(blob_id)``."""
+    global _registered
+    if not _registered:
+        _registered = True
+        register_connection_hook(_register_functions)
+
+
+register_sql_functions()
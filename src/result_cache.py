@@ -0,0 +1,136 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from src import db_connection
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Serialized bytes of decoded latest results kept in memory (0 disables the cache)
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+_NOT_DECODED = object()
+
+
+def parse_result(text):
+    """Parse a stored result; non-JSON results come back as text."""
+    try:
+        return json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        return text
+
+
+class _Entry:
+    __slots__ = ('query_id', 'text', 'value', 'size', 'checked')
+
+    def __init__(self, query_id, text, value, size):
+        self.query_id = query_id
+        self.text = text
+        self.value = value
+        self.size = size
+        # (connection, data_version, total_changes) the entry was last confirmed against
+        self.checked = None
+
+
+class LatestResultCache:
+    """Decoded latest results by ``(database, service_name, method_name)``, bounded by size.
+
+    An entry remembers the id of the row it was read from. It is trusted as
+    long as the reading connection has seen no commit: ``PRAGMA data_version``
+    changes when another connection or process commits and ``total_changes``
+    when this one writes. After that one indexed lookup of the latest row id
+    confirms it, so the result is only read and decoded again when it really
+    changed. Returned values are shared and must not be modified.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(service_name, method_name):
+        return db_connection.DB_PATH, service_name, method_name
+
+    @staticmethod
+    def state(conn):
+        """Return what an entry is confirmed against; take it before reading the row it holds."""
+        return conn, conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+    def get(self, conn, service_name, method_name, latest_id):
+        """Return ``(True, value)`` on a hit, ``(False, None)`` on a miss.
+
+        ``latest_id`` is called with no arguments to look up the current
+        latest row id when the entry needs confirming.
+        """
+        key = self._key(service_name, method_name)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        state = self.state(conn)
+        if entry.checked != state:
+            if latest_id() != entry.query_id:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                        self.total_bytes -= entry.size
+                return False, None
+            entry.checked = state
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            if entry.value is _NOT_DECODED:
+                entry.value = parse_result(entry.text)
+                entry.text = None
+            return True, entry.value
+
+    def put(self, conn, service_name, method_name, query_id, value=_NOT_DECODED, text=None, size=None, state=None):
+        """Remember the latest result of a method, decoded or as serialized ``text``.
+
+        ``state`` is ``state(conn)`` taken before the row was read, or inside
+        the transaction that wrote it. A commit by another connection after
+        that point then forces a recheck; taking the state now would hide it.
+        """
+        if size is None:
+            size = len(text) if text is not None else len(json.dumps(value))
+        if size > self.max_bytes:
+            self.discard(service_name, method_name)
+            return
+        entry = _Entry(query_id, text, value, size)
+        entry.checked = state if state is not None else self.state(conn)
+        key = self._key(service_name, method_name)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous.size
+            self._entries[key] = entry
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+
+    def discard(self, service_name, method_name):
+        with self._lock:
+            entry = self._entries.pop(self._key(service_name, method_name), None)
+            if entry is not None:
+                self.total_bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+latest_results = LatestResultCache()
+
+
+def clear_result_cache():
+    latest_results.clear()
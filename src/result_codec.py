@@ -0,0 +1,132 @@
+import os
+import lzma
+import zlib
+import logging
+from dotenv import load_dotenv
+from src.db_connection import get_connection, register_connection_hook
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+CODEC_DICT_TABLE = "result_codec_dict"
+
+# Codec for newly stored results: none, zlib or lzma
+RESULT_CODEC = os.getenv('RESULT_CODEC', 'none').lower()
+# Results smaller than this many bytes are stored as plain text
+RESULT_CODEC_MIN_SIZE = int(os.getenv('RESULT_CODEC_MIN_SIZE', '1024'))
+RESULT_CODEC_LEVEL = int(os.getenv('RESULT_CODEC_LEVEL', '6'))
+# zlib can only refer back 32 KiB, so a longer dictionary would be wasted
+ZLIB_DICT_SIZE = 32 * 1024
+
+# Decompression dictionaries by id; they are never modified once stored
+_dictionaries = {}
+
+
+def _zlib_encode(data, zdict, level):
+    if zdict:
+        compressor = zlib.compressobj(level, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _zlib_decode(data, zdict):
+    decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+CODECS = {
+    'zlib': (_zlib_encode, _zlib_decode),
+    'lzma': (lambda data, zdict, level: lzma.compress(data, preset=min(level, 9)),
+             lambda data, zdict: lzma.decompress(data)),
+}
+
+
+def _load_dictionary(dict_id, conn=None):
+    zdict = _dictionaries.get(dict_id)
+    if zdict is None:
+        row = (conn or get_connection()).execute(
+            f"SELECT data FROM {CODEC_DICT_TABLE} WHERE id = ?", (dict_id,)).fetchone()
+        if row is None:
+            raise LookupError(f"Compression dictionary {dict_id} is missing")
+        zdict = _dictionaries[dict_id] = bytes(row[0])
+    return zdict
+
+
+def _dictionary_for(cursor, service_name, method_name, data):
+    """Return ``(dict_id, zdict)`` for a service method, training one from ``data`` if needed.
+
+    The first stored result of a method becomes the dictionary for the
+    following ones, which usually share most of its keys and values. That
+    first result itself is compressed without a dictionary. The lookup is not
+    cached so a rolled-back dictionary is never used.
+    """
+    row = cursor.execute(f'''
+    SELECT id, data FROM {CODEC_DICT_TABLE}
+    WHERE service_name = ? AND method_name = ?
+    ORDER BY id DESC LIMIT 1
+    ''', (service_name, method_name)).fetchone()
+    if row is not None:
+        return row[0], bytes(row[1])
+
+    cursor.execute(f'''
+    INSERT INTO {CODEC_DICT_TABLE} (service_name, method_name, data) VALUES (?, ?, ?)
+    ''', (service_name, method_name, data[:ZLIB_DICT_SIZE]))
+    logger.info(f"Trained compression dictionary {cursor.lastrowid} for {service_name}.{method_name}")
+    return None, None
+
+
+def encode_result(cursor, service_name, method_name, text, codec=None):
+    """Prepare a serialized result for storage.
+
+    Returns ``(stored, codec, dict_id)``: the plain text with codec None when
+    compression is off or not worthwhile, otherwise the compressed bytes.
+    """
+    codec = (codec or RESULT_CODEC).lower()
+    data = text.encode('utf-8')
+    if codec == 'none' or len(data) < RESULT_CODEC_MIN_SIZE:
+        return text, None, None
+    encode, _ = CODECS[codec]
+    dict_id = zdict = None
+    if codec == 'zlib':
+        dict_id, zdict = _dictionary_for(cursor, service_name, method_name, data)
+    compressed = encode(data, zdict, RESULT_CODEC_LEVEL)
+    if len(compressed) >= len(data):
+        return text, None, None
+    return compressed, codec, dict_id
+
+
+def decode_result(stored, codec, dict_id=None, conn=None):
+    """Return the plain JSON text of a stored result."""
+    if codec is None or stored is None:
+        return stored
+    _, decode = CODECS[codec]
+    zdict = _load_dictionary(dict_id, conn) if dict_id is not None else None
+    return decode(bytes(stored), zdict).decode('utf-8')
+
+
+def forget_dictionaries():
+    """Drop cached dictionaries (e.g. after switching databases)."""
+    _dictionaries.clear()
+
+
+def _register_functions(conn):
+    def result_json(stored, codec, dict_id):
+        return decode_result(stored, codec, dict_id, conn)
+    conn.create_function('result_json', 3, result_json, deterministic=True)
+
+
+_registered = False
+
+
+def register_sql_functions():
+    """Let SQL read stored results as ``result_json(result, result_codec, codec_dict_id)``."""
+    global _registered
+    if not _registered:
+        _registered = True
+        register_connection_hook(_register_functions)
+
+
+register_sql_functions()
@@ -0,0 +1,117 @@
+import json
+import difflib
+
+# Structural patches between two JSON values. A patch is one of:
+#   {"v": value}                         replace with value
+#   {"l": [op, ...]}                     list: ops are [start, end] to copy a slice
+#                                        of the old list, {"v": [items]} to insert
+#                                        items, or {"p": patch, "at": i} to patch
+#                                        item i of the old list
+#   {"d": {"set": {...}, "del": [...],   dict: keys to set, delete and patch;
+#          "patch": {...}, "order": [...]}}  "order" only when the key order changed
+
+
+def diff(old, new):
+    """Return a patch turning ``old`` into ``new``."""
+    if isinstance(old, list) and isinstance(new, list):
+        return {'l': _diff_list(old, new)}
+    if isinstance(old, dict) and isinstance(new, dict):
+        return {'d': _diff_dict(old, new)}
+    return {'v': new}
+
+
+def _diff_list(old, new):
+    matcher = difflib.SequenceMatcher(None, [json.dumps(item) for item in old], [json.dumps(item) for item in new],
+                                      autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag == 'replace' and i2 - i1 == j2 - j1:
+            # Same number of items changed in place: patch them one by one
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                ops.append({'p': diff(old[i], new[j]), 'at': i})
+        elif tag in ('replace', 'insert'):
+            ops.append({'v': new[j1:j2]})
+    return ops
+
+
+def _diff_dict(old, new):
+    changes = {}
+    set_values = {k: v for k, v in new.items() if k not in old}
+    deleted = [k for k in old if k not in new]
+    patches = {}
+    for k, v in new.items():
+        if k in old and old[k] != v:
+            if isinstance(v, (dict, list)) and type(old[k]) is type(v):
+                patches[k] = diff(old[k], v)
+            else:
+                set_values[k] = v
+    if set_values:
+        changes['set'] = set_values
+    if deleted:
+        changes['del'] = deleted
+    if patches:
+        changes['patch'] = patches
+    if list(new) != [k for k in old if k in new] + [k for k in new if k not in old]:
+        changes['order'] = list(new)
+    return changes
+
+
+def apply(old, patch):
+    """Return the value ``patch`` turns ``old`` into (``old`` is not modified)."""
+    if 'v' in patch:
+        return patch['v']
+    if 'l' in patch:
+        result = []
+        for op in patch['l']:
+            if isinstance(op, list):
+                result.extend(old[op[0]:op[1]])
+            elif 'p' in op:
+                result.append(apply(old[op['at']], op['p']))
+            else:
+                result.extend(op['v'])
+        return result
+    changes = patch['d']
+    deleted = set(changes.get('del', ()))
+    patches = changes.get('patch', {})
+    set_values = changes.get('set', {})
+    result = {}
+    for k, v in old.items():
+        if k in deleted:
+            continue
+        if k in set_values:
+            result[k] = set_values[k]
+        elif k in patches:
+            result[k] = apply(v, patches[k])
+        else:
+            result[k] = v
+    for k, v in set_values.items():
+        if k not in result:
+            result[k] = v
+    if 'order' in changes:
+        result = {k: result[k] for k in changes['order']}
+    return result
+
+
+def encode_delta(old_text, new_text):
+    """Return the patch text turning one serialized result into the other, or None.
+
+    None means there is no usable delta: either text is not JSON, or
+    re-serializing the patched value would not reproduce ``new_text`` byte
+    for byte (so the content hash would not match).
+    """
+    try:
+        old = json.loads(old_text)
+        new = json.loads(new_text)
+    except (TypeError, ValueError):
+        return None
+    patch = diff(old, new)
+    if json.dumps(apply(old, patch)) != new_text:
+        return None
+    return json.dumps(patch, separators=(',', ':'))
+
+
+def decode_delta(old_text, patch_text):
+    """Rebuild a serialized result from its base result and patch text."""
+    return json.dumps(apply(json.loads(old_text), json.loads(patch_text)))
@@ -0,0 +1,62 @@
+import logging
+from datetime import datetime
+from src.db_connection import get_connection
+from src.result_writer import wait_for_pending_writes
+from src.get_latest_result import load_result
+
+# Configure logging
+logger = logging.getLogger(__name__)
+QUERY_RESULTS_TABLE = "query"
+
+
+def _timestamp_ns(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1_000_000_000)
+    return value
+
+
+def _filters(service_name, method_name, command):
+    sql = "service_name = ? AND method_name = ?"
+    params = [service_name, method_name]
+    if command is not None:
+        sql += " AND command = ?"
+        params.append(command)
+    return sql, params
+
+
+def get_result_at(service_name, method_name, at, command=None):
+    """Return the result a service method had at ``at`` (datetime or nanoseconds), or None."""
+    wait_for_pending_writes()
+    conn = get_connection()
+    where, params = _filters(service_name, method_name, command)
+    row = conn.execute(f'''
+    SELECT id, source_query_id, blob_id FROM {QUERY_RESULTS_TABLE}
+    WHERE {where} AND created_at_ns <= ?
+    ORDER BY created_at_ns DESC, id DESC
+    LIMIT 1
+    ''', (*params, _timestamp_ns(at))).fetchone()
+    return load_result(conn, *row) if row else None
+
+
+def iter_result_history(service_name, method_name, command=None, since=None, until=None):
+    """Yield ``(query_id, created_at_ns, result)`` for stored results, oldest first.
+
+    Delta-encoded results are rebuilt from the previous one, which is still
+    in the blob cache, so walking a history applies each patch once.
+    """
+    wait_for_pending_writes()
+    conn = get_connection()
+    where, params = _filters(service_name, method_name, command)
+    if since is not None:
+        where += " AND created_at_ns >= ?"
+        params.append(_timestamp_ns(since))
+    if until is not None:
+        where += " AND created_at_ns <= ?"
+        params.append(_timestamp_ns(until))
+    rows = conn.execute(f'''
+    SELECT id, created_at_ns, source_query_id, blob_id FROM {QUERY_RESULTS_TABLE}
+    WHERE {where}
+    ORDER BY created_at_ns, id
+    ''', params).fetchall()
+    for query_id, created_at_ns, source_query_id, blob_id in rows:
+        yield query_id, created_at_ns, load_result(conn, query_id, source_query_id, blob_id)
@@ -0,0 +1,119 @@
+import json
+import sqlite3
+import logging
+from src.db_connection import get_connection
+from src.result_writer import wait_for_pending_writes
+
+# Configure logging
+logger = logging.getLogger(__name__)
+QUERY_RESULTS_TABLE = "query"
+QUERY_ITEMS_TABLE = "query_item"
+QUERY_REFS_TABLE = "query_ref"
+RESULT_BLOBS_TABLE = "result_blob"
+
+# json_each yields SQL values for scalars; turn them back into JSON text
+_ELEMENT_JSON = '''
+CASE type
+    WHEN 'object' THEN value
+    WHEN 'array' THEN value
+    WHEN 'true' THEN 'true'
+    WHEN 'false' THEN 'false'
+    ELSE json_quote(value)
+END'''
+
+def explode_result(cursor, query_id, result):
+    """Store each element of a JSON array result as its own query_item row.
+
+    ``item_id`` and ``item_name`` copy the element's ``id`` and ``name`` keys
+    so lookups by them can use an index. Non-array results are ignored.
+    """
+    if not isinstance(result, str) or not result.lstrip().startswith('['):
+        return
+    try:
+        cursor.execute(f'''
+        INSERT INTO {QUERY_ITEMS_TABLE} (query_id, item_index, element, item_id, item_name)
+        SELECT ?, key, {_ELEMENT_JSON},
+               CASE WHEN type = 'object' THEN json_extract(value, '$.id') END,
+               CASE WHEN type = 'object' THEN json_extract(value, '$.name') END
+        FROM json_each(?)
+        ''', (query_id, result))
+    except sqlite3.OperationalError as e:
+        # Not valid JSON after all; the raw result is still stored in query
+        logger.debug(f"Result {query_id} not exploded: {e}")
+
+def get_latest_result_id(service_name, method_name):
+    """Return the id of the latest stored result for a service method, or None."""
+    wait_for_pending_writes()
+    row = get_connection().execute(f'''
+    SELECT id FROM {QUERY_RESULTS_TABLE}
+    WHERE service_name = ? AND method_name = ?
+    ORDER BY created_at_ns DESC, id DESC
+    LIMIT 1
+    ''', (service_name, method_name)).fetchone()
+    return row[0] if row else None
+
+def item_source(query_id, conn=None):
+    """Describe where the elements of a stored list result live.
+
+    Returns ``(sql, params, items_query_id)`` where ``sql`` selects
+    ``item_index, element`` rows aliased as ``i`` and ``items_query_id`` is
+    the query row the elements are stored under, or None if the result is
+    not an exploded list. Repeated results share the elements of the first
+    row with the same content; reference rows (saved by filter) resolve to
+    the referenced items.
+    """
+    conn = conn or get_connection()
+    row = conn.execute(f'''
+    SELECT q.source_query_id, b.first_query_id,
+           EXISTS (SELECT 1 FROM {QUERY_ITEMS_TABLE} WHERE query_id = b.first_query_id),
+           b.codec IS NULL AND b.base_blob_id IS NULL AND substr(ltrim(b.data), 1, 1) = '['
+    FROM {QUERY_RESULTS_TABLE} q
+    LEFT JOIN {RESULT_BLOBS_TABLE} b ON b.id = q.blob_id
+    WHERE q.id = ?
+    ''', (query_id,)).fetchone()
+    if row is None:
+        return None
+    source_query_id, items_query_id, has_items, is_list = row
+    if source_query_id is not None:
+        return (f'''
+        {QUERY_ITEMS_TABLE} i
+        JOIN {QUERY_REFS_TABLE} r ON r.query_id = ? AND r.item_index = i.item_index
+        WHERE i.query_id = ?''', [query_id, source_query_id], source_query_id)
+    if has_items or is_list:
+        return (f"{QUERY_ITEMS_TABLE} i WHERE i.query_id = ?", [items_query_id], items_query_id)
+    return None
+
+def materialize_reference(conn, query_id, source_query_id):
+    """Rebuild the JSON text of a reference row from the items it points to.
+
+    The text is formatted by serialize_result, like a result saved in full.
+    """
+    # Imported here: save_result imports this module
+    from src.save_result import serialize_result
+    rows = conn.execute(f'''
+    SELECT i.element FROM {QUERY_ITEMS_TABLE} i
+    JOIN {QUERY_REFS_TABLE} r ON r.query_id = ? AND r.item_index = i.item_index
+    WHERE i.query_id = ?
+    ORDER BY i.item_index
+    ''', (query_id, source_query_id)).fetchall()
+    return serialize_result([json.loads(element) for (element,) in rows])
+
+def iter_result_items(query_id, page_size=500):
+    """Yield the decoded elements of a list result, one page of rows at a time."""
+    conn = get_connection()
+    source = item_source(query_id, conn)
+    if source is None:
+        return
+    source_sql, params, _ = source
+    last_index = -1
+    while True:
+        rows = conn.execute(f'''
+        SELECT i.item_index, i.element FROM {source_sql} AND i.item_index > ?
+        ORDER BY i.item_index
+        LIMIT ?
+        ''', (*params, last_index, page_size)).fetchall()
+        if not rows:
+            return
+        for item_index, element in rows:
+            yield json.loads(element)
+        last_index = rows[-1][0]
@@ -0,0 +1,190 @@
+import os
+import atexit
+import queue
+import random
+import logging
+import threading
+import logging.handlers
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _log_level(name):
+    """Return the numeric level for a level name or number, or INFO (with a warning) if it is unknown."""
+    name = name.strip().upper()
+    if name.isdigit():
+        return int(name)
+    level = logging.getLevelName(name)
+    if isinstance(level, int):
+        return level
+    logger.warning(f"Unknown RESULT_LOG_LEVEL '{name}', using INFO")
+    return logging.INFO
+
+
+# Level of the per-call result summaries
+RESULT_LOG_LEVEL = _log_level(os.getenv('RESULT_LOG_LEVEL', 'INFO'))
+# Characters of the serialized result shown in a summary (0 logs the summary fields only)
+RESULT_LOG_MAX_CHARS = int(os.getenv('RESULT_LOG_MAX_CHARS', '200'))
+# Fraction of the calls of a method whose result is logged
+RESULT_LOG_SAMPLE = float(os.getenv('RESULT_LOG_SAMPLE', '1'))
+# Hand log records to a background thread instead of writing them in the calling thread
+LOG_QUEUE = os.getenv('LOG_QUEUE', '1') == '1'
+
+_policies = {}
+_default_policy = None
+_lock = threading.Lock()
+_listener = None
+_queued_logger = None
+
+
+class ResultLogPolicy:
+    """How the results of one service method are logged.
+
+    ``max_chars`` characters of the serialized result are shown after the
+    summary fields (0 shows none); ``sample`` is the fraction of calls
+    logged at all (1 logs every call, 0 none).
+    """
+
+    def __init__(self, max_chars=RESULT_LOG_MAX_CHARS, sample=RESULT_LOG_SAMPLE):
+        self.max_chars = int(max_chars)
+        self.sample = float(sample)
+
+    @classmethod
+    def from_declaration(cls, declaration, base=None):
+        values = dict(vars(base)) if base is not None else {}
+        values.update(declaration or {})
+        unknown = set(values) - {'max_chars', 'sample'}
+        if unknown:
+            raise ValueError(f"Unknown result logging settings: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+    def sampled(self):
+        return self.sample >= 1 or (self.sample > 0 and random.random() < self.sample)
+
+    def __repr__(self):
+        return f"ResultLogPolicy(max_chars={self.max_chars}, sample={self.sample})"
+
+
+def configure_result_logging(declarations=None):
+    """Register the result logging policies from commands.yaml.
+
+    ``declarations`` maps ``"Service.method"`` (or ``default``) to a mapping
+    with ``max_chars`` and/or ``sample``. Method entries inherit what they
+    leave out from ``default``, which starts from the RESULT_LOG_*
+    environment variables.
+    """
+    global _default_policy
+    declarations = dict(declarations or {})
+    default = ResultLogPolicy.from_declaration(declarations.pop('default', None), ResultLogPolicy())
+    policies = {}
+    for key, declaration in declarations.items():
+        service_name, method_name = key.split('.', 1)
+        policies[(service_name, method_name)] = ResultLogPolicy.from_declaration(declaration, default)
+
+    with _lock:
+        _default_policy = default
+        _policies.clear()
+        _policies.update(policies)
+    return policies
+
+
+def policy_for(service_name, method_name):
+    with _lock:
+        return _policies.get((service_name, method_name)) or _default_policy or ResultLogPolicy()
+
+
+class ResultSummary:
+    """Formats to e.g. ``120 items, 48213 bytes in 0.84s: [{"id": 1, ...`` when a record is emitted.
+
+    Only ``len()`` of the result and a slice of its serialized text are
+    used, so the cost does not grow with the size of the result. ``size``
+    is the byte size of the stored text when the caller already knows it.
+    """
+
+    __slots__ = ('result', 'text', 'duration', 'max_chars', 'size')
+
+    def __init__(self, result, text, duration, max_chars, size=None):
+        self.result = result
+        self.text = text
+        self.duration = duration
+        self.max_chars = max_chars
+        self.size = size
+
+    def __str__(self):
+        parts = []
+        if isinstance(self.result, (list, tuple)):
+            parts.append(f"{len(self.result)} items")
+        elif isinstance(self.result, dict):
+            parts.append(f"{len(self.result)} keys")
+        if self.size is not None:
+            parts.append(f"{self.size} bytes")
+        summary = ', '.join(parts) or type(self.result).__name__
+        if self.duration is not None:
+            summary += f" in {self.duration:.2f}s"
+        if self.max_chars > 0 and self.text is not None:
+            preview = self.text[:self.max_chars]
+            if len(self.text) > self.max_chars:
+                preview += '... (truncated)'
+            summary += f": {preview}"
+        return summary
+
+
+def log_result(service_name, method_name, result, text=None, duration=None, log=None, size=None):
+    """Log a summary of a service result according to the method's policy.
+
+    ``text`` is the serialized result when the caller already has it (for
+    the preview) and ``size`` its byte size if already counted; nothing is
+    formatted unless the record is actually emitted.
+    """
+    log = log or logger
+    if not log.isEnabledFor(RESULT_LOG_LEVEL):
+        return
+    policy = policy_for(service_name, method_name)
+    if not policy.sampled():
+        return
+    log.log(RESULT_LOG_LEVEL, "Result of %s.%s: %s", service_name, method_name,
+            ResultSummary(result, text, duration, policy.max_chars, size))
+
+
+def start_log_queue(root=None):
+    """Move the handlers of ``root`` behind a QueueHandler and write records on a listener thread.
+
+    Returns the QueueListener (already started and stopped at exit), or
+    None when LOG_QUEUE is off or the handlers are already queued.
+    """
+    global _listener, _queued_logger
+    root = root or logging.getLogger()
+    if not LOG_QUEUE or _listener is not None:
+        return None
+    handlers = [handler for handler in root.handlers if not isinstance(handler, logging.handlers.QueueHandler)]
+    if not handlers:
+        return None
+    records = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _queued_logger = root
+    _listener.start()
+    atexit.register(stop_log_queue)
+    return _listener
+
+
+def stop_log_queue():
+    """Flush the queued records and put the original handlers back."""
+    global _listener, _queued_logger
+    listener, _listener = _listener, None
+    root, _queued_logger = _queued_logger, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler) and handler.queue is listener.queue:
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
@@ -0,0 +1,186 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from dotenv import load_dotenv
+from src.db_connection import transaction
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RESULT_WRITE_BEHIND = os.getenv('RESULT_WRITE_BEHIND', '0') == '1'
+RESULT_WRITE_BATCH_SIZE = int(os.getenv('RESULT_WRITE_BATCH_SIZE', '200'))
+RESULT_WRITE_FLUSH_INTERVAL = float(os.getenv('RESULT_WRITE_FLUSH_INTERVAL', '0.2'))
+
+
+class PendingResult:
+    """Handle for a saved result; ``wait()`` returns its row id once it is committed.
+
+    ``size`` is the byte size of the stored text, known as soon as it is queued.
+    """
+
+    def __init__(self):
+        self.id = None
+        self.size = None
+        self.error = None
+        self._done = threading.Event()
+
+    @classmethod
+    def completed(cls, row_id):
+        handle = cls()
+        handle._set(row_id)
+        return handle
+
+    def _set(self, row_id=None, error=None):
+        self.id = row_id
+        self.error = error
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError("Result was not written in time")
+        if self.error is not None:
+            raise self.error
+        return self.id
+
+
+_FLUSH = object()
+_STOP = object()
+
+
+class ResultWriter:
+    """Background thread that writes queued results in multi-row transactions.
+
+    A batch is committed when it reaches ``batch_size`` rows, when
+    ``flush_interval`` seconds have passed since its first row, or on flush
+    and shutdown.
+    """
+
+    def __init__(self, insert, batch_size=RESULT_WRITE_BATCH_SIZE, flush_interval=RESULT_WRITE_FLUSH_INTERVAL):
+        self.insert = insert
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def enqueue(self, *row):
+        """Queue ``row`` for ``insert(cursor, *row)`` and return its PendingResult."""
+        handle = PendingResult()
+        with self._lock:
+            self._pending += 1
+        self._queue.put((row, handle))
+        return handle
+
+    def flush(self, timeout=None):
+        """Block until every row queued so far is committed."""
+        marker = threading.Event()
+        self._queue.put((_FLUSH, marker))
+        if not marker.wait(timeout):
+            raise TimeoutError("Result writer did not flush in time")
+
+    def close(self):
+        """Flush the remaining rows and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put((_STOP, None))
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = []
+            markers = []
+            stop = False
+            item, handle = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if item is _FLUSH:
+                    markers.append(handle)
+                    break
+                batch.append((item, handle))
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item, handle = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def _write(self, batch):
+        try:
+            with transaction() as cursor:
+                row_ids = [self.insert(cursor, *row) for row, _ in batch]
+            for (_, handle), row_id in zip(batch, row_ids):
+                handle._set(row_id)
+        except Exception as e:
+            # Retry row by row so a single bad row does not lose the whole batch
+            logger.error(f"Batch write of {len(batch)} results failed, retrying individually: {e}")
+            for row, handle in batch:
+                try:
+                    with transaction() as cursor:
+                        handle._set(self.insert(cursor, *row))
+                except Exception as row_error:
+                    logger.error(f"Error saving result: {row_error}")
+                    handle._set(error=row_error)
+        logger.debug(f"Wrote batch of {len(batch)} results")
+        with self._lock:
+            self._pending -= len(batch)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def enable_write_behind(insert, batch_size=RESULT_WRITE_BATCH_SIZE, flush_interval=RESULT_WRITE_FLUSH_INTERVAL):
+    """Start the shared writer if it is not running and return it."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ResultWriter(insert, batch_size, flush_interval)
+            atexit.register(disable_write_behind)
+            logger.info("Write-behind result writer started")
+        return _writer
+
+
+def disable_write_behind():
+    """Flush and stop the shared writer; later saves are written synchronously."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+        logger.info("Write-behind result writer stopped")
+
+
+def get_result_writer():
+    return _writer
+
+
+def wait_for_pending_writes():
+    """Make queued results visible to readers (read-your-writes)."""
+    writer = _writer
+    if writer is not None and writer.pending:
+        writer.flush()
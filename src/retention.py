@@ -0,0 +1,295 @@
+import os
+import time
+import json
+import logging
+import threading
+from dotenv import load_dotenv
+from src.db_connection import get_connection, transaction
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+# Table behind the query view (see migrations); rows are written here
+QUERY_ROWS_TABLE = "query_row"
+QUERY_ITEMS_TABLE = "query_item"
+QUERY_REFS_TABLE = "query_ref"
+RESULT_BLOBS_TABLE = "result_blob"
+MAINTENANCE_RUNS_TABLE = "maintenance_run"
+
+DAY_NS = 86400 * 1000000000
+
+
+def _env_int(name):
+    value = os.getenv(name, '').strip()
+    return int(value) if value else None
+
+
+# Default policy for methods without their own entry in commands.yaml (unset keeps everything)
+RETENTION_KEEP_LAST = _env_int('RETENTION_KEEP_LAST')
+RETENTION_KEEP_DAYS = _env_int('RETENTION_KEEP_DAYS')
+RETENTION_DAILY_AFTER_DAYS = _env_int('RETENTION_DAILY_AFTER_DAYS')
+# Seconds between retention runs started by the scheduler
+RETENTION_INTERVAL = float(os.getenv('RETENTION_INTERVAL', '3600'))
+# Rows deleted per write transaction, and seconds to pause between two of them
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '500'))
+RETENTION_BATCH_PAUSE = float(os.getenv('RETENTION_BATCH_PAUSE', '0.05'))
+# Free pages handed back to the file system per incremental_vacuum step
+RETENTION_VACUUM_PAGES = int(os.getenv('RETENTION_VACUUM_PAGES', '1000'))
+# Rebuild an existing database (one long VACUUM) so it can use incremental vacuum
+RETENTION_CONVERT_VACUUM = os.getenv('RETENTION_CONVERT_VACUUM', '0') == '1'
+
+_policies = {}
+_default_policy = None
+_lock = threading.Lock()
+
+
+class RetentionPolicy:
+    """How long the results of one service method are kept.
+
+    A result is kept if any rule keeps it: it is one of the newest
+    ``keep_last``, or younger than ``daily_after_days`` (or ``keep_days``
+    when results are not downsampled), or it is the last result of its UTC
+    day and younger than ``keep_days`` (no limit when unset). Results saved
+    by filter are counted separately from the results they select.
+    """
+
+    def __init__(self, keep_last=None, keep_days=None, daily_after_days=None):
+        self.keep_last = keep_last
+        self.keep_days = keep_days
+        self.daily_after_days = daily_after_days
+
+    @classmethod
+    def from_declaration(cls, declaration, base=None):
+        values = dict(vars(base)) if base is not None else {}
+        values.update(declaration or {})
+        unknown = set(values) - {'keep_last', 'keep_days', 'daily_after_days'}
+        if unknown:
+            raise ValueError(f"Unknown retention settings: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+    def is_set(self):
+        return any(value is not None for value in (self.keep_last, self.keep_days, self.daily_after_days))
+
+    def cutoffs(self, now_ns):
+        """Return ``(window_ns, horizon_ns)``: every row at or after ``window_ns`` is kept;
+        daily samples are kept back to ``horizon_ns``."""
+        window_days = self.daily_after_days if self.daily_after_days is not None else self.keep_days
+        window_ns = now_ns - window_days * DAY_NS if window_days is not None else None
+        horizon_ns = now_ns - self.keep_days * DAY_NS if self.keep_days is not None else None
+        return window_ns, horizon_ns
+
+    def __repr__(self):
+        return (f"RetentionPolicy(keep_last={self.keep_last}, keep_days={self.keep_days}, "
+                f"daily_after_days={self.daily_after_days})")
+
+
+def configure_retention(declarations=None):
+    """Register the retention policies from commands.yaml.
+
+    ``declarations`` maps ``"Service.method"`` (or ``default``) to a mapping
+    with any of ``keep_last``, ``keep_days`` and ``daily_after_days``. Method
+    entries inherit the settings they leave out from ``default``, which in
+    turn starts from the RETENTION_* environment variables.
+    """
+    global _default_policy
+    declarations = dict(declarations or {})
+    default = RetentionPolicy.from_declaration(declarations.pop('default', None), RetentionPolicy(
+        RETENTION_KEEP_LAST, RETENTION_KEEP_DAYS, RETENTION_DAILY_AFTER_DAYS))
+    policies = {}
+    for key, declaration in declarations.items():
+        service_name, method_name = key.split('.', 1)
+        policies[(service_name, method_name)] = RetentionPolicy.from_declaration(declaration, default)
+
+    with _lock:
+        _default_policy = default
+        _policies.clear()
+        _policies.update(policies)
+    return policies
+
+
+def policy_for(service_name, method_name):
+    with _lock:
+        default = _default_policy
+        policy = _policies.get((service_name, method_name))
+    if policy is None:
+        policy = default or RetentionPolicy(RETENTION_KEEP_LAST, RETENTION_KEEP_DAYS, RETENTION_DAILY_AFTER_DAYS)
+    return policy
+
+
+def expired_query_ids(conn, service_name, method_name, policy, now_ns):
+    """Return the ids of the rows of a service method that ``policy`` no longer keeps."""
+    if not policy.is_set():
+        return []
+    window_ns, horizon_ns = policy.cutoffs(now_ns)
+    daily = policy.daily_after_days is not None
+    rows = conn.execute(f'''
+    SELECT id FROM (
+        SELECT id, created_at_ns,
+               ROW_NUMBER() OVER (PARTITION BY source_query_id IS NULL
+                                  ORDER BY created_at_ns DESC, id DESC) AS position,
+               ROW_NUMBER() OVER (PARTITION BY source_query_id IS NULL, created_at_ns / {DAY_NS}
+                                  ORDER BY created_at_ns DESC, id DESC) AS day_position
+        FROM {QUERY_ROWS_TABLE}
+        WHERE service_name = ? AND method_name = ?
+    )
+    WHERE position > ?
+      AND (? IS NULL OR created_at_ns < ?)
+      AND NOT (? AND day_position = 1 AND (? IS NULL OR created_at_ns >= ?))
+    ORDER BY id
+    ''', (service_name, method_name, policy.keep_last or 0, window_ns, window_ns,
+          daily, horizon_ns, horizon_ns))
+    return [row[0] for row in rows]
+
+
+def _extract_tables(cursor):
+    return [row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'extract\\_%' ESCAPE '\\'")]
+
+
+def _delete_batch(cursor, query_ids):
+    """Delete some query rows with everything only they use. Return ``(rows, blobs)`` deleted."""
+    ids_json = json.dumps(query_ids)
+    # Rows that filter references select from stay until those references expire
+    ids = [row[0] for row in cursor.execute(f'''
+    SELECT q.id FROM {QUERY_ROWS_TABLE} q
+    WHERE q.id IN (SELECT value FROM json_each(?))
+      AND NOT EXISTS (SELECT 1 FROM {QUERY_ROWS_TABLE} r WHERE r.source_query_id = q.id)
+    ''', (ids_json,))]
+    if not ids:
+        return 0, 0
+    ids_json = json.dumps(ids)
+    blob_ids = [row[0] for row in cursor.execute(f'''
+    SELECT DISTINCT blob_id FROM {QUERY_ROWS_TABLE}
+    WHERE id IN (SELECT value FROM json_each(?)) AND blob_id IS NOT NULL
+    ''', (ids_json,))]
+
+    # Blobs whose elements are keyed by a deleted row move them to a surviving row
+    owned = cursor.execute(f'''
+    SELECT b.id, b.first_query_id, (
+        SELECT MIN(q.id) FROM {QUERY_ROWS_TABLE} q
+        WHERE q.blob_id = b.id AND q.id NOT IN (SELECT value FROM json_each(?))
+    )
+    FROM {RESULT_BLOBS_TABLE} b
+    WHERE b.first_query_id IN (SELECT value FROM json_each(?))
+    ''', (ids_json, ids_json)).fetchall()
+    for blob_id, owner_id, new_owner_id in owned:
+        if new_owner_id is None:
+            cursor.execute(f"DELETE FROM {QUERY_ITEMS_TABLE} WHERE query_id = ?", (owner_id,))
+        else:
+            cursor.execute(f"UPDATE {QUERY_ITEMS_TABLE} SET query_id = ? WHERE query_id = ?",
+                           (new_owner_id, owner_id))
+        cursor.execute(f"UPDATE {RESULT_BLOBS_TABLE} SET first_query_id = ? WHERE id = ?", (new_owner_id, blob_id))
+
+    for table in [QUERY_REFS_TABLE] + _extract_tables(cursor):
+        cursor.execute(f"DELETE FROM {table} WHERE query_id IN (SELECT value FROM json_each(?))", (ids_json,))
+    cursor.execute(f"DELETE FROM {QUERY_ROWS_TABLE} WHERE id IN (SELECT value FROM json_each(?))", (ids_json,))
+    return len(ids), _delete_orphan_blobs(cursor, blob_ids)
+
+
+def _delete_orphan_blobs(cursor, blob_ids):
+    """Delete the given blobs no row or patch uses anymore, then the patch bases they release."""
+    deleted = 0
+    while blob_ids:
+        orphans = cursor.execute(f'''
+        SELECT b.id, b.base_blob_id FROM {RESULT_BLOBS_TABLE} b
+        WHERE b.id IN (SELECT value FROM json_each(?))
+          AND NOT EXISTS (SELECT 1 FROM {QUERY_ROWS_TABLE} q WHERE q.blob_id = b.id)
+          AND NOT EXISTS (SELECT 1 FROM {RESULT_BLOBS_TABLE} d WHERE d.base_blob_id = b.id)
+        ''', (json.dumps(blob_ids),)).fetchall()
+        if not orphans:
+            break
+        cursor.execute(f"DELETE FROM {RESULT_BLOBS_TABLE} WHERE id IN (SELECT value FROM json_each(?))",
+                       (json.dumps([blob_id for blob_id, _ in orphans]),))
+        deleted += len(orphans)
+        blob_ids = [base_id for _, base_id in orphans if base_id is not None]
+    return deleted
+
+
+def incremental_vacuum(max_pages=None, step=RETENTION_VACUUM_PAGES):
+    """Return free pages to the file system in short steps. Return the number of pages freed.
+
+    Does nothing unless the database uses ``auto_vacuum = INCREMENTAL``.
+    """
+    conn = get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    freed = 0
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    while free_pages and (max_pages is None or freed < max_pages):
+        pages = step if max_pages is None else min(step, max_pages - freed)
+        conn.execute(f"PRAGMA incremental_vacuum({pages})").fetchall()
+        conn.commit()
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if remaining >= free_pages:
+            break
+        freed += free_pages - remaining
+        free_pages = remaining
+    return freed
+
+
+def _convert_to_incremental_vacuum(conn):
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+    if not RETENTION_CONVERT_VACUUM:
+        logger.info("Database does not use incremental auto-vacuum; freed pages are reused but not "
+                    "returned (set RETENTION_CONVERT_VACUUM=1 to convert it with one VACUUM)")
+        return
+    logger.info("Converting database to incremental auto-vacuum (VACUUM)")
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def apply_retention(now_ns=None, batch_size=RETENTION_BATCH_SIZE, pause=RETENTION_BATCH_PAUSE):
+    """Delete the results the retention policies no longer keep, then vacuum.
+
+    Expired rows are found with one read, then deleted ``batch_size`` at a
+    time, each batch in its own short write transaction, so writers are
+    never blocked for long. Returns ``{'rows': ..., 'blobs': ..., 'pages': ...}``.
+    """
+    now_ns = now_ns if now_ns is not None else time.time_ns()
+    conn = get_connection()
+    methods = conn.execute(f'''
+    SELECT DISTINCT service_name, method_name FROM {QUERY_ROWS_TABLE} WHERE service_name IS NOT NULL
+    ''').fetchall()
+
+    stats = {'rows': 0, 'blobs': 0, 'pages': 0}
+    for service_name, method_name in methods:
+        policy = policy_for(service_name, method_name)
+        expired = expired_query_ids(conn, service_name, method_name, policy, now_ns)
+        for start in range(0, len(expired), batch_size):
+            with transaction() as cursor:
+                rows, blobs = _delete_batch(cursor, expired[start:start + batch_size])
+            stats['rows'] += rows
+            stats['blobs'] += blobs
+            if pause and start + batch_size < len(expired):
+                time.sleep(pause)
+        if expired:
+            logger.info(f"Retention for {service_name}.{method_name} ({policy}): "
+                        f"{len(expired)} expired results")
+
+    _convert_to_incremental_vacuum(conn)
+    stats['pages'] = incremental_vacuum()
+    logger.info(f"Retention deleted {stats['rows']} results and {stats['blobs']} blobs, "
+                f"freed {stats['pages']} pages")
+    return stats
+
+
+def apply_retention_if_due(interval=RETENTION_INTERVAL, now_ns=None):
+    """Run apply_retention unless it ran less than ``interval`` seconds ago.
+
+    The last run is recorded in the database, so cron-started processes and
+    the daemon share one schedule. Returns the stats, or None when not due.
+    """
+    now_ns = now_ns if now_ns is not None else time.time_ns()
+    with transaction() as cursor:
+        cursor.execute(f'''
+        INSERT INTO {MAINTENANCE_RUNS_TABLE} (task, last_run_ns) VALUES ('retention', ?)
+        ON CONFLICT (task) DO UPDATE SET last_run_ns = excluded.last_run_ns
+        WHERE last_run_ns <= ?
+        ''', (now_ns, now_ns - int(interval * 1000000000)))
+        due = cursor.rowcount > 0
+    if not due:
+        return None
+    return apply_retention(now_ns)
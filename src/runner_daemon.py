@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import socket
+import logging
+import threading
+import socketserver
+from dotenv import load_dotenv
+from src.load_yaml import load_yaml
+from src.init_db import init_db
+from src.config_cache import ConfigWatcher, validate_commands_config, validate_service_config
+from src.execute_command import execute_plan
+from src.command_plan import CommandCompiler
+from src.list_classes_and_objects import list_classes_and_objects
+from src.create_json_result_view import create_json_result_view
+from src.json_fields import configure_extracted_fields
+from src.retention import configure_retention
+from src.command_cache import configure_command_cache
+from src.result_logging import configure_result_logging
+from src.parallel_executor import OutputCapture
+from src.service_pool import service_pool
+from src.plugin_registry import PYTHON_DIR
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RUNNER_SOCKET_PATH = os.getenv('RUNNER_SOCKET_PATH', '.runner.sock')
+# Seconds between scheduled task checks inside the daemon (0 disables the scheduler)
+RUNNER_DAEMON_SCHEDULE_INTERVAL = float(os.getenv('RUNNER_DAEMON_SCHEDULE_INTERVAL', '60'))
+# Longest wait before configuration and plugin changes are noticed (0 disables hot reload);
+# with inotify changes are picked up as soon as they are written
+RUNNER_CONFIG_WATCH_INTERVAL = float(os.getenv('RUNNER_CONFIG_WATCH_INTERVAL', '5'))
+
+
+class DaemonConfig:
+    """One loaded configuration; replaced as a whole on reload, never modified."""
+
+    def __init__(self, commands_data, service_config, classes_and_objects, compiler, task_compiler):
+        self.commands_data = commands_data
+        self.service_config = service_config
+        self.classes_and_objects = classes_and_objects
+        self.compiler = compiler
+        self.task_compiler = task_compiler
+
+
+class RunnerDaemon:
+    """Keeps configuration, plugin registry and service pool warm between commands."""
+
+    def __init__(self, commands_yaml_path, private_yaml_path):
+        self.commands_yaml_path = commands_yaml_path
+        self.private_yaml_path = private_yaml_path
+        self.stdout = OutputCapture(sys.stdout)
+        self.config = None
+        self._reload_lock = threading.Lock()
+        init_db()
+        self.reload()
+
+    def reload(self):
+        """Re-read the YAML configuration and plugin manifest.
+
+        The new configuration is built aside and swapped in at once: commands
+        already running finish with the configuration they started with. Only
+        the command plans affected by a changed account, alias or plugin are
+        compiled again. A configuration that fails to load leaves the current
+        one in place.
+        """
+        with self._reload_lock:
+            commands_data = load_yaml(self.commands_yaml_path, validate_commands_config)
+            service_config = load_yaml(self.private_yaml_path, validate_service_config)
+            python_commands = commands_data['commands']['python']
+            aliases = python_commands.get('alias', {})
+            converters = python_commands.get('convert', {}).get('param', {})
+
+            previous = self.config
+            if previous is None:
+                classes_and_objects = list_classes_and_objects()
+                # Plans are compiled once per sentence for this configuration
+                compiler = CommandCompiler(aliases, converters, classes_and_objects, service_config)
+                task_compiler = CommandCompiler(classes_and_objects=classes_and_objects,
+                                                service_config=service_config)
+            else:
+                classes_and_objects = previous.classes_and_objects
+                changed_services = classes_and_objects.refresh()
+                changed_accounts = {
+                    alias for alias in set(service_config) | set(previous.service_config)
+                    if service_config.get(alias) != previous.service_config.get(alias)
+                }
+                compiler = previous.compiler.updated(aliases, converters, classes_and_objects, service_config,
+                                                     changed_accounts, changed_services)
+                task_compiler = previous.task_compiler.updated(
+                    classes_and_objects=classes_and_objects, service_config=service_config,
+                    changed_accounts=changed_accounts, changed_services=changed_services)
+
+            service_pool.sync_config(service_config)
+            create_json_result_view()
+            configure_extracted_fields(python_commands.get('extract'))
+            configure_retention(python_commands.get('retention'))
+            configure_command_cache(python_commands.get('cache'))
+            configure_result_logging(python_commands.get('log_results'))
+            self.config = DaemonConfig(commands_data, service_config, classes_and_objects, compiler, task_compiler)
+        logger.info("Runner daemon configuration loaded")
+
+    def reload_changed(self, changed):
+        """ConfigWatcher callback: reload, keeping the running configuration if the new one is invalid."""
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"Keeping the previous configuration, reload failed: {str(e)}")
+
+    def execute(self, sentence, output):
+        """Run one sentence, writing anything it prints to ``output``."""
+        config = self.config
+        plan = config.compiler.compile(sentence)
+        logger.info(f"\nRUN: {sentence}")
+        with self.stdout.capture(output):
+            execute_plan(plan, config.classes_and_objects, config.service_config)
+
+    def run_scheduled_tasks(self):
+        from eventdb import run_scheduled_tasks
+        config = self.config
+        run_scheduled_tasks(config.classes_and_objects, config.service_config, config.task_compiler)
+
+
+class _StreamWriter:
+    """File-like object forwarding printed text to the client as it is written."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        if text:
+            _send_message(self.wfile, {'output': text})
+        return len(text)
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def _send_message(wfile, message):
+    wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+    wfile.flush()
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.daemon_state
+        for line in self.rfile:
+            sentence = line.decode('utf-8').strip()
+            if not sentence:
+                continue
+            try:
+                if sentence == 'ping':
+                    _send_message(self.wfile, {'output': 'pong\n'})
+                elif sentence == 'reload':
+                    daemon.reload()
+                else:
+                    daemon.execute(sentence, _StreamWriter(self.wfile))
+                _send_message(self.wfile, {'status': 'ok'})
+            except (BrokenPipeError, ConnectionResetError):
+                logger.warning(f"Client disconnected while running: {sentence}")
+                return
+            except Exception as e:
+                logger.error(f"Error executing daemon command '{sentence}': {str(e)}")
+                _send_message(self.wfile, {'status': 'error', 'message': str(e)})
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(commands_yaml_path, private_yaml_path, socket_path=RUNNER_SOCKET_PATH,
+          schedule_interval=RUNNER_DAEMON_SCHEDULE_INTERVAL, watch_interval=RUNNER_CONFIG_WATCH_INTERVAL):
+    """Run the command daemon until interrupted."""
+    daemon = RunnerDaemon(commands_yaml_path, private_yaml_path)
+    sys.stdout = daemon.stdout
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = _UnixServer(socket_path, _CommandHandler)
+    server.daemon_state = daemon
+    os.chmod(socket_path, 0o600)
+
+    stop = threading.Event()
+    if watch_interval:
+        # Reload only when the content of a configuration file or plugin changed
+        watcher = ConfigWatcher([commands_yaml_path, private_yaml_path], daemon.reload_changed,
+                                directories=[PYTHON_DIR])
+
+        def watch_loop():
+            while not stop.is_set():
+                try:
+                    watcher.wait(watch_interval)
+                except Exception as e:
+                    logger.error(f"Error watching configuration: {str(e)}")
+                    stop.wait(watch_interval)
+            watcher.close()
+        threading.Thread(target=watch_loop, name='runner-config-watcher', daemon=True).start()
+
+    if schedule_interval:
+        def scheduler_loop():
+            while not stop.wait(schedule_interval):
+                try:
+                    daemon.run_scheduled_tasks()
+                except Exception as e:
+                    logger.error(f"Error running scheduled tasks: {str(e)}")
+        threading.Thread(target=scheduler_loop, name='runner-scheduler', daemon=True).start()
+
+    logger.info(f"Runner daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Runner daemon stopping")
+    finally:
+        stop.set()
+        server.server_close()
+        sys.stdout = daemon.stdout.target
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def send_command(sentence, socket_path=RUNNER_SOCKET_PATH, output=None):
+    """Forward a sentence to the daemon and stream its output. Return an exit code."""
+    output = output or sys.stdout
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(sentence.strip().encode('utf-8') + b'\n')
+        with client.makefile('rb') as rfile:
+            for line in rfile:
+                message = json.loads(line)
+                if 'output' in message:
+                    output.write(message['output'])
+                    output.flush()
+                elif message.get('status') == 'ok':
+                    return 0
+                else:
+                    logger.error(f"Daemon error: {message.get('message')}")
+                    return 1
+    return 1
@@ -1,33 +1,97 @@
-import sqlite3
 import json
+import time
 import logging
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import threading
+import contextvars
+from src.db_connection import transaction
+from src.migrations import result_hash
+from src.json_fields import extract_fields
+from src.result_blobs import store_blob
+from src.result_items import explode_result
+from src.result_cache import latest_results
+from src.result_writer import PendingResult, RESULT_WRITE_BEHIND, enable_write_behind, get_result_writer
 
 # Configure logging
 logger = logging.getLogger(__name__)
-QUERY_RESULTS_TABLE = "query"
+# Table behind the query view (see migrations); rows are written here
+QUERY_ROWS_TABLE = "query_row"
+RESULT_BLOBS_TABLE = "result_blob"
+
+# Set by the parallel and async executors: called before a result is saved so
+# that sentences writing the same result commit in sentence order
+commit_turn = contextvars.ContextVar('commit_turn', default=None)
+
+_clock_lock = threading.Lock()
+_last_timestamp_ns = 0
+
+def monotonic_timestamp_ns():
+    """Wall-clock nanoseconds that never repeat or go backwards within the process."""
+    global _last_timestamp_ns
+    with _clock_lock:
+        _last_timestamp_ns = max(time.time_ns(), _last_timestamp_ns + 1)
+        return _last_timestamp_ns
+
+def insert_result(cursor, command, name, service_name, method_name, result, data=None):
+    """Insert one serialized result row and return its id.
+
+    The content goes to result_blob once per hash; a repeated result only
+    adds a query row pointing at the existing blob.
+    """
+    # ``data`` is the UTF-8 encoding of ``result`` when save_result already has it
+    data = result.encode('utf-8') if data is None else data
+    data_hash = result_hash(data)
+    blob_id, created = store_blob(cursor, service_name, method_name, result, data_hash, len(data), command)
+    cursor.execute(f'''
+    INSERT INTO {QUERY_ROWS_TABLE}
+        (command, name, service_name, method_name, created_at_ns, result_size, result_hash, blob_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (command, name, service_name, method_name,
+          monotonic_timestamp_ns(), len(data), data_hash, blob_id))
+    query_id = cursor.lastrowid
+    extract_fields(cursor, query_id, service_name, method_name, result)
+    if created:
+        cursor.execute(f"UPDATE {RESULT_BLOBS_TABLE} SET first_query_id = ? WHERE id = ?", (query_id, blob_id))
+        explode_result(cursor, query_id, result)
+    else:
+        logger.debug(f"Result of {service_name}.{method_name} already stored as blob {blob_id}")
+    return query_id
 
-# Get the database path from the environment variable
-DB_PATH = os.getenv('SQLITE_DB_PATH', 'runner.db')
+def serialize_result(result):
+    """Return the text stored for a result: the result itself if it is a string, else its JSON."""
+    return result if isinstance(result, str) else json.dumps(result)
 
 def save_result(command, name, service_name, method_name, result):
-    """Save the result of a query to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+    """Save the result of a query to the database.
+
+    Returns a PendingResult. With write-behind enabled (RESULT_WRITE_BEHIND=1)
+    the row is queued for the background writer; call ``wait()`` on the handle
+    when the row must be committed before continuing.
+    """
     # Convert result to JSON string if it's not already a string
-    if not isinstance(result, str):
-        result = json.dumps(result)
-    
-    cursor.execute(f'''
-    INSERT INTO {QUERY_RESULTS_TABLE} (command, name, service_name, method_name, result)
-    VALUES (?, ?, ?, ?, ?)
-    ''', (command, name, service_name, method_name, result))
-    
-    conn.commit()
-    conn.close()
+    result = serialize_result(result)
+    data = result.encode('utf-8')
+
+    wait_for_turn = commit_turn.get()
+    if wait_for_turn is not None:
+        wait_for_turn()
+
+    writer = get_result_writer()
+    if writer is None and RESULT_WRITE_BEHIND:
+        writer = enable_write_behind(insert_result)
+    if writer is not None:
+        logger.debug(f"Result queued for {service_name}.{method_name}")
+        pending = writer.enqueue(command, name, service_name, method_name, result, data)
+        pending.size = len(data)
+        return pending
+
+    with transaction() as cursor:
+        row_id = insert_result(cursor, command, name, service_name, method_name, result, data)
+        # Taken while this transaction holds the write lock, so a newer row
+        # committed by another connection right after ours is noticed
+        state = latest_results.state(cursor.connection)
+    # Write-through: the next get_latest_result needs neither a read nor a decode
+    latest_results.put(cursor.connection, service_name, method_name, row_id, text=result, state=state)
     logger.debug(f"Result saved for {service_name}.{method_name}")
+    pending = PendingResult.completed(row_id)
+    pending.size = len(data)
+    return pending
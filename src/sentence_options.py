@@ -0,0 +1,22 @@
+import re
+
+# A sentence may end with "-- key=value key=value" to tune how it runs, e.g.
+#   SELECT id, name FROM query -- key=id page=1000 timeout=60
+_OPTIONS_PATTERN = re.compile(r'^(?P<sentence>.*?)\s*--\s*(?P<options>(?:[A-Za-z_]\w*=\S*\s*)+)$', re.DOTALL)
+# In SQL "--" starts a comment, so only these names make it an options block there
+SQL_OPTIONS = {'key', 'page', 'timeout', 'fetch', 'format', 'file'}
+
+
+def split_options(sentence):
+    """Split a trailing ``-- key=value ...`` block off a sentence.
+
+    Returns ``(sentence, options)``; ``options`` is empty when there is no block.
+    A SQL comment such as ``-- note=x`` is not a block and stays in the sentence.
+    """
+    match = _OPTIONS_PATTERN.match(sentence.strip())
+    if not match:
+        return sentence, {}
+    options = dict(option.split('=', 1) for option in match.group('options').split())
+    if match.group('sentence').lstrip().upper().startswith('SELECT') and not options.keys() <= SQL_OPTIONS:
+        return sentence, {}
+    return match.group('sentence'), options
@@ -0,0 +1,112 @@
+import os
+import time
+import json
+import hashlib
+import logging
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds an instance may stay unused before it is evicted (0 disables eviction)
+SERVICE_POOL_IDLE_TIMEOUT = float(os.getenv('SERVICE_POOL_IDLE_TIMEOUT', '900'))
+
+
+def config_fingerprint(service_name, constructor_args):
+    """Return a stable fingerprint of an account's service settings."""
+    payload = json.dumps([service_name, constructor_args], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ServicePool:
+    """Long-lived service instances keyed by account alias.
+
+    Instances are created on first use and reused by every later command that
+    targets the same alias. An entry is rebuilt when the account settings or the
+    service class change, and dropped after ``idle_timeout`` seconds without use.
+    """
+
+    def __init__(self, idle_timeout=SERVICE_POOL_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._alias_locks = {}
+
+    def _alias_lock(self, account_alias):
+        with self._lock:
+            return self._alias_locks.setdefault(account_alias, threading.Lock())
+
+    def get(self, account_alias, service_class, constructor_args):
+        """Return the pooled instance for an alias, creating it if needed."""
+        self.evict_idle()
+        fingerprint = config_fingerprint(service_class.__name__, constructor_args)
+
+        # Construction may hit the network (e.g. Plesk API key generation), so it
+        # is serialized per alias instead of under the pool-wide lock.
+        with self._alias_lock(account_alias):
+            with self._lock:
+                entry = self._entries.get(account_alias)
+                if entry and entry['fingerprint'] == fingerprint and entry['class'] is service_class:
+                    entry['last_used'] = time.monotonic()
+                    return entry['instance']
+
+            logger.debug(f"Creating pooled {service_class.__name__} instance for {account_alias}")
+            instance = service_class(**constructor_args)
+
+            with self._lock:
+                self._entries[account_alias] = {
+                    'instance': instance,
+                    'class': service_class,
+                    'fingerprint': fingerprint,
+                    'last_used': time.monotonic(),
+                }
+            return instance
+
+    def invalidate(self, account_alias=None):
+        """Drop one pooled instance, or all of them when no alias is given."""
+        with self._lock:
+            if account_alias is None:
+                self._entries.clear()
+                logger.debug("Service pool cleared")
+            elif self._entries.pop(account_alias, None) is not None:
+                logger.debug(f"Service pool entry invalidated for {account_alias}")
+
+    def sync_config(self, service_config):
+        """Invalidate instances whose account settings changed or were removed."""
+        with self._lock:
+            for account_alias, entry in list(self._entries.items()):
+                service_info = (service_config or {}).get(account_alias)
+                if not service_info:
+                    del self._entries[account_alias]
+                    continue
+                constructor_args = {k: v for k, v in service_info.items() if k != 'service'}
+                if config_fingerprint(service_info.get('service'), constructor_args) != entry['fingerprint']:
+                    logger.info(f"Account settings changed for {account_alias}, dropping pooled instance")
+                    del self._entries[account_alias]
+
+    def evict_idle(self):
+        """Remove instances that have not been used within the idle timeout."""
+        if not self.idle_timeout:
+            return
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            for account_alias, entry in list(self._entries.items()):
+                if entry['last_used'] < deadline:
+                    logger.debug(f"Evicting idle service instance for {account_alias}")
+                    del self._entries[account_alias]
+
+    def __contains__(self, account_alias):
+        with self._lock:
+            return account_alias in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# Shared pool used by execute_command, the scheduler and the runner
+service_pool = ServicePool()
@@ -0,0 +1,129 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+from dotenv import load_dotenv
+from src.command_cache import is_cacheable
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Method name prefixes of read-only calls that overlapping identical callers share
+SINGLE_FLIGHT_PREFIXES = tuple(prefix.strip() for prefix in os.getenv('SINGLE_FLIGHT_PREFIXES', 'list_,get_').split(',')
+                               if prefix.strip())
+
+
+def is_shared(call):
+    """Only methods named as reads (SINGLE_FLIGHT_PREFIXES) that may be cached are shared."""
+    return call.method_name.startswith(SINGLE_FLIGHT_PREFIXES) and is_cacheable(call.service_name, call.method_name)
+
+
+def call_key(call):
+    """Identify a ServiceCall by account, method and parsed arguments (not by sentence text)."""
+    args = json.dumps(call.method_args, sort_keys=True, default=str)
+    return call.account_alias, call.service_name, call.method_name, args
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run one call per key at a time; callers arriving meanwhile share its outcome.
+
+    The first caller of a key runs ``fn``; every caller that asks for the same
+    key before it returns waits for it and gets the same result (or
+    exception). Nothing is remembered once the call has finished.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+        if not leader:
+            logger.info(f"Waiting for the in-flight call {key[1]}.{key[2]} on {key[0]}")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.waiters:
+                logger.info(f"Shared {key[1]}.{key[2]} on {key[0]} with {flight.waiters} waiting callers")
+        return flight.result
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key, coroutine_fn):
+        future = self._flights.get(key)
+        if future is not None:
+            logger.info(f"Waiting for the in-flight call {key[1]}.{key[2]} on {key[0]}")
+            return await asyncio.shield(future)
+
+        future = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await coroutine_fn()
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so a flight without waiters does not log "never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+
+
+service_calls = SingleFlight()
+async_service_calls = AsyncSingleFlight()
+
+
+def call_service(call):
+    """Call a resolved service method, sharing the call with identical in-flight ones.
+
+    Only read methods are shared (see is_shared); any other method runs once
+    per sentence.
+    """
+    if not is_shared(call):
+        return call.method(call.instance, **call.method_args)
+    return service_calls.do(call_key(call), lambda: call.method(call.instance, **call.method_args))
+
+
+async def call_service_async(call, call_method):
+    """Async variant of call_service; ``call_method`` awaits the method (see call_service_method)."""
+    if not is_shared(call):
+        return await call_method(call.method, call.instance, call.method_args)
+    return await async_service_calls.do(call_key(call),
+                                        lambda: call_method(call.method, call.instance, call.method_args))
@@ -0,0 +1,85 @@
+import json
+import logging
+from src.db_connection import get_connection, transaction
+from src.save_result import monotonic_timestamp_ns
+from src.json_fields import copy_extracted_fields
+from src.result_items import get_latest_result_id, item_source
+
+# Configure logging
+logger = logging.getLogger(__name__)
+# Table behind the query view (see migrations); rows are written here
+QUERY_ROWS_TABLE = "query_row"
+QUERY_REFS_TABLE = "query_ref"
+
+
+def key_path(key):
+    """JSON path of a top-level object key, quoted so dots stay part of the key."""
+    return '$."' + key.replace('"', '\\"') + '"'
+
+
+def _decode_value(value_type, value):
+    if value_type == 'true':
+        return True
+    if value_type == 'false':
+        return False
+    if value_type in ('object', 'array'):
+        return json.loads(value)
+    return value
+
+
+def filter_latest_result(command, service_name, method_name, expression):
+    """Store the elements of the latest list result matching a FilterExpression.
+
+    The new ``query`` row keeps no copy of the data: it points at the source
+    result through ``source_query_id`` and lists the matching elements in
+    ``query_ref``. Returns ``(query_id, match_count)``, or None when the latest
+    result is missing or not a list.
+    """
+    latest_id = get_latest_result_id(service_name, method_name)
+    if latest_id is None:
+        return None
+    source = item_source(latest_id)
+    if source is None:
+        return None
+
+    source_sql, params, base_id = source
+    condition, condition_params = expression.to_sql('i.element')
+    with transaction() as cursor:
+        cursor.execute(f'''
+        INSERT INTO {QUERY_ROWS_TABLE}
+            (command, name, service_name, method_name, result, created_at_ns, source_query_id)
+        VALUES (?, 'name', ?, ?, NULL, ?, ?)
+        ''', (command, service_name, method_name, monotonic_timestamp_ns(), base_id))
+        query_id = cursor.lastrowid
+        cursor.execute(f'''
+        INSERT INTO {QUERY_REFS_TABLE} (query_id, item_index)
+        SELECT ?, i.item_index FROM {source_sql} AND {condition}
+        ''', (query_id, *params, *condition_params))
+        match_count = cursor.rowcount
+        copy_extracted_fields(cursor, query_id, base_id, service_name, method_name)
+    logger.debug(f"Stored {match_count} references from result {base_id} as result {query_id}")
+    return query_id, match_count
+
+
+def select_latest_values(service_name, method_name, value_key, expression):
+    """Return ``value_key`` of each element of the latest list result matching ``expression``.
+
+    Missing keys come back as 'Not found', like print_value. Returns None when
+    the latest result is missing or not a list.
+    """
+    latest_id = get_latest_result_id(service_name, method_name)
+    if latest_id is None:
+        return None
+    source = item_source(latest_id)
+    if source is None:
+        return None
+
+    source_sql, params, _ = source
+    condition, condition_params = expression.to_sql('i.element')
+    value_path = key_path(value_key)
+    rows = get_connection().execute(f'''
+    SELECT json_type(i.element, ?), json_extract(i.element, ?)
+    FROM {source_sql} AND {condition}
+    ORDER BY i.item_index
+    ''', (value_path, value_path, *params, *condition_params))
+    return [_decode_value(value_type, value) if value_type else 'Not found' for value_type, value in rows]
@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.db_connection import close_connections
+from src.migrations import migrate
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Runs each test against its own database in a temporary directory.
+
+    ``self.tmp_dir`` and ``self.db_path`` are set up before the test, and the
+    schema is migrated unless ``migrate_database`` is False. Subclasses that
+    add to setUp/tearDown call the base methods.
+    """
+
+    migrate_database = True
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'test.db')
+        self.db_patch = patch('src.db_connection.DB_PATH', self.db_path)
+        self.db_patch.start()
+        if self.migrate_database:
+            migrate()
+
+    def tearDown(self):
+        close_connections()
+        self.db_patch.stop()
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
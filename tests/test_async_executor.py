@@ -0,0 +1,102 @@
+import io
+import asyncio
+import unittest
+from unittest.mock import patch
+from src.async_executor import run_commands_async
+from src.async_execute_command import call_service_method
+from src.save_result import commit_turn
+
+SERVICE_CONFIG = {
+    'github_main': {'service': 'GitHubService', 'access_token': 'x'},
+    'gitlab_main': {'service': 'GitLabService', 'private_token': 'y'},
+}
+
+
+class AsyncSampleService:
+    async def list_items(self, limit=2):
+        await asyncio.sleep(0)
+        return list(range(int(limit)))
+
+    def list_names(self, prefix='n'):
+        print(f'listing {prefix}')
+        return [f'{prefix}{i}' for i in range(2)]
+
+
+class TestAsyncExecutor(unittest.TestCase):
+    def test_call_service_method_awaits_coroutines(self):
+        result = asyncio.run(call_service_method(AsyncSampleService.list_items, AsyncSampleService(), {'limit': 3}))
+
+        self.assertEqual(result, [0, 1, 2])
+
+    def test_call_service_method_wraps_sync_methods(self):
+        result = asyncio.run(call_service_method(AsyncSampleService.list_names, AsyncSampleService(), {'prefix': 'x'}))
+
+        self.assertEqual(result, ['x0', 'x1'])
+
+    def test_sync_method_output_stays_with_its_sentence(self):
+        async def execute(command, classes_and_objects, service_config):
+            prefix = command.split()[0]
+            await asyncio.sleep(0.03 if prefix == 'a' else 0)
+            await call_service_method(AsyncSampleService.list_names, AsyncSampleService(), {'prefix': prefix})
+
+        with patch('sys.stdout', new=io.StringIO()) as fake_out:
+            asyncio.run(run_commands_async(['a github_main', 'b gitlab_main'], {}, SERVICE_CONFIG, execute))
+
+        self.assertEqual(fake_out.getvalue(), 'listing a\nlisting b\n')
+
+    def test_commands_run_concurrently_with_ordered_output(self):
+        delays = {'slow github_main': 0.05, 'fast gitlab_main': 0.0}
+        started = []
+
+        async def execute(command, classes_and_objects, service_config):
+            started.append(command)
+            await asyncio.sleep(delays[command])
+            await asyncio.to_thread(print, command)
+
+        with patch('sys.stdout', new=io.StringIO()) as fake_out:
+            asyncio.run(run_commands_async(list(delays), {}, SERVICE_CONFIG, execute))
+
+        self.assertEqual(started, ['slow github_main', 'fast gitlab_main'])
+        self.assertEqual(fake_out.getvalue(), 'slow github_main\nfast gitlab_main\n')
+
+    def test_dependent_command_waits_for_producer(self):
+        order = []
+
+        async def execute(command, classes_and_objects, service_config):
+            if command.startswith('list'):
+                await asyncio.sleep(0.02)
+            order.append(command)
+
+        commands = [
+            'list all repositories github_main',
+            'filter GitHubService_list_all_repositories name logo',
+        ]
+        asyncio.run(run_commands_async(commands, {}, SERVICE_CONFIG, execute))
+
+        self.assertEqual(order, commands)
+
+    def test_writes_of_the_same_result_commit_in_order(self):
+        commands = [f'create issue github_main title=t{i}' for i in range(3)]
+        committed = []
+
+        async def execute(command, classes_and_objects, service_config):
+            await asyncio.sleep(0.05 if command.endswith('t0') else 0)
+            wait_for_turn = commit_turn.get()
+            if wait_for_turn:
+                await asyncio.to_thread(wait_for_turn)
+            committed.append(command)
+
+        asyncio.run(run_commands_async(commands, {}, SERVICE_CONFIG, execute, per_account=1))
+
+        self.assertEqual(committed, commands)
+
+    def test_limits_must_be_positive(self):
+        async def execute(command, classes_and_objects, service_config):
+            pass
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run_commands_async(['list repos github_main'], {}, SERVICE_CONFIG, execute, per_account=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
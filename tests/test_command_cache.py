@@ -0,0 +1,102 @@
+import unittest
+from src.db_connection import get_connection
+from src.service_pool import service_pool
+from src.execute_command import execute_command
+from src.command_cache import parse_duration, configure_command_cache, cache_ttl
+from tests.db_test_case import DatabaseTestCase
+
+PROJECTS = [{'id': 1, 'name': 'class'}]
+
+
+class FakeGitLabService:
+    calls = 0
+
+    def __init__(self, token=None):
+        self.token = token
+
+    def list_projects(self):
+        FakeGitLabService.calls += 1
+        return PROJECTS
+
+    def create_issue(self, project_id, title):
+        FakeGitLabService.calls += 1
+        return {'project_id': project_id, 'title': title}
+
+
+CLASSES = {'GitLabService': {'class': FakeGitLabService, 'methods': {
+    'list_projects': FakeGitLabService.list_projects,
+    'create_issue': FakeGitLabService.create_issue,
+}}}
+SERVICE_CONFIG = {'gitlab_main': {'service': 'GitLabService', 'token': 'x'},
+                  'gitlab_other': {'service': 'GitLabService', 'token': 'y'}}
+
+
+class TestCommandCache(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        FakeGitLabService.calls = 0
+
+    def tearDown(self):
+        configure_command_cache()
+        service_pool.invalidate()
+        super().tearDown()
+
+    def run_sentence(self, sentence):
+        execute_command(sentence, CLASSES, SERVICE_CONFIG)
+
+    def count_rows(self):
+        return get_connection().execute("SELECT COUNT(*) FROM query").fetchone()[0]
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration('90'), 90)
+        self.assertEqual(parse_duration('10m'), 600)
+        self.assertEqual(parse_duration('1.5h'), 5400)
+        self.assertEqual(parse_duration('off'), 0)
+        with self.assertRaises(ValueError):
+            parse_duration('soon')
+
+    def test_sentence_option_serves_stored_result(self):
+        self.run_sentence('list projects gitlab_main -- cache=10m')
+        self.run_sentence('list projects gitlab_main -- cache=10m')
+        self.run_sentence('list projects gitlab_main -- cache=10m format=jsonl')
+        self.assertEqual(FakeGitLabService.calls, 1)
+        self.assertEqual(self.count_rows(), 1)
+
+        # Other accounts, expired results and sentences without a lifetime call the service
+        self.run_sentence('list projects gitlab_other -- cache=10m')
+        self.run_sentence('list projects gitlab_main')
+        get_connection().execute("UPDATE query_row SET created_at_ns = created_at_ns - 700000000000")
+        get_connection().commit()
+        self.run_sentence('list projects gitlab_main -- cache=10m')
+        self.assertEqual(FakeGitLabService.calls, 4)
+
+    def test_where_argument_filters_the_result_in_the_runner(self):
+        self.run_sentence('list projects gitlab_main where="name = other"')
+        self.run_sentence('list projects gitlab_main where="(name = other"')
+        rows = get_connection().execute("SELECT result FROM query").fetchall()
+        # The service is called without the argument and an invalid expression calls nothing
+        self.assertEqual(FakeGitLabService.calls, 1)
+        self.assertEqual(rows, [('[]',)])
+
+    def test_configured_lifetimes(self):
+        configure_command_cache({'GitLabService.list_projects': '1h', 'never': ['GitLabService.list_projects']})
+        self.assertEqual(cache_ttl('GitLabService', 'list_projects'), 0)
+
+        configure_command_cache({'default': '5m', 'GitLabService.list_projects': '1h'})
+        self.assertEqual(cache_ttl('GitLabService', 'list_projects'), 3600)
+        self.assertEqual(cache_ttl('GitLabService', 'list_projects', {'cache': 'off'}), 0)
+        self.assertEqual(cache_ttl('PleskService', 'list_domains'), 300)
+        self.run_sentence('list projects gitlab_main')
+        self.run_sentence('list projects gitlab_main')
+        self.assertEqual(FakeGitLabService.calls, 1)
+
+    def test_mutating_methods_always_call_the_service(self):
+        configure_command_cache({'default': '1h'})
+        self.assertEqual(cache_ttl('GitLabService', 'create_issue', {'cache': '10m'}), 0)
+        self.run_sentence('create issue gitlab_main project_id=1 title=Bug')
+        self.run_sentence('create issue gitlab_main project_id=1 title=Bug -- cache=10m')
+        self.assertEqual(FakeGitLabService.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
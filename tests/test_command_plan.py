@@ -0,0 +1,132 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from src.db_connection import get_connection
+from src.service_pool import service_pool
+from src.execute_command import execute_plan
+from src.async_execute_command import async_execute_plan
+from src.parallel_executor import run_commands_parallel
+from src.async_executor import run_commands_async
+from src.command_plan import CommandCompiler
+from src.replace_aliases import replace_aliases
+from tests.db_test_case import DatabaseTestCase
+
+
+class FakeEmailService:
+    def __init__(self, server=None):
+        self.server = server
+
+    def list_emails(self, from_date, to_date):
+        return [{'from_date': from_date, 'to_date': to_date}]
+
+    def send_email(self, to_email, subject, body):
+        return {'to': to_email, 'subject': subject, 'body': body}
+
+
+CLASSES = {'EmailService': {'class': FakeEmailService, 'methods': {
+    'list_emails': FakeEmailService.list_emails,
+    'send_email': FakeEmailService.send_email,
+}}}
+SERVICE_CONFIG = {'softreck': {'service': 'EmailService', 'server': 'mail.example.com'}}
+ALIASES = {'param': {'from': 'from_date', 'to': 'to_date'}, 'action': {'show': 'list'}}
+CONVERTERS = {'today': f'{__name__}.today'}
+_day = ['2024-01-01']
+
+
+def today():
+    return _day[0]
+
+
+class TestCommandPlan(unittest.TestCase):
+    def setUp(self):
+        self.compiler = CommandCompiler(ALIASES, CONVERTERS, CLASSES, SERVICE_CONFIG)
+
+    def test_resolves_service_sentences_once(self):
+        plan = self.compiler.compile('show emails softreck from=today to=today')
+        self.assertIs(self.compiler.compile('show emails softreck from=today to=today'), plan)
+        self.assertEqual((plan.kind, plan.account_alias, plan.service_name, plan.method_name),
+                         ('service', 'softreck', 'EmailService', 'list_emails'))
+        self.assertEqual(plan.render(), 'list emails softreck from_date=2024-01-01 to_date=2024-01-01')
+        with self.assertRaises(AttributeError):
+            plan.kind = 'sql'
+
+    def test_converters_run_each_time(self):
+        plan = self.compiler.compile('show emails softreck from=today to=today')
+        with patch('src.command_plan.get_function_from_string') as lookup:
+            _day[0] = '2024-01-02'
+            command, call = plan.bind()
+            _day[0] = '2024-01-01'
+        lookup.assert_not_called()
+        self.assertEqual(command, 'list emails softreck from_date=2024-01-02 to_date=2024-01-02')
+        self.assertEqual(call.method_args, {'from_date': '2024-01-02', 'to_date': '2024-01-02'})
+        service_pool.invalidate()
+
+    def test_arguments_match_execute_command(self):
+        plan = self.compiler.compile("send email softreck to_email=tom@example.com subject='Daily Report' "
+                                     "body='This is your daily report.' -- format=jsonl")
+        self.assertEqual(dict(plan.args), {'to_email': 'tom@example.com', 'subject': 'Daily Report',
+                                           'body': 'This is your daily report.'})
+        self.assertEqual(plan.options, {'format': 'jsonl'})
+        self.assertTrue(plan.render().endswith(' -- format=jsonl'))
+
+    def test_sql_and_data_sentences(self):
+        sql = "SELECT * FROM json_result WHERE method_name = 'list domains' -- format=csv"
+        self.assertEqual(self.compiler.compile(sql).kind, 'sql')
+        self.assertEqual(replace_aliases(sql, ALIASES, CONVERTERS), sql)
+        self.assertEqual(self.compiler.compile('filter EmailService_list_emails to=x').kind, 'data')
+        self.assertEqual(self.compiler.compile('filter EmailService_list_emails to=x').render(),
+                         'filter EmailService_list_emails to_date=x')
+        unresolved = self.compiler.compile('list emails nobody')
+        self.assertEqual((unresolved.kind, unresolved.method), ('service', None))
+
+    def test_updated_keeps_unaffected_plans(self):
+        service_config = dict(SERVICE_CONFIG, other={'service': 'EmailService', 'server': 'other.example.com'})
+        compiler = CommandCompiler(ALIASES, CONVERTERS, CLASSES, service_config)
+        softreck = compiler.compile('show emails softreck')
+        other = compiler.compile('show emails other')
+        data = compiler.compile('filter EmailService_list_emails to=x')
+        unresolved = compiler.compile('show emails added')
+
+        service_config = dict(service_config, other={'service': 'EmailService', 'server': 'new.example.com'},
+                              added={'service': 'EmailService'})
+        updated = compiler.updated(ALIASES, CONVERTERS, CLASSES, service_config, changed_accounts={'other', 'added'})
+
+        self.assertIs(updated.compile('show emails softreck'), softreck)
+        self.assertIs(updated.compile('filter EmailService_list_emails to=x'), data)
+        self.assertIsNot(updated.compile('show emails other'), other)
+        self.assertIsNot(updated.compile('show emails added'), unresolved)
+        self.assertEqual(updated.compile('show emails added').account_alias, 'added')
+
+        replaced = updated.updated(ALIASES, CONVERTERS, CLASSES, service_config, changed_services={'EmailService'})
+        self.assertIsNot(replaced.compile('show emails softreck'), softreck)
+        realiased = updated.updated({'action': {'show': 'list'}}, CONVERTERS, CLASSES, service_config)
+        self.assertIsNot(realiased.compile('filter EmailService_list_emails to=x'), data)
+
+
+class TestExecutePlan(DatabaseTestCase):
+    def tearDown(self):
+        service_pool.invalidate()
+        super().tearDown()
+
+    def test_execute_plan_saves_rendered_command(self):
+        compiler = CommandCompiler(ALIASES, CONVERTERS, CLASSES, SERVICE_CONFIG)
+        execute_plan(compiler.compile('show emails softreck from=today to=today'), CLASSES, SERVICE_CONFIG)
+        execute_plan(compiler.compile('show emails nobody'), CLASSES, SERVICE_CONFIG)
+        rows = get_connection().execute("SELECT command, name, method_name FROM query").fetchall()
+        self.assertEqual(rows, [('list emails softreck from_date=2024-01-01 to_date=2024-01-01',
+                                 'softreck', 'list_emails')])
+
+    def test_executors_run_plans_with_one_converter_call_per_use(self):
+        with patch(f'{__name__}.today', wraps=today) as converter:
+            compiler = CommandCompiler(ALIASES, CONVERTERS, CLASSES, SERVICE_CONFIG)
+            plans = [compiler.compile('show emails softreck from=today to=x'), compiler.compile('SELECT command FROM query')]
+            run_commands_parallel(plans, CLASSES, SERVICE_CONFIG, execute_plan)
+            self.assertEqual(converter.call_count, 1)
+            asyncio.run(run_commands_async(plans, CLASSES, SERVICE_CONFIG, async_execute_plan))
+            self.assertEqual(converter.call_count, 2)
+        rows = get_connection().execute("SELECT command FROM query").fetchall()
+        self.assertEqual(rows, [('list emails softreck from_date=2024-01-01 to_date=x',)] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from src import config_cache
+from src.config_cache import (load_config, ConfigWatcher, validate_commands_config, validate_service_config)
+
+COMMANDS = """
+commands:
+  python:
+    sentence:
+      - list zones cloudflare_main
+    alias:
+      param:
+        from: from_date
+"""
+
+
+class TestConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.path = os.path.join(self.tmp_dir, 'commands.yaml')
+        self.write(COMMANDS)
+        self.cache_patch = patch('src.config_cache.CONFIG_CACHE_DIR', self.cache_dir)
+        self.cache_patch.start()
+        config_cache._loaded.clear()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        config_cache._loaded.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, text, mtime_ns=None):
+        with open(self.path, 'w') as file:
+            file.write(text)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_parses_once_and_returns_copies(self):
+        with patch('src.config_cache.yaml.load', wraps=config_cache.yaml.load) as parse:
+            first = load_config(self.path, validate_commands_config)
+            first['commands']['python']['sentence'].append('changed')
+            second = load_config(self.path)
+            config_cache._loaded.clear()
+            # A new process reads the marshalled copy from the cache directory
+            third = load_config(self.path)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(second['commands']['python']['sentence'], ['list zones cloudflare_main'])
+        self.assertEqual(third, second)
+        self.assertEqual(os.stat(self.cache_dir).st_mode & 0o777, 0o700)
+
+    def test_reparses_changed_content_only(self):
+        load_config(self.path)
+        with patch('src.config_cache.yaml.load', wraps=config_cache.yaml.load) as parse:
+            # Same content with a new mtime: hashed, not parsed
+            self.write(COMMANDS, mtime_ns=10 ** 18)
+            config_cache._loaded.clear()
+            load_config(self.path)
+            self.assertEqual(parse.call_count, 0)
+
+            self.write(COMMANDS.replace('cloudflare_main', 'cloudflare_other'), mtime_ns=2 * 10 ** 18)
+            data = load_config(self.path)
+            self.assertEqual(parse.call_count, 1)
+        self.assertEqual(data['commands']['python']['sentence'], ['list zones cloudflare_other'])
+
+    def test_cache_directory_writable_by_others_is_ignored(self):
+        load_config(self.path)
+        os.chmod(self.cache_dir, 0o777)
+        config_cache._loaded.clear()
+        with patch('src.config_cache.yaml.load', wraps=config_cache.yaml.load) as parse:
+            load_config(self.path)
+        self.assertEqual(parse.call_count, 1)
+
+    def test_values_marshal_cannot_store_are_not_cached(self):
+        self.write("commands:\n  python:\n    since: 2024-01-01\n")
+        self.assertEqual(str(load_config(self.path)['commands']['python']['since']), '2024-01-01')
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_without_cache_directory(self):
+        with patch('src.config_cache.CONFIG_CACHE_DIR', ''):
+            self.assertEqual(load_config(self.path)['commands']['python']['alias'],
+                             {'param': {'from': 'from_date'}})
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            validate_commands_config({'commands': {'python': {'sentence': 'not a list'}}})
+        with self.assertRaises(ValueError):
+            validate_service_config({'github_main': {'access_token': 'x'}})
+        validate_service_config({'github_main': {'service': 'GitHubService'}})
+
+    def test_watcher_reports_content_changes(self):
+        changes = []
+        watcher = ConfigWatcher([self.path], changes.append)
+        self.assertEqual(watcher.poll(), [])
+
+        self.write(COMMANDS, mtime_ns=10 ** 18)
+        self.assertEqual(watcher.poll(), [])
+
+        self.write(COMMANDS + "    schedule: []\n", mtime_ns=2 * 10 ** 18)
+        self.assertEqual(watcher.poll(), [self.path])
+        self.assertEqual(changes, [[self.path]])
+        self.assertEqual(watcher.poll(), [])
+
+    def test_watcher_reports_plugin_directory_changes(self):
+        plugin_dir = os.path.join(self.tmp_dir, 'python')
+        os.mkdir(plugin_dir)
+        watcher = ConfigWatcher([self.path], lambda changed: None, directories=[plugin_dir], use_inotify=False)
+        with open(os.path.join(plugin_dir, 'notes.txt'), 'w') as file:
+            file.write('ignored')
+        self.assertEqual(watcher.wait(0), [])
+
+        with open(os.path.join(plugin_dir, 'sample_service.py'), 'w') as file:
+            file.write('class SampleService:\n    pass\n')
+        self.assertEqual(watcher.wait(0), [plugin_dir])
+
+    def test_inotify_wakes_the_watcher(self):
+        watcher = ConfigWatcher([self.path], lambda changed: None)
+        if not watcher.uses_inotify:
+            self.skipTest("inotify is not available")
+        timer = threading.Timer(0.1, self.write, [COMMANDS + "    schedule: []\n"])
+        timer.start()
+        started = time.monotonic()
+        try:
+            self.assertEqual(watcher.wait(10), [self.path])
+        finally:
+            timer.join()
+            watcher.close()
+        self.assertLess(time.monotonic() - started, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from src import db_connection
+from src.db_connection import get_connection, transaction, close_connections
+
+
+class TestDbConnection(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'test.db')
+
+    def tearDown(self):
+        close_connections()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_connection_is_reused_within_thread(self):
+        self.assertIs(get_connection(self.db_path), get_connection(self.db_path))
+
+    def test_each_thread_gets_its_own_connection(self):
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(get_connection(self.db_path)))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(connections[0], get_connection(self.db_path))
+
+    def test_pragmas_are_applied(self):
+        conn = get_connection(self.db_path)
+
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], db_connection.SQLITE_BUSY_TIMEOUT_MS)
+
+    def test_transaction_rolls_back_on_error(self):
+        with transaction(self.db_path) as cursor:
+            cursor.execute("CREATE TABLE items (name TEXT)")
+
+        with self.assertRaises(RuntimeError):
+            with transaction(self.db_path) as cursor:
+                cursor.execute("INSERT INTO items VALUES ('a')")
+                raise RuntimeError('abort')
+
+        count = get_connection(self.db_path).execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_connection_hook_runs_on_new_connections(self):
+        calls = []
+        db_connection.register_connection_hook(calls.append)
+        try:
+            conn = get_connection(self.db_path)
+        finally:
+            db_connection._connection_hooks.remove(calls.append)
+
+        self.assertIn(conn, calls)
+
+    def test_close_connections_forces_reopen(self):
+        first = get_connection(self.db_path)
+        close_connections()
+
+        self.assertIsNot(first, get_connection(self.db_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
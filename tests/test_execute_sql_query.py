@@ -0,0 +1,101 @@
+import io
+import os
+import time
+import sqlite3
+import unittest
+from src.db_connection import get_connection
+from src.save_result import save_result
+from src.execute_sql_query import QueryTimeout, KeyColumnError, stream_sql_query, execute_sql_query
+from src.execute_command import run_sql_sentence
+from src.sentence_options import split_options
+from tests.db_test_case import DatabaseTestCase
+
+
+class TestExecuteSqlQuery(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(25):
+            save_result(f'cmd {i}', 'x', 'Service', 'method', [i])
+
+    def test_rows_are_fetched_in_chunks(self):
+        rows = stream_sql_query("SELECT id, command FROM query ORDER BY id", chunk_size=10)
+        first = next(rows)
+        self.assertEqual(rows.column_names, ['id', 'command'])
+        self.assertEqual(first, (1, 'cmd 0'))
+        self.assertEqual(rows.row_count, 10)
+        self.assertEqual(len(list(rows)), 24)
+
+    def test_keyset_pagination(self):
+        rows = stream_sql_query("SELECT id, command FROM query WHERE id > ?", params=(5,), key='id', page_size=7)
+        self.assertEqual([row[0] for row in rows], list(range(6, 26)))
+
+        with self.assertRaises(sqlite3.OperationalError):
+            list(stream_sql_query("SELECT command FROM query", key='id'))
+        with self.assertRaises(ValueError):
+            stream_sql_query("SELECT id FROM query", key='id; DROP TABLE query')
+
+    def test_keyset_pagination_rejects_duplicate_and_null_keys(self):
+        # id // 2 repeats across the boundary of every 3-row page
+        rows = stream_sql_query("SELECT id / 2 AS pair, command FROM query", key='pair', page_size=3)
+        with self.assertRaises(KeyColumnError):
+            list(rows)
+        rows = stream_sql_query("SELECT NULLIF(id, 3) AS maybe FROM query", key='maybe', page_size=10)
+        with self.assertRaises(KeyColumnError):
+            list(rows)
+        # A full last page is followed by nothing
+        self.assertEqual(len(list(stream_sql_query("SELECT id FROM query", key='id', page_size=5))), 25)
+
+    def test_time_between_rows_does_not_count_against_the_budget(self):
+        rows = stream_sql_query("SELECT id FROM query", chunk_size=1, time_budget=0.05)
+        ids = []
+        for row in rows:
+            ids.append(row[0])
+            if len(ids) <= 3:
+                time.sleep(0.03)
+        self.assertEqual(len(ids), 25)
+
+    def test_time_budget_interrupts_long_queries(self):
+        rows = stream_sql_query('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n)
+        SELECT count(*) FROM n''', time_budget=0.05)
+        with self.assertRaises(QueryTimeout):
+            list(rows)
+        # The progress handler is removed again afterwards
+        self.assertEqual(len(list(stream_sql_query("SELECT id FROM query"))), 25)
+
+    def test_select_sentences_use_a_read_only_connection(self):
+        rows = stream_sql_query("SELECT 1")
+        self.assertIsNot(rows.conn, get_connection())
+        with self.assertRaises(sqlite3.OperationalError):
+            rows.conn.execute("DELETE FROM query")
+
+    def test_execute_sql_query_returns_all_rows(self):
+        column_names, results = execute_sql_query("SELECT id FROM query")
+        self.assertEqual(column_names, ['id'])
+        self.assertEqual(len(results), 25)
+        self.assertEqual(execute_sql_query("SELECT nope FROM query"), (None, None))
+
+    def test_run_sql_sentence_streams_a_table(self):
+        output = io.StringIO()
+        run_sql_sentence(*split_options("SELECT id, command FROM query WHERE id <= 2 -- key=id page=1"), output)
+        self.assertEqual(output.getvalue(), "id | command\n------------\n1 | cmd 0\n2 | cmd 1\n")
+
+    def test_run_sql_sentence_writes_a_file(self):
+        path = os.path.join(self.tmp_dir, 'rows.csv')
+        run_sql_sentence("SELECT id FROM query WHERE id <= 3", {'file': path})
+        with open(path) as f:
+            self.assertEqual(f.read().split(), ['id', '1', '2', '3'])
+
+    def test_split_options(self):
+        self.assertEqual(split_options("SELECT 1 -- key=id timeout=5"), ("SELECT 1", {'key': 'id', 'timeout': '5'}))
+        self.assertEqual(split_options("SELECT '--' AS x"), ("SELECT '--' AS x", {}))
+        # A trailing comment that is not made of SQL options is left to SQLite
+        self.assertEqual(split_options("SELECT 1 -- note=x"), ("SELECT 1 -- note=x", {}))
+        self.assertEqual(split_options("SELECT 1 -- key=id note=x"), ("SELECT 1 -- key=id note=x", {}))
+        output = io.StringIO()
+        run_sql_sentence(*split_options("SELECT id FROM query WHERE id <= 2 -- note=x"), output)
+        self.assertEqual(output.getvalue().split(), ['id', '--', '1', '2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import sqlite3
+import unittest
+from src.filter_expression import FilterSyntaxError, compile_filter, where_filter, _register_functions
+
+ITEMS = [
+    {'name': 'Logo', 'stars': 10, 'private': False, 'owner': {'login': 'nonflow'}, 'topics': ['a']},
+    {'name': 'class', 'stars': 2.5, 'private': True, 'owner': {'login': 'Tom'}},
+    {'name': 'logos-api', 'stars': 0, 'private': None},
+    {'name': 'ÉCOLE', 'owner': None},
+    {'id': 7},
+]
+
+EXPRESSIONS = [
+    'name = logo',
+    'name != logo',
+    'name = ""',
+    'private = none',
+    'stars = 10',
+    'stars > 2',
+    'stars <= 2.5',
+    'name >= l',
+    'name in (logo, CLASS)',
+    'name ^= LOGO',
+    'name ~= "^lo.*s"',
+    'stars ~= 2',
+    'owner.login = tom',
+    'name = école',
+    'private = true or stars >= 10',
+    'not (name ^= lo) and stars < 5',
+    '(name = logo or name = class) and owner.login in (nonflow)',
+]
+
+
+class TestFilterExpression(unittest.TestCase):
+    def test_predicates(self):
+        cases = {
+            'name = logo': [0],
+            'name != logo': [1, 2, 3, 4],
+            'name = ""': [4],
+            'stars > 2': [0, 1],
+            'name in (logo, CLASS)': [0, 1],
+            'name ^= LOGO': [0, 2],
+            'name ~= "^lo.*s"': [2],
+            'owner.login = tom': [1],
+            'private = true or stars >= 10': [0, 1],
+            'not (name ^= lo) and stars < 5': [1],
+        }
+        for text, expected in cases.items():
+            with self.subTest(text):
+                self.assertEqual(compile_filter(text).filter(ITEMS), [ITEMS[i] for i in expected])
+
+    def test_sql_matches_predicate(self):
+        conn = sqlite3.connect(':memory:')
+        _register_functions(conn)
+        conn.execute("CREATE TABLE item (idx INTEGER, element TEXT)")
+        conn.executemany("INSERT INTO item VALUES (?, ?)", [(i, json.dumps(item)) for i, item in enumerate(ITEMS)])
+        conn.execute("INSERT INTO item VALUES (99, '\"not an object\"')")
+
+        for text in EXPRESSIONS:
+            with self.subTest(text):
+                expression = compile_filter(text)
+                sql, params = expression.to_sql('element')
+                rows = conn.execute(f"SELECT idx FROM item WHERE {sql} ORDER BY idx", params).fetchall()
+                expected = [i for i, item in enumerate(ITEMS) if expression(item)]
+                self.assertEqual([row[0] for row in rows], expected)
+
+    def test_compiled_filters_are_cached(self):
+        self.assertIs(compile_filter('name = logo'), compile_filter('name = logo'))
+
+    def test_dict_values_are_filtered(self):
+        data = {'a': {'name': 'keep'}, 'b': {'name': 'drop'}, 'c': 'text'}
+        self.assertEqual(compile_filter('name = keep').filter(data), {'a': {'name': 'keep'}})
+
+    def test_where_clause_splits_a_bare_key_value_on_the_first_equals(self):
+        items = [{'name': 'x(y)'}, {'name': 'a,b'}, {'name': 'k=v'}, {'name': ''}, {'name': 'x'}]
+        for text, expected in [('name=x(y)', 'x(y)'), ('name=a,b', 'a,b'), ('name=k=v', 'k=v'), ('name=', '')]:
+            with self.subTest(text):
+                self.assertEqual(where_filter(text).filter(items), [{'name': expected}])
+        self.assertEqual(where_filter('name = x or name = "a,b"').filter(items), [{'name': 'a,b'}, {'name': 'x'}])
+
+    def test_syntax_errors(self):
+        for text in ['name', '= x', 'name = a and', '(name = a', 'name in a', 'name < ']:
+            with self.subTest(text):
+                with self.assertRaises(FilterSyntaxError):
+                    compile_filter(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
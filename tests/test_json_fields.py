@@ -0,0 +1,83 @@
+import unittest
+from src.db_connection import get_connection
+from src.json_fields import configure_extracted_fields
+from src.save_result import save_result
+from tests.db_test_case import DatabaseTestCase
+
+REPOS = [
+    {'name': 'class', 'full_name': 'nonflow/class', 'private': False, 'stargazers_count': 5, 'owner': {'login': 'nonflow'}},
+    {'name': 'logo', 'full_name': 'nonflow/logo', 'private': True, 'stargazers_count': 2, 'owner': {'login': 'nonflow'}},
+]
+
+
+class TestJsonFields(DatabaseTestCase):
+    def tearDown(self):
+        configure_extracted_fields()
+        super().tearDown()
+
+    def test_array_results_are_extracted_per_element(self):
+        configure_extracted_fields()
+        save_result('list all repositories github_main', 'github_main', 'GitHubService', 'list_all_repositories', REPOS)
+
+        rows = get_connection().execute('''
+        SELECT item_index, name, full_name, private, stargazers_count, owner_login
+        FROM extract_githubservice_list_all_repositories ORDER BY item_index''').fetchall()
+
+        self.assertEqual(rows, [
+            (0, 'class', 'nonflow/class', 0, 5, 'nonflow'),
+            (1, 'logo', 'nonflow/logo', 1, 2, 'nonflow'),
+        ])
+
+    def test_root_path_and_object_results(self):
+        configure_extracted_fields({'SampleService.get_zone': {'root': 'result', 'fields': ['id', 'name']}})
+        save_result('get zone x', 'x', 'SampleService', 'get_zone', {'result': {'id': 'z1', 'name': 'example.com'}})
+
+        rows = get_connection().execute("SELECT item_index, id, name FROM extract_sampleservice_get_zone").fetchall()
+
+        self.assertEqual(rows, [(0, 'z1', 'example.com')])
+
+    def test_existing_results_are_backfilled(self):
+        save_result('list projects gitlab_main', 'gitlab_main', 'SampleService', 'list_projects', [{'name': 'a'}, 'plain'])
+
+        configure_extracted_fields({'SampleService.list_projects': ['name']})
+
+        rows = get_connection().execute("SELECT name FROM extract_sampleservice_list_projects").fetchall()
+        self.assertEqual(rows, [('a',)])
+
+    def test_changed_declaration_rebuilds_the_table(self):
+        save_result('get zone x', 'x', 'SampleService', 'get_zone',
+                    {'id': 'outer', 'result': {'id': 'z1', 'name': 'example.com'}})
+        configure_extracted_fields({'SampleService.get_zone': ['id']})
+        query = "SELECT id FROM extract_sampleservice_get_zone"
+        self.assertEqual(get_connection().execute(query).fetchall(), [('outer',)])
+
+        # Same columns, new root
+        configure_extracted_fields({'SampleService.get_zone': {'root': 'result', 'fields': ['id']}})
+        self.assertEqual(get_connection().execute(query).fetchall(), [('z1',)])
+
+        # Fewer columns
+        configure_extracted_fields({'SampleService.get_zone': {'root': 'result', 'fields': ['id', 'name']}})
+        configure_extracted_fields({'SampleService.get_zone': {'root': 'result', 'fields': ['name']}})
+        columns = [row[1] for row in get_connection().execute("PRAGMA table_info(extract_sampleservice_get_zone)")]
+        self.assertEqual(columns, ['query_id', 'item_index', 'name'])
+
+    def test_non_json_results_are_ignored(self):
+        configure_extracted_fields({'SampleService.create': ['id']})
+
+        save_result('create x', 'x', 'SampleService', 'create', 'Database created successfully')
+
+        count = get_connection().execute("SELECT COUNT(*) FROM extract_sampleservice_create").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_extracted_columns_are_indexed(self):
+        configure_extracted_fields()
+
+        plan = get_connection().execute('''
+        EXPLAIN QUERY PLAN SELECT full_name FROM extract_githubservice_list_all_repositories
+        WHERE name = ?''', ('logo',)).fetchall()
+
+        self.assertIn('idx_extract_githubservice_list_all_repositories_name', plan[0][3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import subprocess
+import sqlite3
+import unittest
+from src.db_connection import get_connection
+from src.migrations import migrate, get_schema_version, result_hash, SCHEMA_VERSION
+from src.save_result import save_result
+from src.get_latest_result import get_latest_result
+from tests.db_test_case import DatabaseTestCase
+
+
+class TestMigrations(DatabaseTestCase):
+    migrate_database = False
+
+    def test_importing_modules_leaves_the_database_alone(self):
+        db_path = os.path.join(self.tmp_dir, 'real.db')
+        env = dict(os.environ, SQLITE_DB_PATH=db_path, PYTHONPATH=os.getcwd())
+        subprocess.run([sys.executable, '-c', 'import runnerdb, eventdb, src.execute_command, src.runner_daemon'],
+                       cwd=self.tmp_dir, env=env, check=True, capture_output=True)
+        self.assertFalse(os.path.exists(db_path))
+
+    def create_legacy_database(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+        CREATE TABLE query (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            command TEXT,
+            name TEXT,
+            service_name TEXT,
+            method_name TEXT,
+            result TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )''')
+        conn.execute('''
+        INSERT INTO query (command, name, service_name, method_name, result, timestamp)
+        VALUES ('list zones cloudflare_main', 'cloudflare_main', 'CloudflareService', 'list_zones',
+                '["a"]', '2024-01-02 03:04:05')''')
+        conn.commit()
+        conn.close()
+
+    def test_upgrades_legacy_database(self):
+        self.create_legacy_database()
+
+        migrate()
+
+        conn = get_connection()
+        self.assertEqual(get_schema_version(conn), SCHEMA_VERSION)
+        row = conn.execute("SELECT created_at_ns, result_size, result_hash FROM query").fetchone()
+        self.assertEqual(row, (1704164645 * 10**9, 5, result_hash('["a"]')))
+
+    def test_legacy_results_move_into_shared_blobs(self):
+        self.create_legacy_database()
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute('''
+            INSERT INTO query (command, name, service_name, method_name, result)
+            SELECT command, name, service_name, method_name, result FROM query''')
+        conn.close()
+
+        migrate()
+
+        conn = get_connection()
+        self.assertEqual(conn.execute("SELECT COUNT(*), MIN(first_query_id) FROM result_blob").fetchone(), (1, 1))
+        self.assertEqual(conn.execute("SELECT DISTINCT query_id FROM query_item").fetchall(), [(1,)])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM query_row WHERE result IS NOT NULL").fetchone()[0], 0)
+        # SQL written against the old table still reads the results
+        self.assertEqual(conn.execute("SELECT result FROM query").fetchall(), [('["a"]',), ('["a"]',)])
+        conn.execute("DELETE FROM query WHERE id = 2")
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM query_row").fetchone()[0], 1)
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ['a'])
+
+    def test_migrate_is_idempotent(self):
+        migrate()
+        migrate()
+
+        self.assertEqual(get_schema_version(get_connection()), SCHEMA_VERSION)
+
+    def test_latest_result_lookup_uses_index(self):
+        migrate()
+
+        plan = get_connection().execute('''
+        EXPLAIN QUERY PLAN SELECT result FROM query
+        WHERE service_name = ? AND method_name = ?
+        ORDER BY created_at_ns DESC, id DESC LIMIT 1''', ('a', 'b')).fetchall()
+
+        self.assertIn('USING INDEX idx_query_latest', plan[0][3])
+        self.assertNotIn('TEMP B-TREE', ' '.join(step[3] for step in plan))
+
+    def test_latest_result_follows_insertion_order(self):
+        migrate()
+        save_result('c', 'n', 'Service', 'method', ['first'])
+        save_result('c', 'n', 'Service', 'method', ['second'])
+
+        self.assertEqual(get_latest_result('Service', 'method'), ['second'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import io
+import os
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from src.output_formats import resolve_format, write_rows, write_items
+
+COLUMNS = ['id', 'name']
+ROWS = [(1, 'logo'), (2, None), (10, 'a,b')]
+
+
+class TestOutputFormats(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def render(self, fmt, rows=ROWS):
+        output = io.StringIO()
+        write_rows(COLUMNS, iter(rows), fmt, output=output)
+        return output.getvalue()
+
+    def test_pipe(self):
+        self.assertEqual(self.render('pipe'), "id | name\n---------\n1 | logo\n2 | None\n10 | a,b\n")
+
+    def test_aligned_table(self):
+        self.assertEqual(self.render('table'), "id | name\n---+-----\n1  | logo\n2  | None\n10 | a,b\n")
+        self.assertEqual(self.render('table', []), "id | name\n---+-----\n")
+
+    def test_csv(self):
+        self.assertEqual(list(csv.reader(io.StringIO(self.render('csv')))),
+                         [['id', 'name'], ['1', 'logo'], ['2', ''], ['10', 'a,b']])
+
+    def test_json_lines(self):
+        lines = [json.loads(line) for line in self.render('jsonl').splitlines()]
+        self.assertEqual(lines[1], {'id': 2, 'name': None})
+
+    def test_gzip_file_and_format_from_extension(self):
+        path = os.path.join(self.tmp_dir, 'rows.ndjson.gz')
+        count = write_rows(COLUMNS, iter(ROWS), file=path)
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(count, 3)
+        self.assertEqual(lines[2], {'id': 10, 'name': 'a,b'})
+        self.assertEqual(resolve_format(file='x.csv'), 'csv')
+        with self.assertRaises(ValueError):
+            resolve_format('xml')
+
+    def test_items_from_a_generator(self):
+        items = ({'name': f'repo{i}', 'owner': {'login': 'nonflow'}} for i in range(3))
+        output = io.StringIO()
+        count = write_items(items, 'csv', output=output)
+
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(count, 3)
+        self.assertEqual(rows[0], ['name', 'owner'])
+        self.assertEqual(rows[1], ['repo0', '{"login": "nonflow"}'])
+
+    def test_scalar_and_object_results(self):
+        output = io.StringIO()
+        write_items({'id': 1}, 'jsonl', output=output)
+        write_items('done', 'pipe', output=output)
+        self.assertEqual(output.getvalue(), '{"id": 1}\nvalue\n-----\ndone\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
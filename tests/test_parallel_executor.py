@@ -0,0 +1,126 @@
+import io
+import time
+import threading
+import unittest
+from unittest.mock import patch
+from src.parallel_executor import analyze_command, build_dependency_graph, run_commands_parallel
+from src.save_result import commit_turn
+
+SERVICE_CONFIG = {
+    'github_main': {'service': 'GitHubService', 'access_token': 'x'},
+    'gitlab_main': {'service': 'GitLabService', 'private_token': 'y'},
+}
+
+
+class TestParallelExecutor(unittest.TestCase):
+    def test_independent_accounts_have_no_dependencies(self):
+        nodes = build_dependency_graph(
+            ['list all repositories github_main', 'list projects gitlab_main'], SERVICE_CONFIG)
+
+        self.assertEqual([node.depends_on for node in nodes], [set(), set()])
+        self.assertEqual(nodes[0].writes, {('GitHubService', 'list_all_repositories')})
+
+    def test_filter_and_print_depend_on_producer(self):
+        nodes = build_dependency_graph([
+            'list all repositories github_main',
+            'list projects gitlab_main',
+            'filter GitHubService_list_all_repositories name logo',
+            'print value full_name where name=logo GitHubService_list_all_repositories',
+        ], SERVICE_CONFIG)
+
+        self.assertEqual(nodes[2].depends_on, {0})
+        self.assertEqual(nodes[3].depends_on, {0, 2})
+
+    def test_print_value_reads_the_result_named_after_from(self):
+        reads, writes, _ = analyze_command(
+            'print value full_name where name=logo from GitHubService_list_all_repositories -- format=jsonl',
+            SERVICE_CONFIG)
+
+        self.assertEqual(reads, {('GitHubService', 'list_all_repositories')})
+        self.assertEqual(writes, set())
+
+    def test_select_depends_on_all_earlier_writers(self):
+        nodes = build_dependency_graph([
+            'list all repositories github_main',
+            'list projects gitlab_main',
+            'SELECT result FROM query',
+            'list projects gitlab_main',
+        ], SERVICE_CONFIG)
+
+        self.assertEqual(nodes[2].depends_on, {0, 1})
+        self.assertEqual(nodes[3].depends_on, {2})
+        self.assertEqual(nodes[3].commit_after, {1})
+
+    def test_output_is_emitted_in_sentence_order(self):
+        delays = {'slow github_main': 0.05, 'fast gitlab_main': 0.0}
+
+        def execute(command, classes_and_objects, service_config):
+            time.sleep(delays[command])
+            print(command)
+
+        with patch('sys.stdout', new=io.StringIO()) as fake_out:
+            run_commands_parallel(list(delays), {}, SERVICE_CONFIG, execute, max_workers=4)
+
+        self.assertEqual(fake_out.getvalue(), 'slow github_main\nfast gitlab_main\n')
+
+    def test_per_account_concurrency_limit(self):
+        lock = threading.Lock()
+        active = {'now': 0, 'peak': 0}
+
+        def execute(command, classes_and_objects, service_config):
+            with lock:
+                active['now'] += 1
+                active['peak'] = max(active['peak'], active['now'])
+            time.sleep(0.05)
+            with lock:
+                active['now'] -= 1
+
+        commands = [f'list {name} github_main' for name in ('repos', 'issues', 'stars', 'forks', 'teams', 'tags')]
+        self.assertEqual([node.depends_on for node in build_dependency_graph(commands, SERVICE_CONFIG)], [set()] * 6)
+        run_commands_parallel(commands, {}, SERVICE_CONFIG, execute, max_workers=6, per_account=3)
+
+        self.assertEqual(active['peak'], 3)
+
+    def test_writes_of_the_same_result_run_concurrently_and_commit_in_order(self):
+        commands = [f'create issue github_main title=t{i}' for i in range(3)]
+        nodes = build_dependency_graph(commands, SERVICE_CONFIG)
+        self.assertEqual([node.depends_on for node in nodes], [set(), set(), set()])
+        self.assertEqual([node.commit_after for node in nodes], [set(), {0}, {0, 1}])
+
+        lock = threading.Lock()
+        active = {'now': 0, 'peak': 0}
+        committed = []
+
+        def execute(command, classes_and_objects, service_config):
+            with lock:
+                active['now'] += 1
+                active['peak'] = max(active['peak'], active['now'])
+            # The first sentence finishes its call last
+            time.sleep(0.1 if command.endswith('t0') else 0.02)
+            with lock:
+                active['now'] -= 1
+            wait_for_turn = commit_turn.get()
+            if wait_for_turn:
+                wait_for_turn()
+            committed.append(command)
+
+        run_commands_parallel(commands, {}, SERVICE_CONFIG, execute, max_workers=3, per_account=3)
+
+        self.assertEqual(active['peak'], 3)
+        self.assertEqual(committed, commands)
+
+    def test_write_waits_for_earlier_reader(self):
+        nodes = build_dependency_graph([
+            'filter GitHubService_create_issue title=t',
+            'create issue github_main title=t',
+        ], SERVICE_CONFIG)
+
+        self.assertEqual(nodes[1].depends_on, {0})
+
+    def test_limits_must_be_positive(self):
+        for limits in ({'per_account': 0}, {'max_workers': 0}, {'per_account': -1}):
+            with self.assertRaises(ValueError):
+                run_commands_parallel(['list repos github_main'], {}, SERVICE_CONFIG, lambda *args: None, **limits)
+
+if __name__ == '__main__':
+    unittest.main()
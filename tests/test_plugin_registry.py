@@ -0,0 +1,102 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.plugin_registry import PluginRegistry, build_manifest
+
+
+class TestPluginRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.python_dir = os.path.join(self.tmp_dir, 'python')
+        os.mkdir(self.python_dir)
+        self.manifest_path = os.path.join(self.tmp_dir, 'manifest.json')
+
+        with open(os.path.join(self.python_dir, 'registry_sample_service.py'), 'w') as file:
+            file.write(
+                "class BaseSample:\n"
+                "    def ping(self):\n"
+                "        return 'pong'\n"
+                "\n"
+                "class SampleService(BaseSample):\n"
+                "    def __init__(self, token):\n"
+                "        self.token = token\n"
+                "\n"
+                "    def List_Items(self, limit=10):\n"
+                "        return list(range(limit))\n"
+            )
+        with open(os.path.join(self.python_dir, 'registry_heavy_plugin.py'), 'w') as file:
+            file.write(
+                "import module_that_does_not_exist\n"
+                "\n"
+                "class HeavyPlugin:\n"
+                "    def run(self):\n"
+                "        pass\n"
+            )
+
+    def tearDown(self):
+        for module_name in ('registry_sample_service', 'registry_heavy_plugin'):
+            sys.modules.pop(module_name, None)
+        if self.python_dir in sys.path:
+            sys.path.remove(self.python_dir)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_describe_does_not_import_modules(self):
+        registry = PluginRegistry(self.python_dir, self.manifest_path)
+
+        self.assertIn('HeavyPlugin', registry)
+        self.assertEqual(registry.describe()['SampleService']['list_items'], '(self, limit=10)')
+        self.assertIn('ping', registry.describe()['SampleService'])
+        self.assertNotIn('registry_heavy_plugin', sys.modules)
+
+    def test_getitem_imports_only_target_module(self):
+        registry = PluginRegistry(self.python_dir, self.manifest_path)
+
+        service_info = registry['SampleService']
+
+        self.assertEqual(service_info['class'].__name__, 'SampleService')
+        self.assertIn('list_items', service_info['methods'])
+        self.assertNotIn('registry_heavy_plugin', sys.modules)
+
+    def test_manifest_is_reused_when_files_are_unchanged(self):
+        build_manifest(self.python_dir, self.manifest_path)
+
+        with patch('src.plugin_registry._scan_module') as mock_scan:
+            modules = build_manifest(self.python_dir, self.manifest_path)
+
+        mock_scan.assert_not_called()
+        self.assertIn('SampleService', modules['registry_sample_service']['classes'])
+
+    def test_changed_file_is_rescanned(self):
+        build_manifest(self.python_dir, self.manifest_path)
+        with open(os.path.join(self.python_dir, 'registry_sample_service.py'), 'a') as file:
+            file.write("\nclass AddedService:\n    pass\n")
+
+        modules = build_manifest(self.python_dir, self.manifest_path)
+
+        self.assertIn('AddedService', modules['registry_sample_service']['classes'])
+
+    def test_refresh_reimports_changed_module(self):
+        registry = PluginRegistry(self.python_dir, self.manifest_path)
+        old_class = registry['SampleService']['class']
+        with open(os.path.join(self.python_dir, 'registry_sample_service.py'), 'a') as file:
+            file.write("\nclass AddedService:\n    pass\n")
+
+        changed = registry.refresh()
+
+        self.assertEqual(changed, {'BaseSample', 'SampleService', 'AddedService'})
+        self.assertIsNot(registry['SampleService']['class'], old_class)
+        self.assertIn('AddedService', registry)
+        self.assertEqual(registry.refresh(), set())
+
+    def test_unknown_class_raises_key_error(self):
+        registry = PluginRegistry(self.python_dir, self.manifest_path)
+
+        with self.assertRaises(KeyError):
+            registry['MissingService']
+
+
+if __name__ == '__main__':
+    unittest.main()
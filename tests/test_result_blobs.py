@@ -0,0 +1,56 @@
+import unittest
+from src.db_connection import get_connection
+from src.save_result import save_result
+from src.get_latest_result import get_latest_result
+from src.result_items import get_latest_result_id, iter_result_items
+from src.result_blobs import result_changed_since_last_run
+from src.filter_expression import compile_filter
+from src.sql_filter import filter_latest_result
+from tests.db_test_case import DatabaseTestCase
+
+ZONES = [{'id': 'a', 'name': 'example.com'}, {'id': 'b', 'name': 'example.org'}]
+
+
+class TestResultBlobs(DatabaseTestCase):
+    def count(self, table):
+        return get_connection().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_identical_results_are_stored_once(self):
+        for _ in range(3):
+            save_result('list zones cloudflare_main', 'cloudflare_main', 'CloudflareService', 'list_zones', ZONES)
+
+        self.assertEqual(self.count('query'), 3)
+        self.assertEqual(self.count('result_blob'), 1)
+        self.assertEqual(self.count('query_item'), 2)
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ZONES)
+        latest_id = get_latest_result_id('CloudflareService', 'list_zones')
+        self.assertEqual(list(iter_result_items(latest_id)), ZONES)
+
+    def test_filtering_a_repeated_result(self):
+        save_result('x', 'x', 'CloudflareService', 'list_zones', ZONES)
+        save_result('x', 'x', 'CloudflareService', 'list_zones', ZONES)
+
+        query_id, match_count = filter_latest_result('filter', 'CloudflareService', 'list_zones',
+                                                     compile_filter('name ^= example.o'))
+        self.assertEqual(match_count, 1)
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), [ZONES[1]])
+
+    def test_result_changed_since_last_run(self):
+        self.assertTrue(result_changed_since_last_run('CloudflareService', 'list_zones'))
+        save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES)
+        self.assertTrue(result_changed_since_last_run('CloudflareService', 'list_zones'))
+
+        save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES)
+        self.assertFalse(result_changed_since_last_run('CloudflareService', 'list_zones'))
+
+        save_result('list zones b', 'b', 'CloudflareService', 'list_zones', ZONES[:1])
+        self.assertTrue(result_changed_since_last_run('CloudflareService', 'list_zones'))
+        self.assertFalse(result_changed_since_last_run('CloudflareService', 'list_zones', command='list zones a'))
+
+        # Filter results do not count as runs
+        filter_latest_result('filter', 'CloudflareService', 'list_zones', compile_filter('id = a'))
+        self.assertTrue(result_changed_since_last_run('CloudflareService', 'list_zones'))
+
+
+if __name__ == '__main__':
+    unittest.main()
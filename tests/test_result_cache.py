@@ -0,0 +1,101 @@
+import sqlite3
+import unittest
+from unittest.mock import patch
+from src.db_connection import get_connection
+from src.save_result import save_result
+from src.get_latest_result import get_latest_result
+from src.result_cache import LatestResultCache, clear_result_cache, latest_results
+from src.filter_expression import compile_filter
+from src.sql_filter import filter_latest_result
+from tests.db_test_case import DatabaseTestCase
+
+ZONES = [{'id': 'a', 'name': 'example.com'}, {'id': 'b', 'name': 'example.org'}]
+
+
+class TestLatestResultCache(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        clear_result_cache()
+
+    def tearDown(self):
+        clear_result_cache()
+        super().tearDown()
+
+    def test_repeated_reads_share_one_decoded_value(self):
+        save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES)
+        first = get_latest_result('CloudflareService', 'list_zones')
+        self.assertEqual(first, ZONES)
+        with patch('src.get_latest_result.load_result') as load_result:
+            self.assertIs(get_latest_result('CloudflareService', 'list_zones'), first)
+        load_result.assert_not_called()
+
+    def test_write_through_and_filter_results(self):
+        save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES)
+        get_latest_result('CloudflareService', 'list_zones')
+        save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES[:1])
+        with patch('src.get_latest_result.load_result') as load_result:
+            self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ZONES[:1])
+        load_result.assert_not_called()
+
+        filter_latest_result('filter', 'CloudflareService', 'list_zones', compile_filter('id = a'))
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ZONES[:1])
+        save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES)
+        filter_latest_result('filter', 'CloudflareService', 'list_zones', compile_filter('id = b'))
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ZONES[1:])
+
+    def test_commit_from_another_process_is_seen(self):
+        save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES)
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ZONES)
+
+        other = sqlite3.connect(self.db_path)
+        other.execute('''
+        INSERT INTO query_row (command, name, service_name, method_name, created_at_ns, result_size, blob_id)
+        SELECT command, name, service_name, method_name, created_at_ns + 1, result_size, blob_id FROM query
+        ''')
+        other.execute("DELETE FROM query WHERE id = 1")
+        other.commit()
+        other.close()
+
+        with patch('src.get_latest_result.load_result', return_value='reloaded') as load_result:
+            self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), 'reloaded')
+        load_result.assert_called_once()
+
+    def test_commit_between_save_and_write_through_is_seen(self):
+        save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES)
+        put = latest_results.put
+
+        def put_after_other_commit(*args, **kwargs):
+            # Another client saves a newer result right after our commit
+            other = sqlite3.connect(self.db_path)
+            other.execute('''
+            INSERT INTO query_row (command, name, service_name, method_name, created_at_ns, result_size, blob_id)
+            SELECT command, name, service_name, method_name, created_at_ns + 1000000000000, result_size, blob_id
+            FROM query WHERE id = 1
+            ''')
+            other.commit()
+            other.close()
+            put(*args, **kwargs)
+
+        with patch.object(latest_results, 'put', side_effect=put_after_other_commit):
+            save_result('list zones a', 'a', 'CloudflareService', 'list_zones', ZONES[:1])
+
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ZONES)
+
+    def test_size_bound(self):
+        conn = get_connection()
+        cache = LatestResultCache(max_bytes=100)
+        cache.put(conn, 'S', 'a', 1, text='[' + '1,' * 20 + '1]')
+        cache.put(conn, 'S', 'b', 2, text='[' + '2,' * 20 + '2]')
+        self.assertEqual(cache.get(conn, 'S', 'a', lambda: 1), (True, [1] * 21))
+        cache.put(conn, 'S', 'c', 3, text='[' + '3,' * 20 + '3]')
+        # b was the least recently used
+        self.assertEqual(cache.get(conn, 'S', 'b', lambda: 2), (False, None))
+        self.assertTrue(cache.get(conn, 'S', 'a', lambda: 1)[0])
+        self.assertLessEqual(cache.total_bytes, 100)
+
+        cache.put(conn, 'S', 'a', 4, text='[' + '4,' * 100 + '4]')
+        self.assertEqual(cache.get(conn, 'S', 'a', lambda: 4), (False, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
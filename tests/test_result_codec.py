@@ -0,0 +1,74 @@
+import json
+import unittest
+from unittest.mock import patch
+from src.db_connection import get_connection
+from src.save_result import save_result
+from src.get_latest_result import get_latest_result
+from src.create_json_result_view import create_json_result_view
+from src.execute_sql_query import execute_sql_query
+from src.result_codec import forget_dictionaries, decode_result
+from tests.db_test_case import DatabaseTestCase
+
+ZONES = [{'id': f'zone{i}', 'name': f'example{i}.com', 'status': 'active', 'paused': False} for i in range(200)]
+
+
+class TestResultCodec(DatabaseTestCase):
+    def setUp(self):
+        self.codec_patch = patch('src.result_codec.RESULT_CODEC', 'zlib')
+        self.codec_patch.start()
+        forget_dictionaries()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.codec_patch.stop()
+        forget_dictionaries()
+
+    def stored(self):
+        return get_connection().execute('''
+        SELECT data, codec, codec_dict_id, size FROM result_blob ORDER BY id DESC LIMIT 1
+        ''').fetchone()
+
+    def test_results_are_compressed_and_read_back(self):
+        save_result('list zones cloudflare_main', 'cloudflare_main', 'CloudflareService', 'list_zones', ZONES)
+
+        result, codec, dict_id, size = self.stored()
+        self.assertEqual(codec, 'zlib')
+        self.assertIsNone(dict_id)
+        self.assertLess(len(result) * 5, size)
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ZONES)
+
+    def test_later_results_use_a_dictionary_trained_on_the_first(self):
+        save_result('x', 'x', 'CloudflareService', 'list_zones', ZONES)
+        first_size = len(self.stored()[0])
+        save_result('x', 'x', 'CloudflareService', 'list_zones', ZONES[:150])
+
+        result, codec, dict_id, size = self.stored()
+        self.assertEqual(dict_id, 1)
+        self.assertLess(len(result), first_size / 2)
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), ZONES[:150])
+
+    def test_sql_sees_plain_json(self):
+        create_json_result_view()
+        save_result('x', 'x', 'CloudflareService', 'list_zones', ZONES)
+        save_result('x', 'x', 'CloudflareService', 'list_zones', ZONES)
+
+        _, rows = execute_sql_query("SELECT json_extract(result, '$[199].name') FROM json_result ORDER BY id")
+        self.assertEqual(rows, [('example199.com',), ('example199.com',)])
+        _, rows = execute_sql_query('''
+        SELECT json_array_length(result_json(data, codec, codec_dict_id)) FROM result_blob''')
+        self.assertEqual(rows, [(200,)])
+
+    def test_small_results_and_lzma(self):
+        save_result('x', 'x', 'Service', 'method', {'status': 'ok'})
+        self.assertEqual(self.stored()[:2], ('{"status": "ok"}', None))
+
+        with patch('src.result_codec.RESULT_CODEC', 'lzma'):
+            save_result('x', 'x', 'Service', 'method', ZONES)
+        result, codec, dict_id, _ = self.stored()
+        self.assertEqual(codec, 'lzma')
+        self.assertEqual(json.loads(decode_result(result, codec, dict_id)), ZONES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import copy
+import json
+import random
+import unittest
+from unittest.mock import patch
+from src.db_connection import get_connection
+from src.save_result import save_result
+from src.get_latest_result import get_latest_result
+from src.create_json_result_view import create_json_result_view
+from src.result_blobs import clear_blob_cache
+from src.result_delta import diff, apply, encode_delta
+from src.result_history import get_result_at, iter_result_history
+from tests.db_test_case import DatabaseTestCase
+
+
+def repositories(count):
+    return [{'id': i, 'name': f'repo{i}', 'stargazers_count': i % 7, 'owner': {'login': 'nonflow'},
+             'topics': ['python', 'cli']} for i in range(count)]
+
+
+class TestStructuralDiff(unittest.TestCase):
+    def test_roundtrip(self):
+        old = repositories(50)
+        cases = []
+        new = copy.deepcopy(old)
+        new[3]['stargazers_count'] += 1
+        new[10]['owner']['login'] = 'someone'
+        del new[20]
+        new.insert(30, {'id': 999, 'name': 'new'})
+        new[40] = {'renamed': True}
+        new[5]['topics'].append('sqlite')
+        new[6] = dict(reversed(list(new[6].items())))
+        cases.append(new)
+        cases.append([])
+        cases.append({'result': old})
+        cases.append('text')
+
+        for new in cases:
+            with self.subTest(new=str(new)[:40]):
+                self.assertEqual(json.dumps(apply(old, diff(old, new))), json.dumps(new))
+
+    def test_random_edits(self):
+        rng = random.Random(7)
+        old = repositories(100)
+        for _ in range(20):
+            new = copy.deepcopy(old)
+            for _ in range(5):
+                i = rng.randrange(len(new))
+                choice = rng.random()
+                if choice < 0.3:
+                    new[i]['stargazers_count'] = rng.randrange(100)
+                elif choice < 0.6:
+                    del new[i]
+                else:
+                    new.insert(i, {'id': rng.randrange(1000)})
+            self.assertEqual(apply(old, diff(old, new)), new)
+            self.assertEqual(json.dumps(apply(old, diff(old, new))), json.dumps(new))
+
+    def test_encode_delta_requires_json(self):
+        self.assertIsNone(encode_delta('<xml/>', '[1]'))
+        self.assertIsNotNone(encode_delta('[1, 2]', '[1, 3]'))
+
+
+class TestDeltaStorage(DatabaseTestCase):
+    def setUp(self):
+        self.delta_patch = patch('src.result_blobs.RESULT_DELTA', True)
+        self.delta_patch.start()
+        super().setUp()
+        clear_blob_cache()
+
+    def tearDown(self):
+        super().tearDown()
+        self.delta_patch.stop()
+        clear_blob_cache()
+
+    def save_versions(self, count):
+        versions = []
+        repos = repositories(300)
+        for day in range(count):
+            repos = copy.deepcopy(repos)
+            repos[day]['stargazers_count'] += 1
+            save_result('list all repositories github_main', 'github_main', 'GitHubService', 'list_all_repositories',
+                        repos)
+            versions.append(repos)
+        return versions
+
+    def blobs(self):
+        return get_connection().execute(
+            "SELECT base_blob_id, delta_depth, length(data), size FROM result_blob ORDER BY id").fetchall()
+
+    def test_results_are_stored_as_patches(self):
+        versions = self.save_versions(4)
+
+        blobs = self.blobs()
+        self.assertEqual([(base, depth) for base, depth, _, _ in blobs], [(None, 0), (1, 1), (2, 2), (3, 3)])
+        for _, _, stored, size in blobs[1:]:
+            self.assertLess(stored * 20, size)
+
+        clear_blob_cache()
+        self.assertEqual(get_latest_result('GitHubService', 'list_all_repositories'), versions[-1])
+
+    def test_snapshots_bound_the_patch_chain(self):
+        with patch('src.result_blobs.RESULT_DELTA_SNAPSHOT_EVERY', 2):
+            versions = self.save_versions(5)
+
+        self.assertEqual([depth for _, depth, _, _ in self.blobs()], [0, 1, 2, 0, 1])
+        clear_blob_cache()
+        self.assertEqual(get_latest_result('GitHubService', 'list_all_repositories'), versions[-1])
+
+    def test_history_and_point_in_time_reads(self):
+        versions = self.save_versions(4)
+        clear_blob_cache()
+
+        history = list(iter_result_history('GitHubService', 'list_all_repositories'))
+        self.assertEqual([result for _, _, result in history], versions)
+
+        second_at = history[1][1]
+        self.assertEqual(get_result_at('GitHubService', 'list_all_repositories', second_at), versions[1])
+        self.assertIsNone(get_result_at('GitHubService', 'list_all_repositories', history[0][1] - 1))
+
+    def test_json_result_view_rebuilds_patches(self):
+        create_json_result_view()
+        self.save_versions(3)
+        clear_blob_cache()
+
+        rows = get_connection().execute(
+            "SELECT json_extract(result, '$[2].stargazers_count') FROM json_result ORDER BY id").fetchall()
+        self.assertEqual(rows, [(2,), (2,), (3,)])
+
+    def test_other_commands_are_not_used_as_base(self):
+        save_result('list all repositories a', 'a', 'GitHubService', 'list_all_repositories', repositories(300))
+        save_result('list all repositories b', 'b', 'GitHubService', 'list_all_repositories', repositories(301))
+
+        self.assertEqual([base for base, _, _, _ in self.blobs()], [None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
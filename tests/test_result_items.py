@@ -0,0 +1,44 @@
+import unittest
+from src.db_connection import get_connection
+from src.save_result import save_result
+from src.result_items import get_latest_result_id, iter_result_items
+from tests.db_test_case import DatabaseTestCase
+
+
+class TestResultItems(DatabaseTestCase):
+    def test_list_results_are_exploded_with_key_columns(self):
+        save_result('list projects gitlab_main', 'gitlab_main', 'GitLabService', 'list_projects',
+                    [{'id': 7, 'name': 'class'}, 'example.com', True, None, [1, 2]])
+
+        rows = get_connection().execute(
+            "SELECT item_index, element, item_id, item_name FROM query_item ORDER BY item_index").fetchall()
+
+        self.assertEqual(rows, [
+            (0, '{"id":7,"name":"class"}', 7, 'class'),
+            (1, '"example.com"', None, None),
+            (2, 'true', None, None),
+            (3, 'null', None, None),
+            (4, '[1,2]', None, None),
+        ])
+
+    def test_non_list_results_are_not_exploded(self):
+        save_result('x', 'x', 'Service', 'method', {'id': 1})
+        save_result('x', 'x', 'Service', 'method', '[not json')
+
+        count = get_connection().execute("SELECT COUNT(*) FROM query_item").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_iter_result_items_pages_through_latest_result(self):
+        save_result('x', 'x', 'Service', 'method', [{'name': 'old'}])
+        save_result('x', 'x', 'Service', 'method', [{'name': f'repo{i}'} for i in range(25)])
+
+        query_id = get_latest_result_id('Service', 'method')
+        items = list(iter_result_items(query_id, page_size=10))
+
+        self.assertEqual(len(items), 25)
+        self.assertEqual(items[0], {'name': 'repo0'})
+        self.assertEqual(items[-1], {'name': 'repo24'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import logging
+import sqlite3
+import unittest
+import logging.handlers
+from unittest.mock import patch
+from src.db_connection import get_connection
+from src.service_pool import service_pool
+from src.execute_command import execute_command
+from src import result_logging
+from src.result_logging import (ResultSummary, configure_result_logging, policy_for, log_result,
+                                start_log_queue, stop_log_queue)
+from tests.db_test_case import DatabaseTestCase
+
+
+class BigGitHubService:
+    def __init__(self, token=None):
+        self.token = token
+
+    def list_repos(self):
+        return [{'id': index, 'name': f'repo-{index}'} for index in range(5000)]
+
+
+CLASSES = {'GitHubService': {'class': BigGitHubService, 'methods': {'list_repos': BigGitHubService.list_repos}}}
+SERVICE_CONFIG = {'github_main': {'service': 'GitHubService', 'token': 'x'}}
+
+
+class TestResultLogging(unittest.TestCase):
+    def tearDown(self):
+        configure_result_logging()
+
+    def test_summary_is_bounded(self):
+        result = [{'id': index} for index in range(1000)]
+        text = json.dumps(result)
+
+        summary = str(ResultSummary(result, text, 1.234, 20, len(text)))
+
+        self.assertEqual(summary, f'1000 items, {len(text)} bytes in 1.23s: {text[:20]}... (truncated)')
+        self.assertEqual(str(ResultSummary({'a': 'é'}, '{"a": "é"}', None, 0, 11)), '1 keys, 11 bytes')
+        self.assertEqual(str(ResultSummary('text', 'text', None, 0)), 'str')
+
+    def test_unknown_log_level_falls_back_to_info(self):
+        self.assertEqual(result_logging._log_level('debug'), logging.DEBUG)
+        self.assertEqual(result_logging._log_level('25'), 25)
+        with self.assertLogs('src.result_logging', logging.WARNING):
+            self.assertEqual(result_logging._log_level('FOO'), logging.INFO)
+
+    def test_policies_inherit_default(self):
+        configure_result_logging({'default': {'max_chars': 50}, 'GitHubService.list_repos': {'sample': 0.5}})
+
+        self.assertEqual((policy_for('GitHubService', 'list_repos').max_chars,
+                          policy_for('GitHubService', 'list_repos').sample), (50, 0.5))
+        self.assertEqual(policy_for('GitLabService', 'list_projects').max_chars, 50)
+        with self.assertRaises(ValueError):
+            configure_result_logging({'default': {'max_lines': 5}})
+
+    def test_nothing_is_formatted_when_not_logged(self):
+        log = logging.getLogger('test_result_logging.quiet')
+        configure_result_logging({'GitHubService.list_repos': {'sample': 0}})
+        with patch.object(ResultSummary, '__str__') as format_summary:
+            log.setLevel(logging.WARNING)
+            log_result('GitHubService', 'list_projects', [], '[]', 0.1, log)
+            log.setLevel(logging.INFO)
+            with self.assertLogs(log, logging.INFO) as logs:
+                log_result('GitHubService', 'list_repos', [], '[]', 0.1, log)
+                log.info("other")
+        format_summary.assert_not_called()
+        self.assertEqual(logs.output, ['INFO:test_result_logging.quiet:other'])
+
+    def test_log_queue_moves_handlers_to_listener(self):
+        root = logging.Logger('test_root')
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        root.addHandler(handler)
+
+        with patch('src.result_logging.LOG_QUEUE', True):
+            listener = start_log_queue(root)
+            self.assertIsNone(start_log_queue(root))
+            self.assertIsInstance(root.handlers[0], logging.handlers.QueueHandler)
+            root.warning("queued")
+            stop_log_queue()
+
+        self.assertIsNotNone(listener)
+        self.assertEqual([record.getMessage() for record in records], ['queued'])
+        self.assertEqual(root.handlers, [handler])
+        self.assertIsNone(result_logging._listener)
+
+
+class TestExecuteCommandLogging(DatabaseTestCase):
+    def tearDown(self):
+        service_pool.invalidate()
+        super().tearDown()
+
+    def test_large_result_is_summarized(self):
+        configure_result_logging({'default': {'max_chars': 30}})
+        with patch('src.execute_command.output_result'), self.assertLogs('src.execute_command', logging.INFO) as logs:
+            execute_command('list repos github_main', CLASSES, SERVICE_CONFIG)
+        configure_result_logging()
+
+        result_lines = [line for line in logs.output if 'Result of GitHubService.list_repos' in line]
+        self.assertEqual(len(result_lines), 1)
+        self.assertIn('5000 items', result_lines[0])
+        self.assertLess(len(result_lines[0]), 200)
+        stored = get_connection().execute("SELECT result_size FROM query").fetchone()[0]
+        self.assertTrue(any(f'{stored} bytes' in line for line in logs.output if 'Data saved' in line))
+
+    def test_summary_is_logged_when_the_save_fails(self):
+        with patch('src.execute_command.save_result', side_effect=sqlite3.OperationalError('disk I/O error')), \
+                self.assertLogs('src.execute_command', logging.INFO) as logs:
+            execute_command('list repos github_main', CLASSES, SERVICE_CONFIG)
+
+        self.assertTrue(any('Result of GitHubService.list_repos: 5000 items' in line for line in logs.output))
+        self.assertTrue(any('disk I/O error' in line for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from src.db_connection import get_connection
+from src.save_result import insert_result, save_result
+from src.result_writer import ResultWriter, enable_write_behind, disable_write_behind, wait_for_pending_writes
+from tests.db_test_case import DatabaseTestCase
+
+
+class TestResultWriter(DatabaseTestCase):
+    def tearDown(self):
+        disable_write_behind()
+        super().tearDown()
+
+    def count_rows(self):
+        return get_connection().execute("SELECT COUNT(*) FROM query").fetchone()[0]
+
+    def test_rows_are_written_in_batches(self):
+        writer = ResultWriter(insert_result, batch_size=50, flush_interval=5)
+        handles = [writer.enqueue('cmd', 'alias', 'Service', 'method', f'"{i}"') for i in range(120)]
+
+        writer.flush()
+
+        self.assertEqual(self.count_rows(), 120)
+        self.assertEqual(sorted(handle.wait(1) for handle in handles), list(range(1, 121)))
+        writer.close()
+
+    def test_close_flushes_pending_rows(self):
+        writer = ResultWriter(insert_result, batch_size=1000, flush_interval=60)
+        handle = writer.enqueue('cmd', 'alias', 'Service', 'method', '[]')
+
+        writer.close()
+
+        self.assertTrue(handle.done())
+        self.assertEqual(self.count_rows(), 1)
+
+    def test_failed_row_does_not_lose_batch(self):
+        def insert(cursor, value):
+            if value == 'bad':
+                raise ValueError('bad row')
+            return insert_result(cursor, 'cmd', 'alias', 'Service', 'method', value)
+
+        writer = ResultWriter(insert, batch_size=10, flush_interval=5)
+        good = writer.enqueue('"ok"')
+        bad = writer.enqueue('bad')
+        writer.flush()
+
+        self.assertEqual(good.wait(1), 1)
+        with self.assertRaises(ValueError):
+            bad.wait(1)
+        writer.close()
+
+    def test_save_result_is_synchronous_without_writer(self):
+        handle = save_result('cmd', 'alias', 'Service', 'method', [1, 2])
+
+        self.assertTrue(handle.done())
+        self.assertEqual(self.count_rows(), 1)
+        self.assertEqual(handle.size, len('[1, 2]'))
+
+    def test_readers_see_queued_results(self):
+        enable_write_behind(insert_result, batch_size=100, flush_interval=60)
+        handle = save_result('cmd', 'alias', 'Service', 'method', 'é')
+        self.assertEqual(handle.size, 2)
+
+        wait_for_pending_writes()
+
+        self.assertEqual(handle.wait(1), 1)
+        self.assertEqual(self.count_rows(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
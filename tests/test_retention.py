@@ -0,0 +1,150 @@
+import unittest
+from unittest.mock import patch
+from src.db_connection import get_connection
+from src.save_result import save_result
+from src.get_latest_result import get_latest_result
+from src.result_items import get_latest_result_id, iter_result_items
+from src.result_blobs import clear_blob_cache
+from src.json_fields import configure_extracted_fields
+from src.filter_expression import compile_filter
+from src.sql_filter import filter_latest_result
+from src.retention import (RetentionPolicy, configure_retention, expired_query_ids, apply_retention,
+                           apply_retention_if_due, incremental_vacuum, DAY_NS)
+from tests.db_test_case import DatabaseTestCase
+
+NOW_NS = 1000 * DAY_NS
+
+
+def zones(run):
+    return [{'id': f'z{i}', 'name': f'zone{i}.example.com', 'run': run} for i in range(3)]
+
+
+class TestRetention(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_retention()
+
+    def tearDown(self):
+        configure_retention()
+        configure_extracted_fields()
+        clear_blob_cache()
+        super().tearDown()
+
+    def count(self, table):
+        return get_connection().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def save_at(self, created_at_ns, result, method_name='list_zones'):
+        save_result('list zones cloudflare_main', 'cloudflare_main', 'CloudflareService', method_name,
+                    result).wait()
+        conn = get_connection()
+        query_id = conn.execute("SELECT MAX(id) FROM query").fetchone()[0]
+        conn.execute("UPDATE query_row SET created_at_ns = ? WHERE id = ?", (created_at_ns, query_id))
+        conn.commit()
+        return query_id
+
+    def expired(self, policy):
+        return expired_query_ids(get_connection(), 'CloudflareService', 'list_zones', policy, NOW_NS)
+
+    def test_policies(self):
+        ids = [self.save_at(NOW_NS - days * DAY_NS - hour * 3600 * 10 ** 9, zones(days * 10 + hour))
+               for days in (20, 10, 3, 1) for hour in (2, 1)]
+
+        self.assertEqual(self.expired(RetentionPolicy()), [])
+        self.assertEqual(self.expired(RetentionPolicy(keep_last=3)), ids[:5])
+        self.assertEqual(self.expired(RetentionPolicy(keep_days=5)), ids[:4])
+        self.assertEqual(self.expired(RetentionPolicy(keep_last=6, keep_days=5)), ids[:2])
+        # One result per day (the last one) once older than two days
+        self.assertEqual(self.expired(RetentionPolicy(daily_after_days=2)), [ids[0], ids[2], ids[4]])
+        self.assertEqual(self.expired(RetentionPolicy(keep_days=15, daily_after_days=2)), ids[:3] + [ids[4]])
+
+    def test_configuration_inherits_default(self):
+        with patch('src.retention.RETENTION_KEEP_DAYS', 30):
+            policies = configure_retention({
+                'default': {'keep_last': 10},
+                'CloudflareService.list_zones': {'daily_after_days': 7},
+            })
+        policy = policies[('CloudflareService', 'list_zones')]
+        self.assertEqual((policy.keep_last, policy.keep_days, policy.daily_after_days), (10, 30, 7))
+        with self.assertRaises(ValueError):
+            configure_retention({'default': {'keep': 1}})
+
+    def test_deletes_results_and_unused_blobs(self):
+        configure_extracted_fields({'CloudflareService.list_zones': ['id', 'name']})
+        for run in range(5):
+            self.save_at(NOW_NS - (5 - run) * DAY_NS, zones(run))
+        configure_retention({'CloudflareService.list_zones': {'keep_last': 2}})
+
+        stats = apply_retention(NOW_NS, batch_size=2, pause=0)
+
+        self.assertEqual((stats['rows'], stats['blobs']), (3, 3))
+        self.assertEqual(self.count('query'), 2)
+        self.assertEqual(self.count('result_blob'), 2)
+        self.assertEqual(self.count('query_item'), 6)
+        self.assertEqual(self.count('extract_cloudflareservice_list_zones'), 6)
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones'), zones(4))
+
+    def test_shared_blob_moves_its_elements_to_a_kept_row(self):
+        for day in (3, 2, 1):
+            self.save_at(NOW_NS - day * DAY_NS, zones(0))
+        configure_retention({'CloudflareService.list_zones': {'keep_last': 1}})
+
+        apply_retention(NOW_NS, pause=0)
+
+        self.assertEqual(self.count('query'), 1)
+        self.assertEqual(self.count('result_blob'), 1)
+        latest_id = get_latest_result_id('CloudflareService', 'list_zones')
+        self.assertEqual(list(iter_result_items(latest_id)), zones(0))
+
+    def test_referenced_results_are_kept(self):
+        source_id = self.save_at(NOW_NS - 3 * DAY_NS, zones(0))
+        query_id, _ = filter_latest_result('filter', 'CloudflareService', 'list_zones', compile_filter('id = z1'))
+        for day in (2, 1):
+            self.save_at(NOW_NS - day * DAY_NS, zones(day))
+        configure_retention({'CloudflareService.list_zones': {'keep_last': 1}})
+
+        apply_retention(NOW_NS, pause=0)
+
+        remaining = [row[0] for row in get_connection().execute("SELECT id FROM query ORDER BY id")]
+        self.assertIn(source_id, remaining)
+        self.assertIn(query_id, remaining)
+        self.assertEqual(len(remaining), 3)
+
+    def test_patch_bases_are_kept_while_needed(self):
+        large = [dict(zone, description='x' * 200) for zone in zones(0) * 10]
+        with patch('src.result_blobs.RESULT_DELTA', True):
+            for day in range(3):
+                result = [dict(zone, run=day) if i == 0 else zone for i, zone in enumerate(large)]
+                self.save_at(NOW_NS - (3 - day) * DAY_NS, result)
+        self.assertEqual(get_connection().execute("SELECT MAX(delta_depth) FROM result_blob").fetchone()[0], 2)
+        configure_retention({'CloudflareService.list_zones': {'keep_last': 1}})
+
+        apply_retention(NOW_NS, pause=0)
+        clear_blob_cache()
+
+        self.assertEqual(self.count('query'), 1)
+        self.assertEqual(self.count('result_blob'), 3)
+        self.assertEqual(get_latest_result('CloudflareService', 'list_zones')[0]['run'], 2)
+
+    def test_incremental_vacuum_returns_pages(self):
+        conn = get_connection()
+        self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        for run in range(20):
+            self.save_at(NOW_NS - (20 - run) * DAY_NS, [{'run': run, 'text': 'x' * 4000}] * 5)
+        configure_retention({'CloudflareService.list_zones': {'keep_last': 1}})
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+
+        stats = apply_retention(NOW_NS, pause=0)
+
+        self.assertGreater(stats['pages'], 0)
+        self.assertLess(conn.execute("PRAGMA page_count").fetchone()[0], pages_before)
+        self.assertEqual(incremental_vacuum(), 0)
+
+    def test_runs_once_per_interval(self):
+        self.assertIsNotNone(apply_retention_if_due(3600, NOW_NS))
+        self.assertIsNone(apply_retention_if_due(3600, NOW_NS + 10 ** 9))
+        self.assertIsNotNone(apply_retention_if_due(3600, NOW_NS + 3600 * 10 ** 9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from src.plugin_registry import PluginRegistry
+from src.service_pool import service_pool
+from src.runner_daemon import RunnerDaemon, _UnixServer, _CommandHandler, send_command
+from tests.db_test_case import DatabaseTestCase
+
+
+class StubDaemon:
+    def __init__(self):
+        self.reloaded = 0
+
+    def reload(self):
+        self.reloaded += 1
+
+    def execute(self, sentence, output):
+        if sentence == 'fail':
+            raise RuntimeError('boom')
+        output.write(f"ran {sentence}\n")
+
+
+class TestRunnerDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'runner.sock')
+        self.daemon = StubDaemon()
+        self.server = _UnixServer(self.socket_path, _CommandHandler)
+        self.server.daemon_state = self.daemon
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_streams_command_output(self):
+        output = io.StringIO()
+
+        exit_code = send_command('list zones cloudflare_main', self.socket_path, output)
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(output.getvalue(), 'ran list zones cloudflare_main\n')
+
+    def test_ping_and_reload(self):
+        output = io.StringIO()
+
+        self.assertEqual(send_command('ping', self.socket_path, output), 0)
+        self.assertEqual(send_command('reload', self.socket_path, output), 0)
+
+        self.assertEqual(output.getvalue(), 'pong\n')
+        self.assertEqual(self.daemon.reloaded, 1)
+
+    def test_errors_return_non_zero_exit_code(self):
+        self.assertEqual(send_command('fail', self.socket_path, io.StringIO()), 1)
+
+
+PLUGIN = """
+class ReloadService:
+    def __init__(self, token):
+        self.token = token
+
+    def list_items(self):
+        return [{'version': %d, 'token': self.token}]
+"""
+COMMANDS = """
+commands:
+  python:
+    alias:
+      action:
+        show: list
+"""
+PRIVATE = """
+account_a:
+  service: ReloadService
+  token: %s
+account_b:
+  service: ReloadService
+  token: b
+"""
+
+
+class TestRunnerDaemonReload(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.python_dir = os.path.join(self.tmp_dir, 'python')
+        os.mkdir(self.python_dir)
+        self.write('python/reload_sample_service.py', PLUGIN % 1)
+        self.write('commands.yaml', COMMANDS)
+        self.write('private.yaml', PRIVATE % 'a')
+        registry = PluginRegistry(self.python_dir, os.path.join(self.tmp_dir, 'manifest.json'))
+        self.patches = [
+            patch('src.config_cache.CONFIG_CACHE_DIR', ''),
+            patch('src.runner_daemon.list_classes_and_objects', return_value=registry),
+        ]
+        for active in self.patches:
+            active.start()
+        self.daemon = RunnerDaemon(os.path.join(self.tmp_dir, 'commands.yaml'),
+                                   os.path.join(self.tmp_dir, 'private.yaml'))
+
+    def tearDown(self):
+        service_pool.invalidate()
+        for active in self.patches:
+            active.stop()
+        sys.modules.pop('reload_sample_service', None)
+        if self.python_dir in sys.path:
+            sys.path.remove(self.python_dir)
+        super().tearDown()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        # Distinct mtimes even on filesystems with coarse timestamps
+        stamp = os.stat(path).st_mtime_ns + getattr(self, 'writes', 0) * 10 ** 9
+        self.writes = getattr(self, 'writes', 0) + 1
+        os.utime(path, ns=(stamp, stamp))
+
+    def test_reload_rebuilds_only_affected_plans(self):
+        compiler = self.daemon.config.compiler
+        plan_a = compiler.compile('show items account_a')
+        plan_b = compiler.compile('show items account_b')
+        running = self.daemon.config
+
+        self.write('private.yaml', PRIVATE % 'changed')
+        self.daemon.reload()
+
+        compiler = self.daemon.config.compiler
+        self.assertIsNot(self.daemon.config, running)
+        self.assertIsNot(compiler.compile('show items account_a'), plan_a)
+        self.assertIs(compiler.compile('show items account_b'), plan_b)
+        # The swapped-out configuration is left intact for commands still using it
+        self.assertEqual(running.service_config['account_a']['token'], 'a')
+
+    def test_reload_picks_up_changed_plugin(self):
+        _, call = self.daemon.config.compiler.compile('show items account_b').bind()
+        self.assertEqual(call.method(call.instance), [{'version': 1, 'token': 'b'}])
+
+        self.write('python/reload_sample_service.py', PLUGIN % 2)
+        self.daemon.reload()
+
+        _, call = self.daemon.config.compiler.compile('show items account_b').bind()
+        self.assertEqual(call.method(call.instance), [{'version': 2, 'token': 'b'}])
+
+    def test_invalid_configuration_keeps_the_running_one(self):
+        running = self.daemon.config
+        self.write('private.yaml', "account_a: {token: a}\n")
+
+        with self.assertRaises(ValueError):
+            self.daemon.reload()
+        self.daemon.reload_changed([os.path.join(self.tmp_dir, 'private.yaml')])
+
+        self.assertIs(self.daemon.config, running)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import patch
+from src.service_pool import ServicePool
+
+
+class DummyService:
+    instances = 0
+
+    def __init__(self, token):
+        DummyService.instances += 1
+        self.token = token
+
+
+class TestServicePool(unittest.TestCase):
+    def setUp(self):
+        DummyService.instances = 0
+        self.pool = ServicePool(idle_timeout=60)
+
+    def test_reuses_instance_for_same_alias(self):
+        first = self.pool.get('main', DummyService, {'token': 'a'})
+        second = self.pool.get('main', DummyService, {'token': 'a'})
+
+        self.assertIs(first, second)
+        self.assertEqual(DummyService.instances, 1)
+
+    def test_rebuilds_instance_when_settings_change(self):
+        first = self.pool.get('main', DummyService, {'token': 'a'})
+        second = self.pool.get('main', DummyService, {'token': 'b'})
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.token, 'b')
+
+    def test_sync_config_drops_changed_and_removed_accounts(self):
+        self.pool.get('main', DummyService, {'token': 'a'})
+        self.pool.get('other', DummyService, {'token': 'x'})
+
+        self.pool.sync_config({'main': {'service': 'DummyService', 'token': 'changed'}})
+
+        self.assertNotIn('main', self.pool)
+        self.assertNotIn('other', self.pool)
+
+    def test_sync_config_keeps_unchanged_accounts(self):
+        self.pool.get('main', DummyService, {'token': 'a'})
+
+        self.pool.sync_config({'main': {'service': 'DummyService', 'token': 'a'}})
+
+        self.assertIn('main', self.pool)
+
+    @patch('src.service_pool.time.monotonic')
+    def test_evicts_idle_instances(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        self.pool.get('main', DummyService, {'token': 'a'})
+
+        mock_monotonic.return_value = 161.0
+        self.pool.evict_idle()
+
+        self.assertEqual(len(self.pool), 0)
+
+    def test_invalidate_all(self):
+        self.pool.get('main', DummyService, {'token': 'a'})
+        self.pool.get('other', DummyService, {'token': 'b'})
+
+        self.pool.invalidate()
+
+        self.assertEqual(len(self.pool), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
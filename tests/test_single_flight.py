@@ -0,0 +1,169 @@
+import time
+import asyncio
+import threading
+import unittest
+from src.db_connection import get_connection
+from src.service_pool import service_pool
+from src.execute_command import execute_command
+from src.async_execute_command import async_execute_command
+from src.single_flight import SingleFlight, AsyncSingleFlight
+from tests.db_test_case import DatabaseTestCase
+
+
+class SlowGitLabService:
+    calls = 0
+    lock = threading.Lock()
+
+    def __init__(self, token=None):
+        self.token = token
+
+    def list_projects(self, visibility='public'):
+        with SlowGitLabService.lock:
+            SlowGitLabService.calls += 1
+        time.sleep(0.2)
+        return [{'id': 1, 'visibility': visibility}]
+
+    def archive_project(self, project_id):
+        with SlowGitLabService.lock:
+            SlowGitLabService.calls += 1
+        time.sleep(0.1)
+        return {'id': project_id, 'archived': True}
+
+    def create_issue(self, project_id, title):
+        with SlowGitLabService.lock:
+            SlowGitLabService.calls += 1
+        time.sleep(0.1)
+        return {'project_id': project_id, 'title': title}
+
+
+CLASSES = {'GitLabService': {'class': SlowGitLabService, 'methods': {
+    'list_projects': SlowGitLabService.list_projects,
+    'create_issue': SlowGitLabService.create_issue,
+    'archive_project': SlowGitLabService.archive_project,
+}}}
+SERVICE_CONFIG = {'gitlab_main': {'service': 'GitLabService', 'token': 'x'}}
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return ['result']
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', fn))) for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['result']] * 5)
+        # Finished calls are not remembered
+        self.assertEqual(flight.do('key', lambda: 'again'), 'again')
+
+    def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            time.sleep(0.05)
+            raise RuntimeError("API down")
+
+        def run():
+            try:
+                flight.do('key', fail)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=run)
+        follower.start()
+        leader.join()
+        follower.join()
+        self.assertEqual(errors, ["API down", "API down"])
+
+    def test_async_callers_share_one_call(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        async def main():
+            return await asyncio.gather(*(flight.do('key', fetch) for _ in range(4)))
+
+        self.assertEqual(asyncio.run(main()), ['result'] * 4)
+        self.assertEqual(len(calls), 1)
+
+
+class TestSingleFlightCommands(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        SlowGitLabService.calls = 0
+
+    def tearDown(self):
+        service_pool.invalidate()
+        super().tearDown()
+
+    def run_concurrently(self, sentences):
+        threads = [threading.Thread(target=execute_command, args=(sentence, CLASSES, SERVICE_CONFIG))
+                   for sentence in sentences]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def count_rows(self):
+        return get_connection().execute("SELECT COUNT(*) FROM query").fetchone()[0]
+
+    def test_identical_reads_call_the_service_once(self):
+        self.run_concurrently([
+            'list projects gitlab_main visibility=private',
+            'list projects gitlab_main visibility=private',
+            "list projects gitlab_main visibility='private'",
+            'list projects gitlab_main visibility=public',
+        ])
+        self.assertEqual(SlowGitLabService.calls, 2)
+        # Every sentence still saves its own row, sharing the stored blob
+        self.assertEqual(self.count_rows(), 4)
+        self.assertEqual(get_connection().execute("SELECT COUNT(*) FROM result_blob").fetchone()[0], 2)
+
+    def test_mutating_calls_are_not_shared(self):
+        self.run_concurrently(['create issue gitlab_main project_id=1 title=Bug'] * 3)
+        self.assertEqual(SlowGitLabService.calls, 3)
+
+    def test_only_read_methods_are_shared(self):
+        # Not on the never-cached list, but not named as a read either
+        self.run_concurrently(['archive project gitlab_main project_id=1'] * 3)
+        self.assertEqual(SlowGitLabService.calls, 3)
+
+    def test_async_commands_share_one_call(self):
+        async def main():
+            await asyncio.gather(*(async_execute_command('list projects gitlab_main', CLASSES, SERVICE_CONFIG)
+                                   for _ in range(3)))
+
+        asyncio.run(main())
+        self.assertEqual(SlowGitLabService.calls, 1)
+        self.assertEqual(self.count_rows(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
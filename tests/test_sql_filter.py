@@ -0,0 +1,127 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stdout
+from src.db_connection import get_connection
+from src.save_result import save_result, serialize_result
+from src.filter_data import filter_data
+from src.get_latest_result import get_latest_result
+from src.result_items import get_latest_result_id, iter_result_items, materialize_reference
+from src.sql_filter import filter_latest_result, select_latest_values
+from src.filter_expression import compile_filter, equality_filter
+from src.execute_command import execute_data_command
+from tests.db_test_case import DatabaseTestCase
+
+REPOSITORIES = [
+    {'id': 1, 'name': 'Logo', 'private': False, 'stars': 10, 'owner': None},
+    {'id': 2, 'name': 'class', 'private': True, 'stars': 2.5},
+    {'id': 3, 'name': 'ÉCOLE', 'private': False},
+    {'id': 4, 'name': 'logo', 'private': True, 'stars': 10},
+]
+
+
+class TestSqlFilter(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        save_result('list repositories github_main', 'github_main', 'GitHubService', 'list_repositories', REPOSITORIES)
+
+    def assertMatchesPython(self, filter_key, filter_value):
+        filter_latest_result('filter', 'GitHubService', 'list_repositories', equality_filter(filter_key, filter_value))
+        expected = filter_data(REPOSITORIES, filter_key, filter_value)
+        self.assertEqual(get_latest_result('GitHubService', 'list_repositories'), expected)
+        # Filter the unfiltered result again for the next comparison
+        save_result('list repositories github_main', 'github_main', 'GitHubService', 'list_repositories', REPOSITORIES)
+
+    def test_filter_matches_python_semantics(self):
+        for filter_key, filter_value in [('name', 'LOGO'), ('name', 'école'), ('private', 'true'),
+                                         ('stars', '10'), ('stars', '2.5'), ('owner', 'None'),
+                                         ('stars', ''), ('missing', 'x')]:
+            with self.subTest(key=filter_key, value=filter_value):
+                self.assertMatchesPython(filter_key, filter_value)
+
+    def test_filter_stores_references_instead_of_a_copy(self):
+        query_id, match_count = filter_latest_result('filter', 'GitHubService', 'list_repositories', compile_filter('name = logo'))
+
+        conn = get_connection()
+        stored, source_query_id = conn.execute(
+            "SELECT result, source_query_id FROM query_row WHERE id = ?", (query_id,)).fetchone()
+        self.assertEqual(match_count, 2)
+        self.assertIsNone(stored)
+        # The query view still expands the reference for SQL
+        result = conn.execute("SELECT result FROM query WHERE id = ?", (query_id,)).fetchone()[0]
+        self.assertEqual([item['name'] for item in json.loads(result)], ['Logo', 'logo'])
+        self.assertEqual(source_query_id, query_id - 1)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM query_item").fetchone()[0], len(REPOSITORIES))
+        # Rebuilt with the same formatting as a result saved in full
+        self.assertEqual(materialize_reference(conn, query_id, source_query_id),
+                         serialize_result([REPOSITORIES[0], REPOSITORIES[3]]))
+
+    def test_filtering_a_filtered_result_refers_to_the_original(self):
+        first_id, _ = filter_latest_result('filter', 'GitHubService', 'list_repositories', compile_filter('name = logo'))
+        second_id, match_count = filter_latest_result('filter', 'GitHubService', 'list_repositories', compile_filter('private = true'))
+
+        source_query_id = get_connection().execute(
+            "SELECT source_query_id FROM query WHERE id = ?", (second_id,)).fetchone()[0]
+        self.assertEqual(match_count, 1)
+        self.assertEqual(source_query_id, first_id - 1)
+        self.assertEqual(list(iter_result_items(get_latest_result_id('GitHubService', 'list_repositories'))),
+                         [REPOSITORIES[3]])
+
+    def test_select_latest_values(self):
+        self.assertEqual(select_latest_values('GitHubService', 'list_repositories', 'id', compile_filter('name = logo')), [1, 4])
+        self.assertEqual(select_latest_values('GitHubService', 'list_repositories', 'stars', compile_filter('private = false')),
+                         [10, 'Not found'])
+        self.assertIsNone(select_latest_values('GitHubService', 'unknown', 'id', compile_filter('name = logo')))
+
+    def test_non_list_results_fall_back_to_python(self):
+        save_result('x', 'x', 'Service', 'method', {'a': {'name': 'keep'}, 'b': {'name': 'drop'}})
+
+        self.assertIsNone(filter_latest_result('filter', 'Service', 'method', compile_filter('name = keep')))
+        execute_data_command('filter Service_method name keep')
+        self.assertEqual(get_latest_result('Service', 'method'), {'a': {'name': 'keep'}})
+
+    def test_print_value_command(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            execute_data_command('print value full_name where name=class from GitHubService_list_repositories')
+            execute_data_command('print value id where name=nothing from GitHubService_list_repositories')
+
+        self.assertEqual(output.getvalue(),
+                         "full_name: Not found\nNo data found matching the filter: name=nothing\n")
+
+    def test_print_value_where_unquoted_value(self):
+        save_result('list', 'github_main', 'GitHubService', 'list_repositories',
+                    [{'id': 1, 'name': 'x(y)'}, {'id': 2, 'name': 'a,b'}, {'id': 3, 'name': 'x'}])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            execute_data_command('print value id where name=x(y) from GitHubService_list_repositories')
+            execute_data_command('print value id where name=a,b from GitHubService_list_repositories')
+
+        self.assertEqual(output.getvalue(), "id: 1\nid: 2\n")
+
+    def test_filter_sentence_with_expression(self):
+        execute_data_command('filter GitHubService_list_repositories stars >= 10 and not private = false')
+
+        self.assertEqual(get_latest_result('GitHubService', 'list_repositories'), [REPOSITORIES[3]])
+
+    def test_filter_sentence_value_with_operator_characters(self):
+        repositories = [{'name': 'x(y)'}, {'name': 'a=b'}, {'name': '<c>'}, {'name': 'other'}]
+        for value in ['"x(y)"', 'a=b', '<c>']:
+            with self.subTest(value):
+                save_result('list', 'github_main', 'GitHubService', 'list_repositories', repositories)
+                execute_data_command(f'filter GitHubService_list_repositories name {value}')
+                self.assertEqual(get_latest_result('GitHubService', 'list_repositories'),
+                                 [{'name': value.strip('"')}])
+
+    def test_json_result_view_expands_references(self):
+        from src.create_json_result_view import create_json_result_view
+        create_json_result_view()
+        query_id, _ = filter_latest_result('filter', 'GitHubService', 'list_repositories', compile_filter('name = class'))
+
+        row = get_connection().execute(
+            "SELECT json_extract(result, '$[0].id') FROM json_result WHERE id = ?", (query_id,)).fetchone()
+        self.assertEqual(row[0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()